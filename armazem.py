@@ -0,0 +1,178 @@
+# Arquivo: armazem.py
+"""
+Armazém em memória compartilhado por todas as sessões do painel.
+
+`st.cache_data` serializa o valor guardado e entrega uma cópia nova a cada sessão e a
+cada reexecução, então a memória e o tempo de cada reexecução crescem com o número de
+pessoas olhando o painel (justamente nas chuvas fortes). O armazém guarda um único
+objeto por chave e entrega a mesma referência a todos, sem cópia:
+
+- arrays numpy (como as alturas da `SerieMare`) são marcados como somente leitura;
+- DataFrames e Series são entregues como cópia rasa (`copy(deep=False)`), que
+  compartilha os dados: com o copy-on-write do pandas, uma sessão que altere o que
+  recebeu altera a própria cópia, nunca o valor compartilhado. O copy-on-write é o
+  padrão a partir do pandas 3; no pandas 2 quem o liga é o painel (`risco_hoje.py`),
+  e não este módulo, para não mudar a semântica do pandas em quem só o importa. Sem
+  ele, a cópia rasa deixaria a alteração chegar ao valor compartilhado, então o
+  armazém entrega uma cópia completa.
+
+A atualização é atômica: o valor novo é montado por inteiro fora do dicionário e só
+então substitui o antigo, em uma única atribuição. Enquanto uma thread recarrega uma
+chave vencida, as demais continuam recebendo o valor anterior em vez de esperar ou de
+recarregar de novo. Só a primeira carga de uma chave bloqueia.
+"""
+import time
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from instrumentacao import registrar
+
+MAX_ENTRADAS = 64
+PANDAS_3 = int(pd.__version__.split('.')[0]) >= 3
+
+
+class _Entrada:
+    __slots__ = ('valor', 'carregado_em', 'origem', 'versao')
+
+    def __init__(self, valor, origem, versao):
+        self.valor = valor
+        self.carregado_em = time.monotonic()
+        self.origem = origem
+        self.versao = versao
+
+
+def congelar(valor):
+    """Marca como somente leitura os arrays numpy de `valor` (array, SerieMare ou tupla/lista deles)."""
+    if isinstance(valor, np.ndarray):
+        valor.setflags(write=False)
+    elif isinstance(valor, (tuple, list)):
+        for item in valor:
+            congelar(item)
+    elif isinstance(getattr(valor, 'alturas', None), np.ndarray):
+        valor.alturas.setflags(write=False)
+    return valor
+
+
+def copy_on_write_ativo():
+    return PANDAS_3 or pd.get_option('mode.copy_on_write') is True
+
+
+def _vista(valor):
+    """
+    Referência entregue às sessões: o próprio valor, ou, para objetos do pandas, uma
+    cópia rasa (com copy-on-write) ou completa (sem ele).
+    """
+    if isinstance(valor, (pd.DataFrame, pd.Series)):
+        return valor.copy(deep=not copy_on_write_ativo())
+    return valor
+
+
+class ArmazemCompartilhado:
+    """Valores compartilhados por chave, com validade (`ttl`, em segundos) e troca atômica."""
+
+    def __init__(self, max_entradas=MAX_ENTRADAS):
+        self.max_entradas = max_entradas
+        self._entradas = OrderedDict()
+        self._travas = {}
+        self._trava = threading.Lock()
+        self._versoes = 0
+
+    def _trava_da_chave(self, chave):
+        with self._trava:
+            return self._travas.setdefault(chave, threading.Lock())
+
+    def _vencida(self, entrada, ttl, origem):
+        if entrada.origem != origem or entrada.carregado_em == float('-inf'):
+            return True
+        return ttl is not None and time.monotonic() - entrada.carregado_em > ttl
+
+    def obter(self, chave, carregar, ttl=None, origem=None):
+        """
+        Valor de `chave`, chamando `carregar()` na primeira vez, quando passar de `ttl`
+        segundos ou quando `origem` (a versão dos dados de que o valor depende) mudar.
+
+        Se outra thread já estiver recarregando a chave, devolve o valor anterior. Se
+        `carregar` falhar e houver valor anterior, ele continua valendo e o erro é
+        registrado; sem valor anterior, a exceção segue adiante.
+        """
+        return self.obter_com_versao(chave, carregar, ttl, origem)[0]
+
+    def obter_com_versao(self, chave, carregar, ttl=None, origem=None):
+        """Como `obter`, mas devolve (valor, versão da carga), lidos juntos."""
+        valor, versao = self._obter(chave, carregar, ttl, origem)
+        return _vista(valor), versao
+
+    def _obter(self, chave, carregar, ttl, origem):
+        entrada = self._entradas.get(chave)
+        if entrada is not None and not self._vencida(entrada, ttl, origem):
+            self._marcar_uso(chave)
+            return entrada.valor, entrada.versao
+
+        trava = self._trava_da_chave(chave)
+        if not trava.acquire(blocking=entrada is None):
+            return entrada.valor, entrada.versao
+        try:
+            entrada = self._entradas.get(chave)
+            if entrada is not None and not self._vencida(entrada, ttl, origem):
+                return entrada.valor, entrada.versao
+            inicio = time.perf_counter()
+            try:
+                valor = congelar(carregar())
+            except Exception as e:
+                if entrada is None:
+                    raise
+                registrar('armazem', chave=str(chave), resultado='erro', erro=type(e).__name__)
+                return entrada.valor, entrada.versao
+            with self._trava:
+                self._versoes += 1
+                entrada = self._entradas[chave] = _Entrada(valor, origem, self._versoes)
+                self._entradas.move_to_end(chave)
+                self._descartar_excedentes()
+            registrar('armazem', chave=str(chave), resultado='carregado',
+                      duracao_ms=round((time.perf_counter() - inicio) * 1000, 2))
+            return valor, entrada.versao
+        finally:
+            trava.release()
+
+    def consultar(self, chave):
+        """Valor atual de `chave` (como em `obter`), ou None se não houver, sem carregar nada."""
+        entrada = self._entradas.get(chave)
+        if entrada is None:
+            return None
+        self._marcar_uso(chave)
+        return _vista(entrada.valor)
+
+    def guardar(self, chave, valor, origem=None):
+        """Guarda um valor já calculado (por exemplo, vários de uma vez, em lote) em `chave`."""
+        valor = congelar(valor)
+        with self._trava:
+            self._versoes += 1
+            self._entradas[chave] = _Entrada(valor, origem, self._versoes)
+            self._entradas.move_to_end(chave)
+            self._descartar_excedentes()
+
+    def versao(self, chave):
+        """Número da carga atual de `chave` (muda a cada recarga; 0 se nunca carregada)."""
+        entrada = self._entradas.get(chave)
+        return entrada.versao if entrada is not None else 0
+
+    def invalidar(self, filtro=None):
+        """Marca como vencidas as chaves (todas, ou as que satisfazem `filtro(chave)`)."""
+        with self._trava:
+            for chave, entrada in self._entradas.items():
+                if filtro is None or filtro(chave):
+                    entrada.carregado_em = float('-inf')
+
+    def _marcar_uso(self, chave):
+        with self._trava:
+            if chave in self._entradas:
+                self._entradas.move_to_end(chave)
+
+    def _descartar_excedentes(self):
+        while len(self._entradas) > self.max_entradas:
+            chave, _ = self._entradas.popitem(last=False)
+            self._travas.pop(chave, None)
+
+    def __len__(self):
+        return len(self._entradas)
@@ -1,28 +1,108 @@
 # Arquivo: atualizar_dados.py
 import os
 import sys
+import json
+import time
+import sqlite3
+import argparse
+import functools
+import threading
 import pandas as pd
 import requests
-from datetime import datetime
-from pytz import timezone
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pytz import timezone, utc
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from dados_chuva import carregar_chuva_periodo, indexar_csv, anexar_bloco, SUFIXO_INDICE_CHUVAS
+from mare import SerieMare
+from processamento import processar_dados_chuva_simplificado, executar_analise_risco_completa, COLUNAS_TABELA_RISCO
+from instrumentacao import etapa, registrar, perfilar
+from estacoes import RegistroEstacoes, ARQUIVO_ESTACOES
+import leituras_ao_vivo
+import historico
 
-# --- A função obter_token e atualizar_csv_diario continuam as mesmas ---
+# Endpoints da API do CEMADEN
+URL_TOKEN = 'https://sgaa.cemaden.gov.br/SGAA/rest/controle-token/tokens'
+URL_DADOS_RECENTES = 'https://sws.cemaden.gov.br/PED/rest/pcds/pcds-dados-recentes'
+URL_DADOS_PERIODO = 'https://sws.cemaden.gov.br/PED/rest/pcds/dados_pcd'
 
-def obter_token(email, senha):
-    """Obtém o token de autenticação da API do CEMADEN."""
+# Limites de rede: o número de requisições simultâneas fica baixo para não
+# esbarrar no limite de requisições do CEMADEN.
+MAX_REQUISICOES_SIMULTANEAS = 4
+TIMEOUT_REQUISICAO = (5, 30)  # (conexão, leitura) em segundos
+TENTATIVAS_REQUISICAO = 3
+FATOR_BACKOFF = 0.5
+
+# Arquivos locais: leituras diárias, maré e tabelas de risco pré-calculadas
+PREFIXO_ARQUIVO_CHUVA = 'chuva_recife_'
+ARQUIVO_MARE = os.path.join('tide', 'mare_calculada_hora_em_hora_ano-completo.csv')
+ARQUIVO_CONSTITUINTES = os.path.join('tide', 'constituintes_harmonicos.csv')
+DIRETORIO_RISCO = 'risco'
+
+# Região coberta pela ingestão: uma consulta traz todas as estações da UF, filtradas
+# pelo código IBGE do município (os 7 primeiros dígitos do código da estação).
+UF_INGESTAO = 'PE'
+CODIGO_IBGE_MUNICIPIO = '2611606'  # Recife
+
+# Recuperação de dias passados (--backfill): cada tarefa é uma estação x janela de
+# tempo; o ritmo de requisições é limitado e o progresso fica em um checkpoint.
+JANELA_BACKFILL_HORAS = 24
+REQUISICOES_POR_SEGUNDO = 2.0
+ARQUIVO_CHECKPOINT_BACKFILL = 'backfill_checkpoint.json'
+
+# Ingestão contínua (`--continuo`): intervalo entre consultas à API
+INTERVALO_CONTINUO_SEGUNDOS = 60
+
+# Por quanto tempo o token é reaproveitado antes de pedir um novo.
+VALIDADE_TOKEN_SEGUNDOS = 50 * 60
+
+# Estado da gravação incremental dos arquivos diários (marcas d'água por estação).
+ARQUIVO_ESTADO_INGESTAO = 'estado_ingestao.json'
+DIAS_ESTADO_INGESTAO = 3
+
+_cache_token = {}
+_trava_token = threading.Lock()
+
+
+def criar_sessao(max_conexoes=MAX_REQUISICOES_SIMULTANEAS, tentativas=TENTATIVAS_REQUISICAO, backoff=FATOR_BACKOFF):
+    """Cria uma Session com pool de conexões keep-alive e retentativas com backoff."""
+    retry = Retry(
+        total=tentativas,
+        backoff_factor=backoff,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(['GET', 'POST']),
+        respect_retry_after_header=True,
+    )
+    adaptador = HTTPAdapter(pool_connections=1, pool_maxsize=max_conexoes, max_retries=retry)
+    sessao = requests.Session()
+    sessao.mount('https://', adaptador)
+    sessao.mount('http://', adaptador)
+    return sessao
+
+
+def obter_token(email, senha, sessao=None, token_url=URL_TOKEN, validade=VALIDADE_TOKEN_SEGUNDOS):
+    """Obtém o token de autenticação da API do CEMADEN (reaproveitado até expirar)."""
     if not email or not senha:
         print("ERRO: Credenciais do Cemaden (email/senha) não encontradas nos segredos.", file=sys.stderr)
         sys.exit(1)
+    with _trava_token:
+        em_cache = _cache_token.get((token_url, email))
+        if em_cache and em_cache[1] > time.monotonic():
+            print("✅ Reutilizando token de acesso em cache.")
+            return em_cache[0]
     try:
-        token_url = 'https://sgaa.cemaden.gov.br/SGAA/rest/controle-token/tokens'
         login = {'email': email, 'password': senha}
         print("Tentando obter o token de acesso...")
-        response = requests.post(token_url, json=login)
+        cliente = sessao or requests
+        response = cliente.post(token_url, json=login, timeout=TIMEOUT_REQUISICAO)
         response.raise_for_status()
         content = response.json()
         token = content.get('token')
         if token:
             print("✅ Token obtido com sucesso!")
+            with _trava_token:
+                _cache_token[(token_url, email)] = (token, time.monotonic() + validade)
             return token
         else:
             print("❌ Erro: A resposta da API não continha um token.", file=sys.stderr)
@@ -31,47 +111,89 @@ def obter_token(email, senha):
         print(f"❌ Erro ao obter token: {e}", file=sys.stderr)
         return None
 
-def buscar_dados_cemaden(token, lista_estacoes, uf='PE', rede='11', sensor='10'):
+def _buscar_estacao(sessao, url_base, headers, params, timeout):
+    """
+    Busca os dados de uma estação e devolve (DataFrame, latência em segundos).
+
+    O DataFrame vem vazio quando a API não tem leituras e é None quando a requisição
+    falhou. Cada requisição registra um evento `http` com a latência e os bytes recebidos.
+    """
+    codestacao = params.get('codestacao', params.get('uf'))
+    inicio = time.perf_counter()
+    try:
+        response = sessao.get(url_base, headers=headers, params=params, timeout=timeout)
+        response.raise_for_status()
+        dados = response.json()
+    except (requests.exceptions.RequestException, ValueError) as e:
+        print(f"❌ Erro ao buscar dados para a estação {codestacao}: {e}", file=sys.stderr)
+        latencia = time.perf_counter() - inicio
+        registrar('http', estacao=codestacao, latencia_ms=round(latencia * 1000, 2), erro=type(e).__name__)
+        return None, latencia
+    latencia = time.perf_counter() - inicio
+    registrar('http', estacao=codestacao, latencia_ms=round(latencia * 1000, 2),
+              status=response.status_code, bytes=len(response.content))
+    if isinstance(dados, dict) and 'Nenhum resultado foi encontrado' in dados.get('Info', ''):
+        print(f"⚠️ Estação {codestacao} retornou uma mensagem de 'não encontrado'. Ignorando.")
+        return pd.DataFrame(), latencia
+    if not dados:
+        print(f"⚠️ Nenhum dado encontrado para a estação {codestacao}.")
+        return pd.DataFrame(), latencia
+    dados_para_df = [dados] if isinstance(dados, dict) else dados
+    return pd.DataFrame(dados_para_df), latencia
+
+
+def buscar_dados_cemaden(token, lista_estacoes, uf='PE', rede='11', sensor='10',
+                         max_simultaneas=MAX_REQUISICOES_SIMULTANEAS, timeout=TIMEOUT_REQUISICAO,
+                         sessao=None, url_base=URL_DADOS_RECENTES):
     """
     Busca os dados e JÁ CONVERTE os horários para o fuso local de Recife.
+
+    As estações são consultadas em paralelo (no máximo `max_simultaneas` por vez)
+    sobre uma única sessão keep-alive. A latência de cada estação, em segundos,
+    fica em `df.attrs['latencias']`.
     """
     if not token:
         print("❌ Token de acesso não fornecido.", file=sys.stderr)
         return pd.DataFrame()
     
-    url_base = 'https://sws.cemaden.gov.br/PED/rest/pcds/pcds-dados-recentes'
     headers = {'token': token}
-    lista_dfs = []
-    print(f"\nBuscando dados para {len(lista_estacoes)} estações...")
-    
-    for codestacao in lista_estacoes:
+    sessao_propria = sessao is None
+    if sessao_propria:
+        sessao = criar_sessao(max_conexoes=max_simultaneas)
+    print(f"\nBuscando dados para {len(lista_estacoes)} estações ({max_simultaneas} por vez)...")
+
+    def tarefa(codestacao):
         params = {'codestacao': codestacao, 'uf': uf, 'rede': rede, 'sensor': sensor, 'formato': 'JSON'}
-        try:
-            response = requests.get(url_base, headers=headers, params=params)
-            response.raise_for_status()
-            dados = response.json()
-            if isinstance(dados, dict) and 'Nenhum resultado foi encontrado' in dados.get('Info', ''):
-                print(f"⚠️ Estação {codestacao} retornou uma mensagem de 'não encontrado'. Ignorando.")
-                continue
-            if dados:
-                if isinstance(dados, dict):
-                    dados_para_df = [dados]
-                else:
-                    dados_para_df = dados
-                lista_dfs.append(pd.DataFrame(dados_para_df))
-            else:
-                print(f"⚠️ Nenhum dado encontrado para a estação {codestacao}.")
-        except requests.exceptions.RequestException as e:
-            print(f"❌ Erro ao buscar dados para a estação {codestacao}: {e}", file=sys.stderr)
+        return _buscar_estacao(sessao, url_base, headers, params, timeout)
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, max_simultaneas)) as executor:
+            resultados = list(executor.map(tarefa, lista_estacoes))
+    finally:
+        if sessao_propria:
+            sessao.close()
+
+    lista_dfs = []
+    latencias = {}
+    for codestacao, (df_estacao, latencia) in zip(lista_estacoes, resultados):
+        latencias[codestacao] = latencia
+        print(f"   {codestacao}: {latencia * 1000:.0f} ms")
+        if df_estacao is not None and not df_estacao.empty:
+            lista_dfs.append(df_estacao)
             
     if not lista_dfs:
         print("Nenhum dado foi retornado pela API.")
-        return pd.DataFrame()
+        df_vazio = pd.DataFrame()
+        df_vazio.attrs['latencias'] = latencias
+        return df_vazio
         
     print("✅ Dados obtidos com sucesso!")
     df_final = pd.concat(lista_dfs, ignore_index=True)
+    df_final.attrs['latencias'] = latencias
+    return _converter_fuso_recife(df_final)
+
 
-  
+def _converter_fuso_recife(df_final):
     if not df_final.empty and 'datahora' in df_final.columns:
         print("Convertendo novos dados para o fuso horário de Recife (UTC-3)...")
         # 1. Converte a coluna para o tipo datetime
@@ -80,12 +202,42 @@ def buscar_dados_cemaden(token, lista_estacoes, uf='PE', rede='11', sensor='10')
         df_final['datahora'] = df_final['datahora'].dt.tz_localize('UTC').dt.tz_convert('America/Recife')
         # 3. Formata de volta para texto, para salvar um CSV limpo
         df_final['datahora'] = df_final['datahora'].dt.strftime('%Y-%m-%d %H:%M:%S')
-    
-    
     return df_final
 
 
-def atualizar_csv_diario(df_novos_dados, nome_arquivo):
+def buscar_dados_regiao(token, uf=UF_INGESTAO, codigo_ibge=CODIGO_IBGE_MUNICIPIO, rede='11', sensor='10',
+                        timeout=TIMEOUT_REQUISICAO, sessao=None, url_base=URL_DADOS_RECENTES):
+    """
+    Busca as leituras recentes de todas as estações da UF em uma única requisição.
+
+    Com `codigo_ibge`, só ficam as estações do município (o código IBGE é o início do
+    código da estação). Devolve um DataFrame vazio se a API não responder à consulta
+    por UF; quem chama pode então cair para a busca estação por estação.
+    """
+    if not token:
+        print("❌ Token de acesso não fornecido.", file=sys.stderr)
+        return pd.DataFrame()
+    params = {'uf': uf, 'rede': rede, 'sensor': sensor, 'formato': 'JSON'}
+    if codigo_ibge:
+        params['codibge'] = codigo_ibge
+    print(f"\nBuscando dados de todas as estações de {uf}" + (f" (município {codigo_ibge})" if codigo_ibge else "") + "...")
+    cliente = sessao or criar_sessao(max_conexoes=1)
+    try:
+        df_regiao, latencia = _buscar_estacao(cliente, url_base, {'token': token}, params, timeout)
+    finally:
+        if sessao is None:
+            cliente.close()
+    if df_regiao is None or 'codestacao' not in df_regiao.columns:
+        return pd.DataFrame()
+    df_regiao['codestacao'] = df_regiao['codestacao'].astype(str)
+    if codigo_ibge:
+        df_regiao = df_regiao[df_regiao['codestacao'].str.startswith(codigo_ibge)].reset_index(drop=True)
+    print(f"✅ {df_regiao['codestacao'].nunique()} estação(ões) em uma requisição ({latencia * 1000:.0f} ms).")
+    return _converter_fuso_recife(df_regiao)
+
+
+def compactar_csv_diario(df_novos_dados, nome_arquivo):
+    """Reescreve o arquivo diário inteiro: combina com o existente e remove duplicatas."""
     if os.path.exists(nome_arquivo):
         print(f"Arquivo '{nome_arquivo}' encontrado. Carregando dados existentes...")
         try:
@@ -99,7 +251,8 @@ def atualizar_csv_diario(df_novos_dados, nome_arquivo):
         df_combinado = df_novos_dados
     
     num_linhas_antes = len(df_combinado)
-    df_final = df_combinado.drop_duplicates(subset=['codestacao', 'datahora'], keep='last')
+    df_final = (df_combinado.drop_duplicates(subset=['codestacao', 'datahora'], keep='last')
+                .sort_values('datahora', kind='stable'))
     num_linhas_depois = len(df_final)
     
     num_removidas = num_linhas_antes - num_linhas_depois
@@ -107,31 +260,558 @@ def atualizar_csv_diario(df_novos_dados, nome_arquivo):
         print(f"{num_removidas} linha(s) duplicada(s) foram removidas.")
 
     df_final.to_csv(nome_arquivo, index=False)
+    _gravar_indice(nome_arquivo)
     print(f"✅ Arquivo '{nome_arquivo}' salvo com sucesso! Total de {num_linhas_depois} registros.")
+    return df_final
+
+
+def _arquivo_indice(nome_arquivo):
+    return os.path.splitext(nome_arquivo)[0] + SUFIXO_INDICE_CHUVAS
+
+
+def _gravar_indice(nome_arquivo, indice=None):
+    """Grava o índice de blocos do arquivo diário (reconstruído do arquivo se não for dado)."""
+    if indice is None:
+        with open(nome_arquivo, 'rb') as f:
+            indice = indexar_csv(f.read())
+    temporario = f"{_arquivo_indice(nome_arquivo)}.tmp"
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump(indice, f, separators=(',', ':'))
+    os.replace(temporario, _arquivo_indice(nome_arquivo))
+
+
+def _ler_indice(nome_arquivo):
+    try:
+        with open(_arquivo_indice(nome_arquivo), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _carregar_estado(arquivo_estado):
+    if not os.path.exists(arquivo_estado):
+        return {}
+    try:
+        with open(arquivo_estado, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        print(f"⚠️ Estado de ingestão '{arquivo_estado}' ilegível. Será reconstruído.", file=sys.stderr)
+        return {}
+
+
+def _salvar_estado(estado, arquivo_estado, dias_mantidos=DIAS_ESTADO_INGESTAO):
+    # Só os arquivos diários mais recentes ainda recebem leituras; o resto é descartado.
+    for nome in sorted(estado)[:-dias_mantidos]:
+        del estado[nome]
+    temporario = f"{arquivo_estado}.tmp"
+    with open(temporario, 'w', encoding='utf-8') as f:
+        # Sem indentação: o codificador em C do json dá conta das janelas de leituras de todas as estações.
+        f.write(json.dumps(estado, ensure_ascii=False, sort_keys=True, separators=(',', ':')))
+    os.replace(temporario, arquivo_estado)
+
+
+def _inicio_da_janela(marcas, janela_api):
+    """Horário mais antigo que a API ainda pode devolver, para cada marca d'água da série `marcas`."""
+    return (pd.to_datetime(marcas, format='%Y-%m-%d %H:%M:%S')
+            - pd.Timedelta(seconds=janela_api)).dt.strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _extensao_do_lote(codigos, datahoras):
+    """Maior intervalo, em segundos, entre a primeira e a última leitura de uma estação no lote."""
+    if len(datahoras) == 0:
+        return 0
+    tempos = pd.Series(pd.to_datetime(datahoras.to_numpy(), format='%Y-%m-%d %H:%M:%S'), index=codigos.to_numpy())
+    por_estacao = tempos.groupby(level=0)
+    return int((por_estacao.max() - por_estacao.min()).max().total_seconds())
+
+
+def _estado_do_arquivo(df, janela_api=None):
+    """
+    Marca d'água por estação (maior `datahora`) e as leituras de cada uma que a API
+    ainda pode devolver (de `janela_api` segundos antes da marca até ela; todas, se
+    a janela ainda não for conhecida).
+    """
+    marcas, recentes = {}, {}
+    if not df.empty:
+        leituras = pd.DataFrame({'codestacao': df['codestacao'].astype(str), 'datahora': df['datahora'].astype(str),
+                                 'valor': df['valor']}).sort_values(['codestacao', 'datahora'], kind='stable')
+        maiores = leituras.groupby('codestacao', sort=False)['datahora'].max()
+        marcas = dict(zip(maiores.index.tolist(), maiores.tolist()))
+        if janela_api is not None:
+            # Um início de janela por estação (não por linha): converter datas em texto é o passo caro.
+            inicios = _inicio_da_janela(maiores, janela_api)
+            leituras = leituras[(leituras['datahora'] >= leituras['codestacao'].map(inicios)).to_numpy()]
+        # Listas antes do laço: iterar uma coluna de texto do pandas elemento a elemento é lento.
+        for codestacao, datahora, valor in zip(leituras['codestacao'].tolist(), leituras['datahora'].tolist(),
+                                               leituras['valor'].astype(float).tolist()):
+            recentes.setdefault(codestacao, {})[datahora] = None if valor != valor else valor
+    return {'colunas': list(df.columns), 'linhas': len(df), 'marcas': marcas, 'recentes': recentes,
+            'janela_api': janela_api}
+
+
+def _valor_json(valor):
+    return None if pd.isna(valor) else float(valor)
+
+
+def _ler_cabecalho(nome_arquivo):
+    with open(nome_arquivo, encoding='utf-8') as f:
+        return f.readline().strip().split(',')
+
+
+def atualizar_csv_diario(df_novos_dados, nome_arquivo, arquivo_estado=ARQUIVO_ESTADO_INGESTAO):
+    """
+    Grava as leituras novas no arquivo diário de forma incremental.
+
+    Cada estação tem uma marca d'água (a maior `datahora` já gravada), guardada em
+    `arquivo_estado`. Leituras mais novas que a marca são só anexadas ao fim do CSV;
+    repetições idênticas de leituras já gravadas são ignoradas. O arquivo só é
+    reescrito (`compactar_csv_diario`) quando chega uma leitura atrasada ou corrigida.
+    Devolve o número de leituras novas, atrasadas ou corrigidas (0 se só houve repetições).
+
+    Para reconhecer as repetições, o estado guarda as leituras de cada estação desde
+    `janela_api` segundos antes da marca: a maior extensão (da primeira à última
+    leitura de uma estação) já vista em uma resposta da API. Tudo o que a API ainda
+    devolver cai nessa janela, qualquer que seja a frequência das leituras.
+    """
+    estado = _carregar_estado(arquivo_estado)
+    existe = os.path.exists(nome_arquivo) and os.path.getsize(nome_arquivo) > 0
+    estado_arquivo = estado.get(nome_arquivo) if existe else None
+
+    if existe and estado_arquivo is None:
+        # Primeira execução sem estado: lê o arquivo uma única vez para montar as marcas.
+        print(f"Montando marcas d'água a partir de '{nome_arquivo}'...")
+        estado_arquivo = _estado_do_arquivo(pd.read_csv(nome_arquivo))
+
+    df_novos = df_novos_dados.drop_duplicates(subset=['codestacao', 'datahora'], keep='last')
+    codigos = df_novos['codestacao'].astype(str)
+    datahoras = df_novos['datahora'].astype(str)
+    janela_api = max((estado_arquivo or {}).get('janela_api') or 0, _extensao_do_lote(codigos, datahoras))
+    if estado_arquivo is None or set(df_novos.columns) != set(estado_arquivo['colunas']):
+        if estado_arquivo is not None:
+            print("Colunas diferentes das do arquivo existente. Reescrevendo o arquivo.")
+        estado[nome_arquivo] = _estado_do_arquivo(compactar_csv_diario(df_novos, nome_arquivo), janela_api)
+        _salvar_estado(estado, arquivo_estado)
+        return len(df_novos)
+
+    marcas, recentes = estado_arquivo['marcas'], estado_arquivo['recentes']
+    marca_da_linha = codigos.map(marcas).fillna('')
+    eh_nova = datahoras > marca_da_linha
+
+    atrasadas = 0
+    for codestacao, datahora, valor in zip(codigos[~eh_nova].tolist(), datahoras[~eh_nova].tolist(),
+                                           df_novos.loc[~eh_nova, 'valor'].tolist()):
+        conhecidas = recentes.get(codestacao, {})
+        if datahora not in conhecidas or conhecidas[datahora] != _valor_json(valor):
+            atrasadas += 1
+
+    if atrasadas:
+        print(f"{atrasadas} leitura(s) atrasada(s) ou corrigida(s). Compactando o arquivo...")
+        estado[nome_arquivo] = _estado_do_arquivo(compactar_csv_diario(df_novos, nome_arquivo), janela_api)
+        _salvar_estado(estado, arquivo_estado)
+        return atrasadas + int(eh_nova.sum())
+
+    df_anexar = df_novos[eh_nova.to_numpy()]
+    num_ignoradas = len(df_novos_dados) - len(df_anexar)
+    if num_ignoradas > 0:
+        print(f"{num_ignoradas} linha(s) já existente(s) foram ignoradas.")
+    if df_anexar.empty:
+        print(f"Nenhuma leitura nova para '{nome_arquivo}'.")
+        estado_arquivo['janela_api'] = janela_api
+        estado[nome_arquivo] = estado_arquivo
+        _salvar_estado(estado, arquivo_estado)
+        return 0
+
+    colunas = _ler_cabecalho(nome_arquivo)
+    tamanho_antes = os.path.getsize(nome_arquivo)
+    df_anexar.to_csv(nome_arquivo, mode='a', header=False, index=False, columns=colunas)
+    indice = _ler_indice(nome_arquivo)
+    if indice is None or indice['tamanho'] != tamanho_antes:
+        _gravar_indice(nome_arquivo)
+    else:
+        datahoras = df_anexar['datahora'].astype(str)
+        _gravar_indice(nome_arquivo, anexar_bloco(indice, tamanho_antes, os.path.getsize(nome_arquivo),
+                                                  datahoras.min(), datahoras.max()))
+
+    anexadas = df_anexar.sort_values('datahora', kind='stable')
+    codigos_anexados = anexadas['codestacao'].astype(str)
+    for codestacao, datahora, valor in zip(codigos_anexados.tolist(), anexadas['datahora'].astype(str).tolist(),
+                                           anexadas['valor'].tolist()):
+        recentes.setdefault(codestacao, {})[datahora] = _valor_json(valor)
+    estacoes_anexadas = codigos_anexados.unique().tolist()
+    for codestacao in estacoes_anexadas:
+        marcas[codestacao] = max(recentes[codestacao])
+    inicios = _inicio_da_janela(pd.Series([marcas[c] for c in estacoes_anexadas], dtype=object), janela_api)
+    for codestacao, inicio in zip(estacoes_anexadas, inicios.tolist()):
+        recentes[codestacao] = {dh: v for dh, v in recentes[codestacao].items() if dh >= inicio}
+    estado_arquivo['linhas'] += len(df_anexar)
+    estado_arquivo['janela_api'] = janela_api
+    estado[nome_arquivo] = estado_arquivo
+    _salvar_estado(estado, arquivo_estado)
+    print(f"✅ {len(df_anexar)} registro(s) anexado(s) a '{nome_arquivo}'. Total de {estado_arquivo['linhas']} registros.")
+    return len(df_anexar)
+
+
+@functools.lru_cache(maxsize=1)
+def _serie_mare_ajustada(arquivo_mare, arquivo_constituintes, modificados_em):
+    return SerieMare.de_csv(arquivo_mare).com_harmonica(arquivo_constituintes=arquivo_constituintes)
+
+
+def _modificado_em(caminho):
+    return os.path.getmtime(caminho) if os.path.exists(caminho) else None
+
+
+def carregar_serie_mare(arquivo_mare=ARQUIVO_MARE, arquivo_constituintes=ARQUIVO_CONSTITUINTES):
+    """
+    Série de maré com o modelo harmônico das constantes gravadas (ajustado à tabela só
+    se o arquivo de constantes não existir), reaproveitada entre chamadas (a ingestão
+    contínua publica o risco a cada ciclo) enquanto nenhum dos dois arquivos mudar.
+    """
+    return _serie_mare_ajustada(arquivo_mare, arquivo_constituintes,
+                                (_modificado_em(arquivo_mare), _modificado_em(arquivo_constituintes)))
+
+
+def publicar_risco_diario(datas, prefixo_chuva=PREFIXO_ARQUIVO_CHUVA, arquivo_mare=ARQUIVO_MARE,
+                          diretorio_risco=DIRETORIO_RISCO, arquivo_constituintes=ARQUIVO_CONSTITUINTES):
+    """
+    Calcula a tabela de risco (VP, AM, nível e classificação por estação e hora) de cada
+    data a partir dos arquivos diários locais e grava em `risco/risco_recife_<data>.csv`.
+    O painel lê essas tabelas prontas em vez de refazer o cálculo a cada sessão.
+    """
+    with etapa('carregar_mare') as m:
+        serie_mare = carregar_serie_mare(arquivo_mare, arquivo_constituintes)
+        m['linhas'] = len(serie_mare.alturas)
+    with etapa('carregar_chuva', dias=len(datas)) as m:
+        df_chuva = carregar_chuva_periodo(datas, url_base=prefixo_chuva, ultima_data=max(datas))
+        m['linhas'] = len(df_chuva)
+    if df_chuva.empty:
+        print("Nenhum dado de chuva local para calcular o risco.")
+        return
+    estacoes = df_chuva['nomeEstacao'].dropna().unique()
+    with etapa('processar_vp') as m:
+        df_vp = processar_dados_chuva_simplificado(df_chuva, datas, estacoes, incluir_horas_anteriores=True)
+        m['linhas'] = len(df_vp)
+    with etapa('analise_risco') as m:
+        df_risco = executar_analise_risco_completa(df_vp, serie_mare)
+        m['linhas'] = len(df_risco)
+    if df_risco.empty:
+        print("Nenhuma linha de risco calculada.")
+        return
+    os.makedirs(diretorio_risco, exist_ok=True)
+    with etapa('gravar_tabelas_risco', linhas=len(df_risco)):
+        for data, grupo in df_risco.groupby('data'):
+            nome_arquivo = os.path.join(diretorio_risco, f"risco_recife_{data}.csv")
+            grupo[COLUNAS_TABELA_RISCO].to_csv(nome_arquivo, index=False)
+            print(f"✅ Tabela de risco '{nome_arquivo}' salva com {len(grupo)} linhas.")
+
+
+class LimitadorTaxa:
+    """Espaça as requisições de todas as threads: no máximo `por_segundo` inícios por segundo."""
+
+    def __init__(self, por_segundo=REQUISICOES_POR_SEGUNDO):
+        self.intervalo = 1.0 / por_segundo if por_segundo and por_segundo > 0 else 0.0
+        self._proxima = time.monotonic()
+        self._trava = threading.Lock()
+
+    def aguardar(self):
+        with self._trava:
+            agora = time.monotonic()
+            espera = self._proxima - agora
+            self._proxima = max(agora, self._proxima) + self.intervalo
+        if espera > 0:
+            time.sleep(espera)
+
+
+def janelas_backfill(data_inicio, data_fim, horas=JANELA_BACKFILL_HORAS):
+    """Divide o período local [data_inicio 00:00, data_fim + 1 dia) em janelas de `horas`."""
+    inicio = datetime.strptime(data_inicio, '%Y-%m-%d')
+    fim = datetime.strptime(data_fim, '%Y-%m-%d') + timedelta(days=1)
+    janelas = []
+    while inicio < fim:
+        proximo = min(inicio + timedelta(hours=horas), fim)
+        janelas.append((inicio, proximo))
+        inicio = proximo
+    return janelas
+
+
+def _horario_api(horario_local):
+    """Horário local de Recife -> texto AAAAMMDDHHMM em UTC, como a API espera."""
+    return timezone('America/Recife').localize(horario_local).astimezone(utc).strftime('%Y%m%d%H%M')
+
+
+def _chave_tarefa(codestacao, inicio, fim):
+    return f"{codestacao}|{inicio:%Y-%m-%dT%H:%M}|{fim:%Y-%m-%dT%H:%M}"
+
+
+def _carregar_checkpoint(arquivo_checkpoint):
+    if not os.path.exists(arquivo_checkpoint):
+        return set()
+    try:
+        with open(arquivo_checkpoint, encoding='utf-8') as f:
+            return set(json.load(f).get('concluidas', []))
+    except (OSError, ValueError):
+        print(f"⚠️ Checkpoint '{arquivo_checkpoint}' ilegível. O backfill recomeça do início.", file=sys.stderr)
+        return set()
+
+
+def _salvar_checkpoint(concluidas, arquivo_checkpoint):
+    temporario = f"{arquivo_checkpoint}.tmp"
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump({'concluidas': sorted(concluidas)}, f, indent=1)
+    os.replace(temporario, arquivo_checkpoint)
+
+
+def gravar_leituras_por_dia(df_leituras, prefixo_chuva=PREFIXO_ARQUIVO_CHUVA, arquivo_estado=ARQUIVO_ESTADO_INGESTAO,
+                            diretorio_historico=historico.DIRETORIO_HISTORICO):
+    """
+    Grava leituras de datas passadas no arquivo diário da data de cada leitura e no
+    histórico colunar, sem duplicar o que já existe. Os arquivos diários reescritos
+    perdem a marca d'água e são relidos na próxima gravação incremental.
+    """
+    if df_leituras.empty:
+        return 0
+    arquivos = []
+    for dia, grupo in df_leituras.groupby(df_leituras['datahora'].str[:10], sort=True):
+        nome_arquivo = f"{prefixo_chuva}{dia}.csv"
+        compactar_csv_diario(grupo, nome_arquivo)
+        arquivos.append(nome_arquivo)
+    estado = _carregar_estado(arquivo_estado)
+    if any(nome in estado for nome in arquivos):
+        for nome in arquivos:
+            estado.pop(nome, None)
+        _salvar_estado(estado, arquivo_estado)
+    historico.compactar_leituras(df_leituras, diretorio_historico)
+    return len(arquivos)
+
+
+def executar_backfill(token, lista_estacoes, data_inicio, data_fim, horas=JANELA_BACKFILL_HORAS,
+                      max_simultaneas=MAX_REQUISICOES_SIMULTANEAS, por_segundo=REQUISICOES_POR_SEGUNDO,
+                      arquivo_checkpoint=ARQUIVO_CHECKPOINT_BACKFILL, uf='PE', rede='11', sensor='10',
+                      timeout=TIMEOUT_REQUISICAO, sessao=None, url_base=URL_DADOS_PERIODO,
+                      gravar=gravar_leituras_por_dia):
+    """
+    Recupera as leituras de [data_inicio, data_fim] (datas locais) estação por estação,
+    em janelas de `horas`, com até `max_simultaneas` requisições em paralelo e no máximo
+    `por_segundo` requisições por segundo.
+
+    As tarefas de uma janela são gravadas juntas (`gravar`) assim que todas terminam, e
+    só então entram no checkpoint; uma execução interrompida recomeça das tarefas que
+    faltam. Tarefas que falharam ficam fora do checkpoint e são tentadas de novo na
+    próxima execução. Devolve (tarefas concluídas, tarefas com falha, leituras gravadas).
+    """
+    if not token:
+        print("❌ Token de acesso não fornecido.", file=sys.stderr)
+        return 0, 0, 0
+    concluidas = _carregar_checkpoint(arquivo_checkpoint)
+    janelas = janelas_backfill(data_inicio, data_fim, horas)
+    pendentes = [(codestacao, inicio, fim) for inicio, fim in janelas for codestacao in lista_estacoes
+                 if _chave_tarefa(codestacao, inicio, fim) not in concluidas]
+    total = len(janelas) * len(lista_estacoes)
+    print(f"\nBackfill de {data_inicio} a {data_fim}: {total} tarefa(s), {total - len(pendentes)} já concluída(s).")
+    if not pendentes:
+        return 0, 0, 0
+
+    headers = {'token': token}
+    limitador = LimitadorTaxa(por_segundo)
+    sessao_propria = sessao is None
+    if sessao_propria:
+        sessao = criar_sessao(max_conexoes=max_simultaneas)
+
+    def tarefa(tarefa_backfill):
+        codestacao, inicio, fim = tarefa_backfill
+        params = {'codestacao': codestacao, 'uf': uf, 'rede': rede, 'sensor': sensor,
+                  'inicio': _horario_api(inicio), 'fim': _horario_api(fim), 'formato': 'JSON'}
+        limitador.aguardar()
+        return _buscar_estacao(sessao, url_base, headers, params, timeout)
+
+    feitas, falhas, gravadas = 0, 0, 0
+    lote, chaves_lote, janela_atual = [], [], None
+
+    def fechar_janela():
+        nonlocal gravadas
+        if lote:
+            df_janela = _converter_fuso_recife(pd.concat(lote, ignore_index=True))
+            df_janela = df_janela.drop_duplicates(subset=['codestacao', 'datahora'], keep='last')
+            gravar(df_janela)
+            gravadas += len(df_janela)
+        concluidas.update(chaves_lote)
+        _salvar_checkpoint(concluidas, arquivo_checkpoint)
+        print(f"✅ Janela {janela_atual[0]:%Y-%m-%d %H:%M} concluída "
+              f"({feitas + falhas}/{len(pendentes)} tarefas, {gravadas} leituras gravadas).")
+        lote.clear()
+        chaves_lote.clear()
+
+    executor = ThreadPoolExecutor(max_workers=max(1, max_simultaneas))
+    try:
+        for (codestacao, inicio, fim), (df_estacao, _) in zip(pendentes, executor.map(tarefa, pendentes)):
+            if janela_atual is not None and (inicio, fim) != janela_atual:
+                fechar_janela()
+            janela_atual = (inicio, fim)
+            if df_estacao is None:
+                falhas += 1
+                continue
+            feitas += 1
+            chaves_lote.append(_chave_tarefa(codestacao, inicio, fim))
+            if not df_estacao.empty:
+                lote.append(df_estacao)
+        fechar_janela()
+    except KeyboardInterrupt:
+        print("\n⚠️ Backfill interrompido. Execute de novo para continuar de onde parou.", file=sys.stderr)
+        raise
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+        if sessao_propria:
+            sessao.close()
+
+    if falhas:
+        print(f"⚠️ {falhas} tarefa(s) falharam e serão tentadas de novo na próxima execução.", file=sys.stderr)
+    return feitas, falhas, gravadas
 
 
 def main():
-    """Função principal que orquestra todo o processo."""
-    
+    """
+    Função principal que orquestra todo o processo.
+
+    Sem argumentos, busca as leituras recentes (execução do cron). Com
+    `--backfill INICIO FIM`, recupera as leituras dos dias do período. Com
+    `--continuo`, repete a busca a cada `--intervalo` segundos e grava cada leitura
+    nova primeiro no banco local do painel (`leituras_ao_vivo`).
+    Com RISCO_METRICAS=<arquivo> cada etapa é gravada em linhas JSON; com
+    RISCO_PERFIL=<arquivo.pstats> a execução inteira passa pelo cProfile.
+    """
+    parser = argparse.ArgumentParser(description="Busca as leituras de chuva do CEMADEN e atualiza os arquivos diários.")
+    parser.add_argument('--backfill', nargs=2, metavar=('INICIO', 'FIM'),
+                        help="Recupera as leituras de um período passado (datas AAAA-MM-DD).")
+    parser.add_argument('--estacoes', nargs='+', help="Códigos das estações do backfill (padrão: as monitoradas).")
+    parser.add_argument('--janela-horas', type=int, default=JANELA_BACKFILL_HORAS, help="Tamanho de cada consulta do backfill.")
+    parser.add_argument('--taxa', type=float, default=REQUISICOES_POR_SEGUNDO, help="Máximo de requisições por segundo.")
+    parser.add_argument('--checkpoint', default=ARQUIVO_CHECKPOINT_BACKFILL, help="Arquivo de progresso do backfill.")
+    parser.add_argument('--continuo', action='store_true',
+                        help="Busca as leituras sem parar e as grava no banco local lido pelo painel.")
+    parser.add_argument('--intervalo', type=float, default=INTERVALO_CONTINUO_SEGUNDOS,
+                        help="Segundos entre as buscas da ingestão contínua.")
+    parser.add_argument('--banco', default=leituras_ao_vivo.ARQUIVO_BANCO_LEITURAS,
+                        help="Banco SQLite das leituras ao vivo (ingestão contínua).")
+    args = parser.parse_args()
+
+    with perfilar(os.getenv('RISCO_PERFIL')):
+        if args.backfill:
+            with etapa('backfill_total'):
+                _executar_backfill(args)
+        elif args.continuo:
+            _executar_continuo(args)
+        else:
+            with etapa('ingestao_total'):
+                _executar_ingestao()
+
+
+def _executar_backfill(args):
+    data_inicio, data_fim = args.backfill
+    try:
+        datas = [d.strftime('%Y-%m-%d') for d in pd.date_range(data_inicio, data_fim, freq='D')]
+    except ValueError as e:
+        print(f"❌ Período inválido: {e}", file=sys.stderr)
+        sys.exit(1)
+    if not datas:
+        print("❌ A data final é anterior à inicial.", file=sys.stderr)
+        sys.exit(1)
+
+    with criar_sessao() as sessao:
+        token_acesso = obter_token(os.getenv("CEMADEN_EMAIL"), os.getenv("CEMADEN_SENHA"), sessao=sessao)
+        if not token_acesso:
+            print("Falha ao obter token do Cemaden, finalizando a execução.")
+            sys.exit(1)
+        estacoes = args.estacoes or RegistroEstacoes.de_csv(ARQUIVO_ESTACOES).codigos(monitoradas=True)
+
+        with etapa('backfill', estacoes=len(estacoes), dias=len(datas)) as m:
+            feitas, falhas, gravadas = executar_backfill(token_acesso, estacoes, data_inicio, data_fim, horas=args.janela_horas,
+                                                         por_segundo=args.taxa, arquivo_checkpoint=args.checkpoint, sessao=sessao)
+            m.update(tarefas=feitas, falhas=falhas, linhas=gravadas)
+    if gravadas:
+        try:
+            with etapa('publicar_risco_diario', dias=len(datas)):
+                publicar_risco_diario(datas)
+        except (OSError, ValueError) as e:
+            print(f"❌ Erro ao calcular a tabela de risco: {e}", file=sys.stderr)
+    if falhas:
+        sys.exit(1)
+
+
+def _executar_continuo(args):
+    sessao = criar_sessao()
+    print(f"Ingestão contínua a cada {args.intervalo:g}s, gravando em '{args.banco}'. Ctrl+C para parar.")
+    try:
+        while True:
+            inicio = time.monotonic()
+            try:
+                with etapa('ingestao_total', continuo=True):
+                    _executar_ingestao(sessao=sessao, banco=args.banco)
+            except Exception as e:
+                # Um ciclo com erro não derruba a ingestão: a próxima busca tenta de novo.
+                print(f"❌ Erro no ciclo de ingestão: {e}", file=sys.stderr)
+            time.sleep(max(0.0, args.intervalo - (time.monotonic() - inicio)))
+    except KeyboardInterrupt:
+        print("Ingestão contínua encerrada.")
+    finally:
+        sessao.close()
+
+
+def _executar_ingestao(sessao=None, banco=None):
+    if sessao is None:
+        with criar_sessao() as sessao:
+            return _executar_ingestao(sessao, banco)
     cemaden_email = os.getenv("CEMADEN_EMAIL")
     cemaden_senha = os.getenv("CEMADEN_SENHA")
     
-    token_acesso = obter_token(cemaden_email, cemaden_senha)
+    with etapa('obter_token'):
+        token_acesso = obter_token(cemaden_email, cemaden_senha, sessao=sessao)
     
     if token_acesso:
-        estacoes_de_recife = [
-            '261160614A', '261160609A', '261160623A', '261160618A', '261160603A'
-        ]
-        
-        df_chuva_recente = buscar_dados_cemaden(token_acesso, estacoes_de_recife)
+        registro = RegistroEstacoes.de_csv(ARQUIVO_ESTACOES)
+
+        with etapa('buscar_dados_regiao') as m:
+            df_chuva_recente = buscar_dados_regiao(token_acesso, sessao=sessao)
+            m['linhas'] = len(df_chuva_recente)
+        if df_chuva_recente.empty:
+            # Sem resposta da consulta por UF: uma requisição por estação monitorada.
+            estacoes_monitoradas = registro.codigos(monitoradas=True)
+            print("⚠️ A busca por município não trouxe dados. Consultando estação por estação...")
+            with etapa('buscar_dados_cemaden', estacoes=len(estacoes_monitoradas)) as m:
+                df_chuva_recente = buscar_dados_cemaden(token_acesso, estacoes_monitoradas, sessao=sessao)
+                m['linhas'] = len(df_chuva_recente)
+
+        alteradas = registro.atualizar(df_chuva_recente)
+        if alteradas:
+            registro.para_csv(ARQUIVO_ESTACOES)
+            print(f"✅ Cadastro de estações atualizado ({alteradas} estação(ões) nova(s) ou alterada(s)).")
+
+        if not df_chuva_recente.empty and banco:
+            # Primeiro o banco local: o painel na mesma máquina vê a leitura em segundos.
+            try:
+                with etapa('gravar_banco_ao_vivo', linhas=len(df_chuva_recente)) as m:
+                    m['gravadas'], m['versao'] = leituras_ao_vivo.gravar_leituras(df_chuva_recente, banco)
+                print(f"✅ {m['gravadas']} leitura(s) nova(s) ou corrigida(s) no banco '{banco}'.")
+            except sqlite3.Error as e:
+                print(f"❌ Erro ao gravar no banco '{banco}': {e}", file=sys.stderr)
 
         if not df_chuva_recente.empty:
             tz_recife = timezone('America/Recife')
             agora_em_recife = datetime.now(tz_recife)
             data_hoje = agora_em_recife.strftime('%Y-%m-%d')
             
-            nome_arquivo_diario = f"chuva_recife_{data_hoje}.csv"
-            atualizar_csv_diario(df_chuva_recente, nome_arquivo_diario)
+            nome_arquivo_diario = f"{PREFIXO_ARQUIVO_CHUVA}{data_hoje}.csv"
+            with etapa('atualizar_csv_diario', linhas=len(df_chuva_recente)) as m:
+                m['novas'] = atualizar_csv_diario(df_chuva_recente, nome_arquivo_diario)
+            if not m['novas']:
+                # Só repetições: as tabelas de risco publicadas continuam valendo.
+                return
+
+            # Ontem também: as últimas leituras do dia anterior chegam no arquivo de hoje.
+            ontem = (agora_em_recife - timedelta(days=1)).strftime('%Y-%m-%d')
+            try:
+                with etapa('publicar_risco_diario', dias=2):
+                    publicar_risco_diario([ontem, data_hoje])
+            except (OSError, ValueError) as e:
+                print(f"❌ Erro ao calcular a tabela de risco: {e}", file=sys.stderr)
         else:
             print("Nenhum dado novo foi retornado pela API.")
     else:
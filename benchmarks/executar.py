@@ -0,0 +1,204 @@
+# Arquivo: benchmarks/executar.py
+"""
+Benchmark de ponta a ponta do pipeline com dados sintéticos.
+
+Mede tempo (melhor de N repetições) e pico de memória (tracemalloc) de cada etapa:
+
+    buscar_dados_cemaden            contra um servidor HTTP local que imita o CEMADEN
+    atualizar_csv_diario            criação do arquivo do dia + execuções de 5 em 5 minutos
+    processar_dados_chuva           VP de N estações x M dias
+    analise_risco                   executar_analise_risco_completa / calcular_risco
+    gerar_diagramas                 construção das figuras Plotly de um dia (sem Streamlit)
+
+e compara com `baseline.json`. Uso:
+
+    python benchmarks/executar.py                      # roda e compara com a linha de base
+    python benchmarks/executar.py --salvar-baseline    # grava os tempos atuais como linha de base
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import threading
+import tracemalloc
+import http.server
+import contextlib
+import io
+from urllib.parse import urlparse, parse_qs
+
+import pandas as pd
+
+DIRETORIO_BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(DIRETORIO_BENCHMARKS))
+
+import gerador  # noqa: E402
+import atualizar_dados  # noqa: E402
+from mare import SerieMare  # noqa: E402
+from processamento import (processar_dados_chuva_simplificado, processar_dados_chuva_por_estacao,  # noqa: E402
+                           executar_analise_risco_completa)
+
+ARQUIVO_BASELINE = os.path.join(DIRETORIO_BENCHMARKS, 'baseline.json')
+TOLERANCIA_PADRAO = 1.5  # regressão = mais de 50% acima da linha de base
+
+
+class _ServidorCemaden(http.server.BaseHTTPRequestHandler):
+    """Imita `pcds-dados-recentes`: devolve as leituras da estação pedida, com latência fixa."""
+    protocol_version = 'HTTP/1.1'
+    leituras_por_estacao = {}
+    latencia = 0.02
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        codestacao = parse_qs(urlparse(self.path).query).get('codestacao', [''])[0]
+        time.sleep(self.latencia)
+        corpo = self.leituras_por_estacao.get(codestacao, b'[]')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+
+@contextlib.contextmanager
+def servidor_cemaden(df_chuva):
+    """Sobe o servidor falso em uma porta livre com as últimas leituras de cada estação."""
+    ultimas = df_chuva.groupby('codestacao').tail(12)
+    ultimas = ultimas.assign(datahora=pd.to_datetime(ultimas['datahora']).dt.strftime('%Y-%m-%dT%H:%M:%S'))
+    _ServidorCemaden.leituras_por_estacao = {
+        codigo: grupo.to_json(orient='records').encode('utf-8') for codigo, grupo in ultimas.groupby('codestacao')
+    }
+    servidor = http.server.ThreadingHTTPServer(('127.0.0.1', 0), _ServidorCemaden)
+    thread = threading.Thread(target=servidor.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f'http://127.0.0.1:{servidor.server_port}/pcds-dados-recentes'
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
+
+
+def medir(funcao, repeticoes):
+    """Executa `funcao` várias vezes; devolve (melhor tempo em s, pico de memória em MB, resultado)."""
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempos.append(time.perf_counter() - inicio)
+    tracemalloc.start()
+    funcao()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(tempos), pico / 1024 / 1024, resultado
+
+
+def executar(n_estacoes, n_dias, repeticoes):
+    df_csv = gerador.gerar_chuva(n_estacoes, n_dias)
+    df_chuva = gerador.para_formato_painel(df_csv)
+    serie_mare = SerieMare.de_dataframe(gerador.gerar_mare())
+    datas = sorted(df_chuva['datahora'].dt.strftime('%Y-%m-%d').unique())
+    estacoes = sorted(df_chuva['nomeEstacao'].unique())
+    resultados = {}
+    silencioso = contextlib.redirect_stdout(io.StringIO())
+
+    with servidor_cemaden(df_csv) as url, silencioso:
+        codigos = sorted(df_csv['codestacao'].unique())
+        resultados['buscar_dados_cemaden'] = medir(
+            lambda: atualizar_dados.buscar_dados_cemaden('token', codigos, url_base=url), repeticoes)
+
+    ultimo_dia = df_csv[df_csv['datahora'] >= datas[-1]]
+    horarios = sorted(ultimo_dia['datahora'].unique())
+    inicio_do_dia, execucoes = ultimo_dia[ultimo_dia['datahora'] < horarios[-6]], [
+        ultimo_dia[ultimo_dia['datahora'] == h] for h in horarios[-6:]]
+
+    def gravar_dia():
+        with tempfile.TemporaryDirectory() as pasta:
+            arquivo, estado = os.path.join(pasta, 'chuva.csv'), os.path.join(pasta, 'estado.json')
+            atualizar_dados.atualizar_csv_diario(inicio_do_dia, arquivo, arquivo_estado=estado)
+            for lote in execucoes:
+                atualizar_dados.atualizar_csv_diario(lote, arquivo, arquivo_estado=estado)
+
+    with silencioso:
+        resultados['atualizar_csv_diario'] = medir(gravar_dia, repeticoes)
+
+    resultados['processar_dados_chuva'] = medir(
+        lambda: processar_dados_chuva_simplificado(df_chuva, datas, estacoes), repeticoes)
+    df_vp = resultados['processar_dados_chuva'][2]
+    resultados['analise_risco'] = medir(lambda: executar_analise_risco_completa(df_vp, serie_mare), repeticoes)
+    df_risco = resultados['analise_risco'][2]
+
+    # O painel desenha um dia por vez: mede as figuras do último dia, uma por estação.
+    # A construção das figuras fica no painel; o import do Streamlit não entra na medição.
+    with contextlib.redirect_stderr(io.StringIO()):
+        import risco_hoje
+    df_risco_dia = df_risco[df_risco['data'] == datas[-1]]
+    resultados['gerar_diagramas'] = medir(
+        lambda: [risco_hoje.construir_diagrama(g, e) for e, g in df_risco_dia.groupby('nomeEstacao')],
+        repeticoes)
+
+    # Conferência: o motor vetorizado tem que bater com a implementação de referência.
+    amostra = estacoes[:5]
+    referencia = processar_dados_chuva_por_estacao(df_chuva, datas, amostra).reset_index(drop=True)
+    vetorizado = processar_dados_chuva_simplificado(df_chuva, datas, amostra)
+    pd.testing.assert_frame_equal(referencia, vetorizado[referencia.columns], check_exact=False, atol=1e-9)
+
+    return {etapa: {'segundos': round(t, 4), 'pico_mb': round(m, 2)} for etapa, (t, m, _) in resultados.items()}
+
+
+def comparar(atual, baseline, tolerancia):
+    """Imprime a comparação por etapa e devolve as etapas que regrediram."""
+    regressoes = []
+    print(f"{'etapa':<24}{'tempo (s)':>12}{'baseline':>12}{'razão':>8}{'pico (MB)':>12}")
+    for etapa, medidas in atual.items():
+        referencia = baseline.get(etapa)
+        razao = medidas['segundos'] / referencia['segundos'] if referencia and referencia['segundos'] else float('nan')
+        marca = ''
+        if referencia and razao > tolerancia:
+            regressoes.append(etapa)
+            marca = '  ❌ regressão'
+        base_txt = f"{referencia['segundos']:.4f}" if referencia else '-'
+        print(f"{etapa:<24}{medidas['segundos']:>12.4f}{base_txt:>12}{razao:>8.2f}{medidas['pico_mb']:>12.2f}{marca}")
+    return regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de ponta a ponta do pipeline de risco.")
+    parser.add_argument('--estacoes', type=int, default=50)
+    parser.add_argument('--dias', type=int, default=7)
+    parser.add_argument('--repeticoes', type=int, default=3)
+    parser.add_argument('--tolerancia', type=float, default=TOLERANCIA_PADRAO,
+                        help="Razão tempo/baseline acima da qual a etapa é considerada regressão.")
+    parser.add_argument('--baseline', default=ARQUIVO_BASELINE)
+    parser.add_argument('--salvar-baseline', action='store_true')
+    args = parser.parse_args()
+
+    configuracao = f'{args.estacoes}x{args.dias}'
+    print(f"Benchmark com {args.estacoes} estações x {args.dias} dias ({args.repeticoes} repetições)...")
+    atual = executar(args.estacoes, args.dias, args.repeticoes)
+
+    baselines = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as f:
+            baselines = json.load(f)
+
+    if args.salvar_baseline:
+        baselines[configuracao] = atual
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(baselines, f, indent=2, ensure_ascii=False, sort_keys=True)
+        comparar(atual, {}, args.tolerancia)
+        print(f"✅ Linha de base '{configuracao}' salva em '{args.baseline}'.")
+        return
+
+    regressoes = comparar(atual, baselines.get(configuracao, {}), args.tolerancia)
+    if configuracao not in baselines:
+        print(f"⚠️ Não há linha de base para '{configuracao}'. Rode com --salvar-baseline.")
+    if regressoes:
+        print(f"❌ Regressão em: {', '.join(regressoes)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
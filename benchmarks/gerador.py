@@ -0,0 +1,79 @@
+# Arquivo: benchmarks/gerador.py
+"""
+Gerador de dados sintéticos para os benchmarks: chuva no esquema dos arquivos
+`chuva_recife_<data>.csv` (N estações x M dias, leituras de 10 em 10 minutos) e
+uma série horária de maré.
+"""
+import numpy as np
+import pandas as pd
+
+COLUNAS_CSV_CHUVA = ['cidade', 'codestacao', 'datahora', 'id_sensor', 'latitude', 'longitude',
+                     'nome', 'offset', 'qualificacao', 'uf', 'valor']
+
+
+def gerar_estacoes(n_estacoes, semente=0):
+    """Estações fictícias espalhadas pela região metropolitana do Recife."""
+    rng = np.random.default_rng(semente)
+    return pd.DataFrame({
+        'codestacao': [f'261{i:06d}A' for i in range(n_estacoes)],
+        'nome': [f'Estação {i:03d}' for i in range(n_estacoes)],
+        'latitude': np.round(-8.05 + rng.normal(0, 0.05, n_estacoes), 6),
+        'longitude': np.round(-34.9 + rng.normal(0, 0.05, n_estacoes), 6),
+    })
+
+
+def gerar_chuva(n_estacoes, n_dias, inicio='2025-10-01', semente=0, fracao_ausente=0.05):
+    """
+    Leituras de 10 em 10 minutos com eventos de chuva: na maior parte do tempo zero,
+    com pancadas (intensidade gama) que duram de 30 min a 3h e atingem estações próximas.
+    Uma fração das leituras é descartada para imitar falhas de transmissão.
+    """
+    rng = np.random.default_rng(semente)
+    estacoes = gerar_estacoes(n_estacoes, semente)
+    horarios = pd.date_range(inicio, periods=n_dias * 144, freq='10min')
+    n_horarios = len(horarios)
+
+    chuva = np.zeros((n_estacoes, n_horarios))
+    for _ in range(max(1, n_dias * 3)):
+        comeco = rng.integers(0, n_horarios)
+        duracao = rng.integers(3, 19)
+        atingidas = rng.random(n_estacoes) < rng.uniform(0.2, 0.9)
+        intensidade = rng.gamma(1.5, 1.2, size=(atingidas.sum(), duracao))
+        fim = min(comeco + duracao, n_horarios)
+        chuva[atingidas, comeco:fim] += intensidade[:, :fim - comeco]
+    chuva = np.round(chuva, 2)
+
+    indice_estacao = np.repeat(np.arange(n_estacoes), n_horarios)
+    presentes = rng.random(len(indice_estacao)) >= fracao_ausente
+    indice_estacao = indice_estacao[presentes]
+    datahora = np.tile(horarios.values, n_estacoes)[presentes]
+    df = pd.DataFrame({
+        'cidade': 'RECIFE',
+        'codestacao': estacoes['codestacao'].to_numpy()[indice_estacao],
+        'datahora': pd.to_datetime(datahora).strftime('%Y-%m-%d %H:%M:%S'),
+        'id_sensor': 10,
+        'latitude': estacoes['latitude'].to_numpy()[indice_estacao],
+        'longitude': estacoes['longitude'].to_numpy()[indice_estacao],
+        'nome': estacoes['nome'].to_numpy()[indice_estacao],
+        'offset': np.nan,
+        'qualificacao': 0,
+        'uf': 'PE',
+        'valor': chuva.ravel()[presentes],
+    })
+    return df[COLUNAS_CSV_CHUVA].sort_values('datahora', kind='stable').reset_index(drop=True)
+
+
+def gerar_mare(inicio='2025-01-01', n_dias=365):
+    """Maré horária (`datahora`, `altura`) com as componentes M2, S2, K1 e O1."""
+    horarios = pd.date_range(inicio, periods=n_dias * 24, freq='h')
+    t = (horarios - pd.Timestamp('2025-01-01')).total_seconds().to_numpy() / 3600
+    componentes = [(0.95, 12.4206012, 0.3), (0.35, 12.0, 1.1), (0.12, 23.9344697, 2.0), (0.08, 25.8193417, 0.7)]
+    altura = 1.3 + sum(a * np.cos(2 * np.pi * t / periodo + fase) for a, periodo, fase in componentes)
+    return pd.DataFrame({'datahora': horarios.strftime('%Y-%m-%d %H:%M:%S'), 'altura': np.round(altura, 2)})
+
+
+def para_formato_painel(df_chuva):
+    """Renomeia as colunas como o painel faz depois de ler o CSV."""
+    df = df_chuva.rename(columns={'nome': 'nomeEstacao', 'valor': 'valorMedida'})
+    df['datahora'] = pd.to_datetime(df['datahora'])
+    return df
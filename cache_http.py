@@ -0,0 +1,229 @@
+# Arquivo: cache_http.py
+"""
+Download com cache em disco e revalidação condicional (ETag / If-Modified-Since).
+
+Cada URL baixada fica em `<diretório>/<sha256 da url>.dat`, com os cabeçalhos de
+validação em um `.json` ao lado. Nas próximas leituras o servidor é consultado com
+If-None-Match / If-Modified-Since e, se responder 304, o corpo vem do disco. Arquivos
+marcados como imutáveis (dias que já fecharam) nem são revalidados. Quando o cache
+passa do tamanho máximo, os arquivos usados há mais tempo são apagados. Trechos de um
+arquivo (`baixar_trecho`, HTTP Range) são guardados à parte, um por intervalo de bytes.
+"""
+import os
+import sys
+import json
+import time
+import hashlib
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from instrumentacao import registrar
+
+DIRETORIO_CACHE = os.getenv('RISCO_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'diagramas-risco'))
+TAMANHO_MAXIMO_CACHE = int(os.getenv('RISCO_CACHE_MAX_BYTES', 200 * 1024 * 1024))
+TIMEOUT_DOWNLOAD = (5, 30)
+
+_sessao = None
+_trava_sessao = threading.Lock()
+_trava_limpeza = threading.Lock()
+
+
+def _obter_sessao():
+    global _sessao
+    with _trava_sessao:
+        if _sessao is None:
+            _sessao = requests.Session()
+            adaptador = HTTPAdapter(pool_maxsize=16)
+            _sessao.mount('https://', adaptador)
+            _sessao.mount('http://', adaptador)
+        return _sessao
+
+
+def _caminhos(url, diretorio):
+    chave = hashlib.sha256(url.encode('utf-8')).hexdigest()
+    return os.path.join(diretorio, f'{chave}.dat'), os.path.join(diretorio, f'{chave}.json')
+
+
+def _ler_metadados(caminho_meta):
+    try:
+        with open(caminho_meta, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _ler_corpo(caminho_corpo):
+    with open(caminho_corpo, 'rb') as f:
+        conteudo = f.read()
+    os.utime(caminho_corpo)  # marca como usado recentemente (ordem de remoção)
+    return conteudo
+
+
+def _gravar_atomico(caminho, conteudo):
+    temporario = f'{caminho}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(temporario, 'wb') as f:
+        f.write(conteudo)
+    os.replace(temporario, caminho)
+
+
+def limpar_cache(diretorio=DIRETORIO_CACHE, tamanho_maximo=TAMANHO_MAXIMO_CACHE):
+    """Apaga os arquivos usados há mais tempo até o cache caber em `tamanho_maximo` bytes."""
+    with _trava_limpeza:
+        try:
+            entradas = [e for e in os.scandir(diretorio) if e.name.endswith('.dat')]
+        except FileNotFoundError:
+            return 0
+        estatisticas = [(e.stat().st_mtime, e.stat().st_size, e.path) for e in entradas]
+        total = sum(tamanho for _, tamanho, _ in estatisticas)
+        removidos = 0
+        for _, tamanho, caminho in sorted(estatisticas):
+            if total <= tamanho_maximo:
+                break
+            for arquivo in (caminho, caminho[:-4] + '.json'):
+                try:
+                    os.remove(arquivo)
+                except FileNotFoundError:
+                    pass
+            total -= tamanho
+            removidos += 1
+        return removidos
+
+
+def baixar(url, imutavel=False, diretorio=DIRETORIO_CACHE, tamanho_maximo=TAMANHO_MAXIMO_CACHE,
+           sessao=None, timeout=TIMEOUT_DOWNLOAD):
+    """
+    Devolve o conteúdo (bytes) de `url`, usando o cache em disco sempre que possível.
+
+    Caminhos locais são lidos direto do disco. Um recurso inexistente (404) gera
+    FileNotFoundError. Se a rede falhar e houver cópia em cache, a cópia é usada.
+    Cada chamada registra um evento `cache` com o resultado e os bytes entregues.
+    """
+    if not url.startswith(('http://', 'https://')):
+        with open(url, 'rb') as f:
+            conteudo = f.read()
+        registrar('cache', url=url, resultado='local', bytes=len(conteudo))
+        return conteudo
+
+    os.makedirs(diretorio, exist_ok=True)
+    caminho_corpo, caminho_meta = _caminhos(url, diretorio)
+    metadados = _ler_metadados(caminho_meta) if os.path.exists(caminho_corpo) else None
+    if metadados is not None and imutavel:
+        conteudo = _ler_corpo(caminho_corpo)
+        registrar('cache', url=url, resultado='acerto', bytes=len(conteudo))
+        return conteudo
+
+    cabecalhos = {}
+    if metadados is not None:
+        if metadados.get('etag'):
+            cabecalhos['If-None-Match'] = metadados['etag']
+        if metadados.get('last_modified'):
+            cabecalhos['If-Modified-Since'] = metadados['last_modified']
+
+    inicio = time.perf_counter()
+    try:
+        resposta = (sessao or _obter_sessao()).get(url, headers=cabecalhos, timeout=timeout)
+    except requests.exceptions.RequestException as e:
+        if metadados is None:
+            registrar('cache', url=url, resultado='erro', erro=type(e).__name__)
+            raise
+        print(f"⚠️ Falha ao revalidar '{url}' ({e}). Usando a cópia em cache.", file=sys.stderr)
+        conteudo = _ler_corpo(caminho_corpo)
+        registrar('cache', url=url, resultado='copia_sem_rede', bytes=len(conteudo))
+        return conteudo
+    latencia_ms = round((time.perf_counter() - inicio) * 1000, 2)
+
+    if resposta.status_code == 304 and metadados is not None:
+        conteudo = _ler_corpo(caminho_corpo)
+        registrar('cache', url=url, resultado='revalidado', bytes=len(conteudo), latencia_ms=latencia_ms)
+        return conteudo
+    if resposta.status_code == 404:
+        registrar('cache', url=url, resultado='ausente', latencia_ms=latencia_ms)
+        raise FileNotFoundError(url)
+    resposta.raise_for_status()
+
+    conteudo = resposta.content
+    _gravar_atomico(caminho_corpo, conteudo)
+    _gravar_atomico(caminho_meta, json.dumps({
+        'url': url,
+        'etag': resposta.headers.get('ETag'),
+        'last_modified': resposta.headers.get('Last-Modified'),
+        'tamanho': len(conteudo),
+        'baixado_em': time.time(),
+    }).encode('utf-8'))
+    limpar_cache(diretorio, tamanho_maximo)
+    registrar('cache', url=url, resultado='baixado', bytes=len(conteudo), latencia_ms=latencia_ms)
+    return conteudo
+
+
+def _tamanho_total(resposta):
+    """Tamanho completo do recurso, a partir de `Content-Range: bytes a-b/total`."""
+    total = resposta.headers.get('Content-Range', '').rpartition('/')[2]
+    return int(total) if total.isdigit() else None
+
+
+def baixar_trecho(url, inicio, fim, imutavel=False, diretorio=DIRETORIO_CACHE, tamanho_maximo=TAMANHO_MAXIMO_CACHE,
+                  sessao=None, timeout=TIMEOUT_DOWNLOAD):
+    """
+    Devolve (bytes de `inicio` até `fim` exclusive, tamanho total do recurso) com uma
+    requisição HTTP Range, usando o mesmo cache em disco e a mesma revalidação de `baixar`.
+
+    Se o servidor ignorar o Range e mandar o arquivo inteiro, o trecho é recortado
+    localmente. O tamanho total (None se o servidor não informar) permite a quem chama
+    conferir se o trecho veio da mesma versão do arquivo que ele esperava.
+    """
+    if not url.startswith(('http://', 'https://')):
+        with open(url, 'rb') as f:
+            f.seek(inicio)
+            conteudo = f.read(fim - inicio)
+        registrar('cache', url=url, resultado='local', bytes=len(conteudo), trecho=f'{inicio}-{fim}')
+        return conteudo, os.path.getsize(url)
+
+    os.makedirs(diretorio, exist_ok=True)
+    caminho_corpo, caminho_meta = _caminhos(f'{url}#bytes={inicio}-{fim}', diretorio)
+    metadados = _ler_metadados(caminho_meta) if os.path.exists(caminho_corpo) else None
+    if metadados is not None and imutavel:
+        conteudo = _ler_corpo(caminho_corpo)
+        registrar('cache', url=url, resultado='acerto', bytes=len(conteudo), trecho=f'{inicio}-{fim}')
+        return conteudo, metadados.get('tamanho_total')
+
+    cabecalhos = {'Range': f'bytes={inicio}-{fim - 1}'}
+    if metadados is not None:
+        if metadados.get('etag'):
+            cabecalhos['If-None-Match'] = metadados['etag']
+        if metadados.get('last_modified'):
+            cabecalhos['If-Modified-Since'] = metadados['last_modified']
+
+    inicio_requisicao = time.perf_counter()
+    try:
+        resposta = (sessao or _obter_sessao()).get(url, headers=cabecalhos, timeout=timeout)
+    except requests.exceptions.RequestException as e:
+        if metadados is None:
+            raise
+        print(f"⚠️ Falha ao revalidar '{url}' ({e}). Usando a cópia em cache.", file=sys.stderr)
+        return _ler_corpo(caminho_corpo), metadados.get('tamanho_total')
+    latencia_ms = round((time.perf_counter() - inicio_requisicao) * 1000, 2)
+    if resposta.status_code == 304 and metadados is not None:
+        conteudo = _ler_corpo(caminho_corpo)
+        registrar('cache', url=url, resultado='revalidado', bytes=len(conteudo), latencia_ms=latencia_ms, trecho=f'{inicio}-{fim}')
+        return conteudo, metadados.get('tamanho_total')
+    if resposta.status_code == 404:
+        registrar('cache', url=url, resultado='ausente', latencia_ms=latencia_ms)
+        raise FileNotFoundError(url)
+    resposta.raise_for_status()
+
+    if resposta.status_code == 206:
+        conteudo, tamanho_total = resposta.content, _tamanho_total(resposta)
+    else:
+        conteudo, tamanho_total = resposta.content[inicio:fim], len(resposta.content)
+    _gravar_atomico(caminho_corpo, conteudo)
+    _gravar_atomico(caminho_meta, json.dumps({
+        'url': url,
+        'etag': resposta.headers.get('ETag'),
+        'last_modified': resposta.headers.get('Last-Modified'),
+        'tamanho': len(conteudo),
+        'tamanho_total': tamanho_total,
+        'baixado_em': time.time(),
+    }).encode('utf-8'))
+    limpar_cache(diretorio, tamanho_maximo)
+    registrar('cache', url=url, resultado='baixado', bytes=len(resposta.content), latencia_ms=latencia_ms, trecho=f'{inicio}-{fim}')
+    return conteudo, tamanho_total
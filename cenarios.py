@@ -0,0 +1,187 @@
+# Arquivo: cenarios.py
+"""
+Varredura de cenários sobre as tabelas de risco já calculadas.
+
+Cada cenário combina um deslocamento do nível do mar (somado à AM, em metros), um
+multiplicador da chuva (aplicado ao VP) e um conjunto de limiares de classificação
+(o início de 'Moderado', 'Moderado Alto' e 'Alto'; o padrão é 30/50/100). Em vez de
+rodar o cálculo uma vez por cenário, todas as combinações de maré e chuva são
+avaliadas juntas em um array 2D (combinação × estação-hora), e cada nível de risco é
+classificado uma única vez com `searchsorted` contra a união de todos os limiares.
+As contagens por faixa dessa união bastam para obter, por soma acumulada, as
+contagens de qualquer conjunto de limiares, então acrescentar conjuntos de limiares
+quase não custa nada.
+
+    python cenarios.py --inicio 2025-10-01 --fim 2025-10-31 --mare 0 0.1 0.3 --chuva 1 1.5 2 \\
+        --limiares 30,50,100 25,45,90 [--por-estacao] [--saida cenarios.csv]
+"""
+import os
+import sys
+import argparse
+import numpy as np
+import pandas as pd
+from processamento import calcular_risco, CLASSES_RISCO, LIMIARES_RISCO, COLUNAS_TABELA_RISCO
+import risco_lote
+
+MAX_ELEMENTOS_POR_LOTE = 5_000_000  # combinações × estação-horas avaliadas de uma vez
+COLUNAS_CENARIO = ['deslocamento_mare', 'multiplicador_chuva', 'limiares']
+
+
+def _validar_limiares(conjuntos_limiares):
+    limiares = np.asarray(conjuntos_limiares, dtype=np.float64)
+    if limiares.ndim != 2 or limiares.shape[1] != len(CLASSES_RISCO) - 1:
+        raise ValueError(f"Cada conjunto de limiares deve ter {len(CLASSES_RISCO) - 1} valores.")
+    if not (np.diff(limiares, axis=1) > 0).all():
+        raise ValueError("Os limiares de cada conjunto devem ser crescentes.")
+    return limiares
+
+
+def _validar_colunas(df_risco, colunas):
+    faltando = [c for c in colunas if c not in df_risco.columns]
+    if faltando:
+        raise ValueError(f"A tabela de risco não tem a(s) coluna(s) {', '.join(faltando)}.")
+
+
+def _rotulo_limiares(limiares):
+    return '/'.join(f"{valor:g}" for valor in limiares)
+
+
+def niveis_de_risco(vp, am, deslocamentos_mare, multiplicadores_chuva):
+    """
+    Nível de risco (combinação × linha) para os pares (deslocamento, multiplicador)
+    dados, com os mesmos arredondamentos de `calcular_risco` e 0 onde VP ou AM faltam.
+    """
+    vp_cenario = np.round(vp[None, :] * np.asarray(multiplicadores_chuva, dtype=np.float64)[:, None], 2)
+    am_cenario = np.round(am[None, :] + np.asarray(deslocamentos_mare, dtype=np.float64)[:, None], 2)
+    return np.nan_to_num(np.round(vp_cenario * am_cenario, 2), nan=0.0)
+
+
+def varrer_cenarios(df_risco, deslocamentos_mare=(0.0,), multiplicadores_chuva=(1.0,),
+                    conjuntos_limiares=(LIMIARES_RISCO,), por_estacao=False, max_elementos=MAX_ELEMENTOS_POR_LOTE):
+    """
+    Conta as estação-horas de cada classe em todos os cenários (produto cartesiano de
+    deslocamentos, multiplicadores e conjuntos de limiares) a partir de uma tabela com
+    `VP` e `AM` (e `nomeEstacao`, com `por_estacao`).
+
+    Devolve uma linha por cenário (e por estação, com `por_estacao`) com as colunas
+    `deslocamento_mare`, `multiplicador_chuva`, `limiares` ('30/50/100'), as classes
+    de `CLASSES_RISCO` e `total`.
+    """
+    _validar_colunas(df_risco, ['VP', 'AM'] + (['nomeEstacao'] if por_estacao else []))
+    limiares = _validar_limiares(conjuntos_limiares)
+    deslocamentos = np.asarray(deslocamentos_mare, dtype=np.float64).ravel()
+    multiplicadores = np.asarray(multiplicadores_chuva, dtype=np.float64).ravel()
+    vp = pd.to_numeric(df_risco['VP'], errors='coerce').to_numpy(dtype=np.float64)
+    am = pd.to_numeric(df_risco['AM'], errors='coerce').to_numpy(dtype=np.float64)
+    if por_estacao:
+        codigos, estacoes = pd.factorize(df_risco['nomeEstacao'], sort=True)
+    else:
+        codigos, estacoes = np.zeros(len(df_risco), dtype=np.int64), pd.Index([None])
+
+    # Combinações de maré e chuva (linhas do array 2D) e faixas da união dos limiares.
+    desloc_combinacao = np.repeat(deslocamentos, len(multiplicadores))
+    mult_combinacao = np.tile(multiplicadores, len(deslocamentos))
+    fronteiras = np.unique(limiares)
+    posicoes = np.searchsorted(fronteiras, limiares)
+    n_comb, n_est, n_faixas = len(desloc_combinacao), len(estacoes), len(fronteiras) + 1
+
+    contagem = np.zeros((n_comb, n_est, n_faixas), dtype=np.int64)
+    lote = max(1, max_elementos // max(len(vp), 1))
+    for inicio in range(0, n_comb, lote):
+        fim = min(inicio + lote, n_comb)
+        niveis = niveis_de_risco(vp, am, desloc_combinacao[inicio:fim], mult_combinacao[inicio:fim])
+        faixa = np.searchsorted(fronteiras, niveis, side='right')  # nº de fronteiras <= nível
+        chave = (np.arange(fim - inicio)[:, None] * n_est + codigos[None, :]) * n_faixas + faixa
+        contagem[inicio:fim] = np.bincount(chave.ravel(), minlength=(fim - inicio) * n_est * n_faixas) \
+            .reshape(fim - inicio, n_est, n_faixas)
+
+    # abaixo[..., j] = linhas com nível < fronteiras[j]; cada conjunto lê as suas três fronteiras.
+    abaixo = np.cumsum(contagem, axis=2)
+    total = abaixo[:, :, -1]
+    acumulado = np.concatenate([np.zeros((n_comb, n_est, len(limiares), 1), dtype=np.int64),
+                                abaixo[:, :, posicoes],
+                                np.broadcast_to(total[:, :, None, None], (n_comb, n_est, len(limiares), 1))], axis=3)
+    por_classe = np.diff(acumulado, axis=3)  # combinação × estação × conjunto × classe
+
+    indice = pd.MultiIndex.from_product([range(n_comb), range(n_est), range(len(limiares))])
+    comb, est, conj = (indice.codes[i] for i in range(3))
+    resultado = pd.DataFrame({
+        'deslocamento_mare': desloc_combinacao[comb],
+        'multiplicador_chuva': mult_combinacao[comb],
+        'limiares': np.array([_rotulo_limiares(l) for l in limiares], dtype=object)[conj],
+    })
+    if por_estacao:
+        resultado['nomeEstacao'] = estacoes.to_numpy()[est]
+    contagens = por_classe.reshape(-1, len(CLASSES_RISCO))
+    for j, classe in enumerate(CLASSES_RISCO):
+        resultado[classe] = contagens[:, j]
+    resultado['total'] = total[comb, est]
+    return resultado
+
+
+def tabela_cenario(df_risco, deslocamento_mare=0.0, multiplicador_chuva=1.0, limiares=LIMIARES_RISCO):
+    """
+    Tabela de risco completa de um único cenário: as colunas de `COLUNAS_TABELA_RISCO`
+    que a tabela de entrada tiver (`VP` e `AM` são obrigatórias).
+    """
+    _validar_colunas(df_risco, ['VP', 'AM'])
+    _validar_limiares([limiares])
+    df = df_risco.copy()
+    df['VP'] = pd.to_numeric(df['VP'], errors='coerce') * multiplicador_chuva
+    df['AM'] = pd.to_numeric(df['AM'], errors='coerce') + deslocamento_mare
+    df = calcular_risco(df, limiares)
+    return df[[c for c in COLUNAS_TABELA_RISCO if c in df.columns]]
+
+
+def carregar_base(datas, estacoes=None, fonte='csv', saida=risco_lote.DIRETORIO_SAIDA, processos=None):
+    """
+    Tabelas de risco das datas, lidas dos resultados de `risco_lote` (os dias que
+    faltarem ou estiverem desatualizados são calculados antes).
+    """
+    risco_lote.calcular_risco_lote(datas, fonte=fonte, formato='parquet', saida=saida, processos=processos)
+    caminhos = [risco_lote.arquivo_resultado(d, saida, 'parquet') for d in datas]
+    tabelas = [pd.read_parquet(c) for c in caminhos if os.path.exists(c)]
+    if not tabelas:
+        return pd.DataFrame(columns=COLUNAS_TABELA_RISCO)
+    df = pd.concat(tabelas, ignore_index=True)
+    if estacoes:
+        df = df[df['nomeEstacao'].isin(estacoes)].reset_index(drop=True)
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Conta as horas de cada classe de risco em vários cenários de maré, chuva e limiares.")
+    parser.add_argument('--inicio', required=True, help="Primeira data (AAAA-MM-DD).")
+    parser.add_argument('--fim', help="Última data (AAAA-MM-DD); padrão: a mesma do início.")
+    parser.add_argument('--estacoes', nargs='+', help="Nomes das estações (padrão: todas).")
+    parser.add_argument('--fonte', choices=risco_lote.FONTES, default='csv', help="De onde ler as leituras de chuva.")
+    parser.add_argument('--mare', nargs='+', type=float, default=[0.0], help="Deslocamentos do nível do mar, em metros.")
+    parser.add_argument('--chuva', nargs='+', type=float, default=[1.0], help="Multiplicadores da chuva (VP).")
+    parser.add_argument('--limiares', nargs='+', default=[_rotulo_limiares(LIMIARES_RISCO).replace('/', ',')],
+                        help="Conjuntos de limiares 'moderado,moderado_alto,alto' (ex.: 30,50,100 25,45,90).")
+    parser.add_argument('--por-estacao', action='store_true', help="Contagens separadas por estação.")
+    parser.add_argument('--saida', help="Arquivo CSV com as contagens (padrão: só imprime).")
+    args = parser.parse_args()
+
+    try:
+        datas = [str(d) for d in np.arange(np.datetime64(args.inicio), np.datetime64(args.fim or args.inicio) + 1)]
+        conjuntos = [[float(valor) for valor in texto.split(',')] for texto in args.limiares]
+        df_base = carregar_base(datas, args.estacoes, args.fonte)
+        if df_base.empty:
+            print("⚠️ Nenhuma tabela de risco no período.", file=sys.stderr)
+            sys.exit(1)
+        resultado = varrer_cenarios(df_base, args.mare, args.chuva, conjuntos, por_estacao=args.por_estacao)
+    except (OSError, ValueError) as e:
+        print(f"❌ Erro na varredura de cenários: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    print(f"✅ {len(args.mare) * len(args.chuva) * len(conjuntos)} cenário(s) sobre {len(df_base)} estação-horas.")
+    if args.saida:
+        resultado.to_csv(args.saida, index=False)
+        print(f"✅ Contagens gravadas em '{args.saida}'.")
+    else:
+        print(resultado.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
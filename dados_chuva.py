@@ -0,0 +1,244 @@
+# Arquivo: dados_chuva.py
+"""
+Leitura dos arquivos diários de chuva publicados no GitHub, sem dependência do Streamlit.
+
+Os arquivos `chuva_recife_<data>.csv` recebem o nome da data de ingestão, então as
+leituras de um dia podem estar no arquivo do dia e no do dia seguinte; e o VP das
+primeiras horas precisa das 2h finais do dia anterior. Por isso um período
+[inicio, fim] lê os arquivos de inicio-1 até fim+1, e cada leitura é atribuída à data
+do seu próprio `datahora`, não à do arquivo.
+
+Os arquivos vizinhos não são baixados inteiros: cada arquivo diário tem um índice
+(`chuva_recife_<data>.indice.json`) com os blocos de bytes e o menor e o maior
+`datahora` de cada bloco, e só os blocos que caem na janela pedida são lidos, por
+HTTP Range. Sem índice (arquivos antigos), o arquivo inteiro é lido e filtrado.
+"""
+import io
+import json
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from cache_http import baixar, baixar_trecho
+from processamento import CLASSES_RISCO, COLUNAS_TABELA_RISCO, JANELA_2H
+
+URL_BASE_CHUVAS = 'https://raw.githubusercontent.com/RafaellaB/Diagramas-de-risco-din-mico/main/chuva_recife_'
+SUFIXO_ARQUIVO_CHUVAS = '.csv'
+SUFIXO_INDICE_CHUVAS = '.indice.json'
+URL_BASE_RISCO = 'https://raw.githubusercontent.com/RafaellaB/Diagramas-de-risco-din-mico/main/risco/risco_recife_'
+COLUNAS_NO_CSV_CHUVAS = ['datahora', 'nome', 'valor']
+MAX_DOWNLOADS_SIMULTANEOS = 8
+
+# Blocos do índice: cada bloco tem no máximo LINHAS_POR_BLOCO linhas e cobre no máximo
+# DURACAO_MAXIMA_BLOCO entre a menor e a maior leitura; ao anexar, o lote novo se junta
+# ao último bloco enquanto couber.
+LINHAS_POR_BLOCO = 64
+DURACAO_MAXIMA_BLOCO = pd.Timedelta(hours=1)
+
+
+def url_arquivo_chuva(data_str, url_base=URL_BASE_CHUVAS):
+    return f"{url_base}{data_str}{SUFIXO_ARQUIVO_CHUVAS}"
+
+
+def url_indice_chuva(data_str, url_base=URL_BASE_CHUVAS):
+    return f"{url_base}{data_str}{SUFIXO_INDICE_CHUVAS}"
+
+
+def indexar_csv(conteudo, linhas_por_bloco=LINHAS_POR_BLOCO, duracao_maxima=DURACAO_MAXIMA_BLOCO):
+    """
+    Monta o índice de um CSV de chuva a partir do seu conteúdo (bytes): tamanho do
+    arquivo, tamanho do cabeçalho e, para cada bloco de linhas, [byte inicial, byte
+    final, menor datahora, maior datahora]. As linhas são agrupadas por faixas de
+    `duracao_maxima` contadas da primeira leitura, com no máximo `linhas_por_bloco`
+    linhas por bloco (o CSV compactado é ordenado por `datahora`, então os blocos saem
+    em ordem de tempo).
+    """
+    fins_de_linha = np.flatnonzero(np.frombuffer(conteudo, dtype=np.uint8) == ord('\n')) + 1
+    if len(conteudo) and not conteudo.endswith(b'\n'):
+        fins_de_linha = np.append(fins_de_linha, len(conteudo))
+    indice = {'tamanho': len(conteudo), 'cabecalho': int(fins_de_linha[0]) if len(fins_de_linha) else len(conteudo),
+              'blocos': []}
+    if len(fins_de_linha) < 2:
+        return indice
+    datahoras = pd.read_csv(io.BytesIO(conteudo), usecols=['datahora'], dtype=str)['datahora']
+    instantes = pd.to_datetime(datahoras).to_numpy(dtype='datetime64[s]').astype(np.int64)
+    if len(instantes) != len(fins_de_linha) - 1:
+        # Linhas em branco ou quebras dentro de campos: um bloco só, o arquivo inteiro.
+        indice['blocos'].append([indice['cabecalho'], len(conteudo), datahoras.min(), datahoras.max()])
+        return indice
+
+    faixa = (instantes - instantes.min()) // int(duracao_maxima.total_seconds())
+    mudou = np.r_[True, faixa[1:] != faixa[:-1]]
+    inicio_da_faixa = np.flatnonzero(mudou)[np.cumsum(mudou) - 1]
+    inicios = np.flatnonzero(mudou | ((np.arange(len(faixa)) - inicio_da_faixa) % linhas_por_bloco == 0))
+    menores = np.minimum.reduceat(instantes, inicios).astype('datetime64[s]').astype(str)
+    maiores = np.maximum.reduceat(instantes, inicios).astype('datetime64[s]').astype(str)
+    bytes_inicio = fins_de_linha[inicios]
+    bytes_fim = np.append(bytes_inicio[1:], fins_de_linha[-1])
+    indice['blocos'] = [[int(i), int(f), menor.replace('T', ' '), maior.replace('T', ' ')]
+                        for i, f, menor, maior in zip(bytes_inicio, bytes_fim, menores, maiores)]
+    return indice
+
+
+def anexar_bloco(indice, inicio, fim, menor_datahora, maior_datahora, duracao_maxima=DURACAO_MAXIMA_BLOCO):
+    """Acrescenta ao índice os bytes [inicio, fim) anexados ao CSV, juntando ao último bloco se couber."""
+    blocos = indice['blocos']
+    if blocos and blocos[-1][1] == inicio and \
+            pd.Timestamp(max(blocos[-1][3], maior_datahora)) - pd.Timestamp(min(blocos[-1][2], menor_datahora)) <= duracao_maxima:
+        ultimo = blocos[-1]
+        blocos[-1] = [ultimo[0], fim, min(ultimo[2], menor_datahora), max(ultimo[3], maior_datahora)]
+    else:
+        blocos.append([inicio, fim, menor_datahora, maior_datahora])
+    indice['tamanho'] = fim
+    return indice
+
+
+def ler_indice_chuva(data_str, url_base=URL_BASE_CHUVAS, imutavel=False):
+    """Índice de blocos do arquivo de um dia, ou None se ele não existir ou estiver ilegível."""
+    try:
+        return json.loads(baixar(url_indice_chuva(data_str, url_base), imutavel=imutavel))
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _trechos_necessarios(indice, intervalos):
+    """Intervalos de bytes (contíguos já unidos) dos blocos que cruzam alguma janela."""
+    trechos = []
+    for inicio, fim, menor, maior in indice['blocos']:
+        if any(menor < fim_janela and maior >= inicio_janela for inicio_janela, fim_janela in intervalos):
+            if trechos and trechos[-1][1] == inicio:
+                trechos[-1][1] = fim
+            else:
+                trechos.append([inicio, fim])
+    return trechos
+
+
+def _ler_trechos(data_str, url_base, intervalos, imutavel):
+    """Bytes do cabeçalho + blocos necessários; None quando é preciso ler o arquivo inteiro."""
+    indice = ler_indice_chuva(data_str, url_base, imutavel)
+    if indice is None or not indice['blocos']:
+        return None
+    trechos = _trechos_necessarios(indice, intervalos)
+    if trechos == [[indice['cabecalho'], indice['tamanho']]]:
+        return None
+    url = url_arquivo_chuva(data_str, url_base)
+    cabecalho, tamanho_total = baixar_trecho(url, 0, indice['cabecalho'], imutavel=imutavel)
+    # Índice e arquivo de versões diferentes (leituras anexadas depois do índice, que
+    # podem cair na janela mesmo sem nenhum bloco indexado nela): lê o arquivo inteiro.
+    if tamanho_total != indice['tamanho']:
+        return None
+    partes = [cabecalho]
+    for inicio, fim in trechos:
+        parte, tamanho_trecho = baixar_trecho(url, inicio, fim, imutavel=imutavel)
+        if tamanho_trecho != indice['tamanho']:
+            return None
+        partes.append(parte)
+    return b''.join(partes)
+
+
+def _nas_janelas(datahora, intervalos):
+    dentro = np.zeros(len(datahora), dtype=bool)
+    for inicio, fim in intervalos:
+        dentro |= ((datahora >= pd.Timestamp(inicio)) & (datahora < pd.Timestamp(fim))).to_numpy()
+    return dentro
+
+
+def ler_arquivo_chuva(data_str, url_base=URL_BASE_CHUVAS, separador=',', imutavel=False, intervalos=None):
+    """
+    Lê o arquivo de chuva de um dia e renomeia as colunas para o padrão do cálculo.
+
+    O download passa pelo cache em disco (`cache_http`); com `imutavel` a cópia local
+    é usada sem consultar o servidor. Com `intervalos` ([(inicio, fim), ...] em texto
+    'AAAA-MM-DD HH:MM:SS'), só ficam as leituras com `datahora` em alguma das janelas,
+    e o índice do arquivo é usado para baixar só os blocos que as contêm. Arquivo
+    inexistente (dia sem coleta, ou o dia seguinte que ainda não começou) devolve um
+    DataFrame vazio; outros erros são propagados.
+    """
+    try:
+        conteudo = _ler_trechos(data_str, url_base, intervalos, imutavel) if intervalos else None
+        if conteudo is None:
+            conteudo = baixar(url_arquivo_chuva(data_str, url_base), imutavel=imutavel)
+        df = pd.read_csv(io.BytesIO(conteudo), encoding='utf-8', sep=separador, dtype={'codestacao': str})
+    except (FileNotFoundError, pd.errors.EmptyDataError):
+        return pd.DataFrame()
+    if not all(col in df.columns for col in COLUNAS_NO_CSV_CHUVAS):
+        raise ValueError(f"O arquivo de chuva de {data_str} não tem as colunas esperadas: {COLUNAS_NO_CSV_CHUVAS}")
+    df.rename(columns={'nome': 'nomeEstacao', 'valor': 'valorMedida'}, inplace=True)
+    df['datahora'] = pd.to_datetime(df['datahora'])
+    if intervalos:
+        df = df[_nas_janelas(df['datahora'], intervalos)].reset_index(drop=True)
+    return df
+
+
+def arquivos_do_periodo(datas):
+    """Datas dos arquivos necessários para calcular `datas` (cada dia, o anterior e o seguinte)."""
+    dias = np.asarray(sorted(set(datas)), dtype='datetime64[D]')
+    vizinhos = np.unique(np.concatenate([dias - 1, dias, dias + 1]))
+    return [str(d) for d in vizinhos]
+
+
+def janelas_do_periodo(datas, margem=JANELA_2H):
+    """
+    Janelas de tempo [inicio, fim) cobertas pelas `datas`, cada uma começando `margem`
+    segundos antes da meia-noite (o que as somas móveis precisam), com dias seguidos unidos.
+    """
+    janelas = []
+    for dia in np.asarray(sorted(set(datas)), dtype='datetime64[D]'):
+        inicio = dia.astype('datetime64[s]') - np.timedelta64(margem, 's')
+        fim = (dia + 1).astype('datetime64[s]')
+        if janelas and inicio <= janelas[-1][1]:
+            janelas[-1][1] = fim
+        else:
+            janelas.append([inicio, fim])
+    return [(str(inicio).replace('T', ' '), str(fim).replace('T', ' ')) for inicio, fim in janelas]
+
+
+def carregar_chuva_periodo(datas, url_base=URL_BASE_CHUVAS, ultima_data=None, max_simultaneos=MAX_DOWNLOADS_SIMULTANEOS,
+                           margem=JANELA_2H):
+    """
+    Baixa em paralelo as leituras necessárias para as `datas` e junta tudo.
+
+    Devolve as leituras de cada data e das `margem` segundos anteriores a ela, venham
+    do arquivo que vierem. Os arquivos das próprias datas são lidos inteiros; dos
+    vizinhos (dia anterior e seguinte) só os blocos da janela. `ultima_data`
+    (AAAA-MM-DD) evita pedir arquivos de dias que ainda não existem. Leituras repetidas
+    entre arquivos vizinhos aparecem uma vez só.
+    """
+    arquivos = arquivos_do_periodo(datas)
+    if ultima_data is not None:
+        arquivos = [d for d in arquivos if d <= ultima_data]
+    if not arquivos:
+        return pd.DataFrame()
+    janelas = janelas_do_periodo(datas, margem)
+    proprias = set(str(d) for d in np.asarray(list(datas), dtype='datetime64[D]'))
+    # Arquivos de antes de ontem não recebem mais leituras: o cache não precisa revalidá-los.
+    limite_imutavel = str(np.datetime64(ultima_data) - 1) if ultima_data is not None else ''
+
+    def ler(data_arquivo):
+        df = ler_arquivo_chuva(data_arquivo, url_base, imutavel=data_arquivo < limite_imutavel,
+                               intervalos=None if data_arquivo in proprias else janelas)
+        return df[_nas_janelas(df['datahora'], janelas)] if data_arquivo in proprias and not df.empty else df
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_simultaneos, len(arquivos)))) as executor:
+        lista_dfs = [df for df in executor.map(ler, arquivos) if not df.empty]
+    if not lista_dfs:
+        return pd.DataFrame()
+    df_chuva = pd.concat(lista_dfs, ignore_index=True)
+    chave = 'codestacao' if 'codestacao' in df_chuva.columns else 'nomeEstacao'
+    return df_chuva.drop_duplicates(subset=[chave, 'datahora'], keep='last').reset_index(drop=True)
+
+
+def ler_tabela_risco(data_str, url_base=URL_BASE_RISCO, imutavel=False):
+    """
+    Lê a tabela de risco pré-calculada na ingestão (`risco/risco_recife_<data>.csv`).
+
+    Devolve um DataFrame vazio se a tabela do dia ainda não foi publicada.
+    """
+    try:
+        conteudo = baixar(f"{url_base}{data_str}{SUFIXO_ARQUIVO_CHUVAS}", imutavel=imutavel)
+        df = pd.read_csv(io.BytesIO(conteudo), dtype={'data': str, 'hora_ref': str})
+    except (FileNotFoundError, pd.errors.EmptyDataError):
+        return pd.DataFrame()
+    if not all(col in df.columns for col in COLUNAS_TABELA_RISCO):
+        raise ValueError(f"A tabela de risco de {data_str} não tem as colunas esperadas: {COLUNAS_TABELA_RISCO}")
+    df['Classificacao_Risco'] = pd.Categorical(df['Classificacao_Risco'], categories=CLASSES_RISCO, ordered=True)
+    return df
@@ -0,0 +1,120 @@
+# Arquivo: estacoes.py
+"""
+Cadastro das estações pluviométricas (`estacoes.csv`), montado a partir dos próprios
+dados que a API do CEMADEN devolve.
+
+Cada estação tem um identificador inteiro compacto (`id_estacao`), atribuído na ordem
+em que aparece pela primeira vez e nunca reaproveitado, além do código do CEMADEN,
+nome, cidade, UF, coordenadas, sensor e a marca `monitorada` (estações exibidas por
+padrão no painel e consultadas uma a uma quando a busca por município falha). A
+ingestão e o painel leem a mesma tabela, em vez de duas listas ligadas por texto.
+
+O id inteiro é a chave do histórico colunar (`historico.py`); o cálculo do VP, as
+tabelas de risco e o painel continuam identificando a estação por `nomeEstacao`.
+"""
+import os
+import numpy as np
+import pandas as pd
+
+ARQUIVO_ESTACOES = 'estacoes.csv'
+COLUNAS_ATRIBUTOS = ['nome', 'cidade', 'uf', 'latitude', 'longitude', 'id_sensor']
+COLUNAS_REGISTRO = ['id_estacao', 'codestacao'] + COLUNAS_ATRIBUTOS + ['monitorada']
+# Texto como `object`: `astype(str)` transformaria os nomes ainda desconhecidos em 'nan'.
+TIPOS_REGISTRO = {'id_estacao': np.int32, 'codestacao': str, 'nome': object, 'cidade': object, 'uf': object,
+                  'latitude': np.float64, 'longitude': np.float64, 'id_sensor': 'Int32', 'monitorada': bool}
+
+
+class RegistroEstacoes:
+    """Tabela de estações com busca vetorizada do código do CEMADEN para o id inteiro."""
+
+    def __init__(self, tabela):
+        tabela = tabela.reindex(columns=COLUNAS_REGISTRO)
+        tabela['monitorada'] = tabela['monitorada'].eq(True)  # vazia (estação nova) conta como não monitorada
+        self.tabela = tabela.astype(TIPOS_REGISTRO).sort_values('id_estacao', kind='stable').reset_index(drop=True)
+        self._indice = pd.Index(self.tabela['codestacao'])
+
+    @classmethod
+    def vazio(cls):
+        return cls(pd.DataFrame(columns=COLUNAS_REGISTRO))
+
+    @classmethod
+    def de_csv(cls, caminho_ou_buffer=ARQUIVO_ESTACOES):
+        """Lê o cadastro; um arquivo inexistente devolve um cadastro vazio."""
+        if isinstance(caminho_ou_buffer, str) and not os.path.exists(caminho_ou_buffer):
+            return cls.vazio()
+        return cls(pd.read_csv(caminho_ou_buffer, dtype={'codestacao': str, 'nome': str, 'cidade': str, 'uf': str}))
+
+    def para_csv(self, caminho=ARQUIVO_ESTACOES):
+        temporario = f"{caminho}.tmp"
+        self.tabela.to_csv(temporario, index=False)
+        os.replace(temporario, caminho)
+
+    def __len__(self):
+        return len(self.tabela)
+
+    def ids(self, codigos):
+        """`id_estacao` (int32) de cada código; -1 para códigos fora do cadastro."""
+        codigos = pd.Index(np.asarray(codigos, dtype=object).astype(str))
+        posicoes = self._indice.get_indexer(codigos)
+        # A posição -1 (código desconhecido) cai no -1 acrescentado ao fim, mesmo com o cadastro vazio.
+        return np.append(self.tabela['id_estacao'].to_numpy(), -1)[posicoes].astype(np.int32)
+
+    def atributos(self, ids, colunas=COLUNAS_ATRIBUTOS):
+        """Colunas do cadastro para cada id (uma linha por id, na mesma ordem; NaN para ids desconhecidos)."""
+        posicoes = pd.Index(self.tabela['id_estacao']).get_indexer(np.asarray(ids))
+        linhas = self.tabela[list(colunas)].reindex(np.where(posicoes >= 0, posicoes, -1))
+        return linhas.reset_index(drop=True)
+
+    def incluir(self, df_dados, monitorada=False):
+        """Inclui só as estações de `df_dados` ainda fora do cadastro; devolve quantas entraram."""
+        if df_dados.empty or 'codestacao' not in df_dados.columns:
+            return 0
+        desconhecidas = ~df_dados['codestacao'].astype(str).isin(self._indice)
+        return self.atualizar(df_dados[desconhecidas], monitorada) if desconhecidas.any() else 0
+
+    def _selecao(self, cidade=None, uf=None, monitoradas=None):
+        selecao = np.ones(len(self.tabela), dtype=bool)
+        if cidade is not None:
+            selecao &= self.tabela['cidade'].str.upper().eq(cidade.upper()).to_numpy()
+        if uf is not None:
+            selecao &= self.tabela['uf'].str.upper().eq(uf.upper()).to_numpy()
+        if monitoradas is not None:
+            selecao &= self.tabela['monitorada'].to_numpy() == monitoradas
+        return self.tabela[selecao]
+
+    def codigos(self, cidade=None, uf=None, monitoradas=None):
+        """Códigos do CEMADEN das estações selecionadas, na ordem do cadastro."""
+        return self._selecao(cidade, uf, monitoradas)['codestacao'].tolist()
+
+    def nomes(self, cidade=None, uf=None, monitoradas=None):
+        """Nomes das estações selecionadas (as que ainda não têm nome ficam de fora)."""
+        return self._selecao(cidade, uf, monitoradas)['nome'].dropna().tolist()
+
+    def atualizar(self, df_dados, monitorada=False):
+        """
+        Inclui as estações novas de `df_dados` (no formato devolvido pela API) e atualiza
+        os atributos das já cadastradas com os valores mais recentes. Estações novas
+        recebem o próximo id livre e a marca `monitorada` informada. Devolve o número de
+        estações incluídas ou alteradas.
+        """
+        if df_dados.empty or 'codestacao' not in df_dados.columns:
+            return 0
+        recebidas = (df_dados.assign(codestacao=df_dados['codestacao'].astype(str))
+                     .drop_duplicates(subset=['codestacao'], keep='last')
+                     .reindex(columns=['codestacao'] + COLUNAS_ATRIBUTOS)
+                     .set_index('codestacao'))
+        tabela = self.tabela.set_index('codestacao')
+        novas = recebidas.index.difference(tabela.index, sort=False)
+        atributos = recebidas.reindex(tabela.index).combine_first(tabela[COLUNAS_ATRIBUTOS])
+        tabela = tabela.assign(**{coluna: atributos[coluna] for coluna in COLUNAS_ATRIBUTOS})
+        if len(novas):
+            proximo_id = int(tabela['id_estacao'].max()) + 1 if len(tabela) else 0
+            incluidas = recebidas.loc[novas].assign(
+                id_estacao=np.arange(proximo_id, proximo_id + len(novas), dtype=np.int32), monitorada=monitorada)
+            tabela = pd.concat([tabela, incluidas])
+
+        registro = RegistroEstacoes(tabela.rename_axis('codestacao').reset_index())
+        antes, depois = self.tabela.astype(object), registro.tabela.iloc[:len(self.tabela)].astype(object)
+        alteradas = int(((antes != depois) & ~(antes.isna() & depois.isna())).any(axis=1).sum())
+        self.tabela, self._indice = registro.tabela, registro._indice
+        return len(novas) + alteradas
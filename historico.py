@@ -0,0 +1,228 @@
+# Arquivo: historico.py
+"""
+Histórico de chuva em formato colunar (Parquet), um arquivo por dia.
+
+Os arquivos `chuva_recife_<data>.csv` são compactados em:
+
+    historico/estacoes.parquet                  -> cópia do cadastro `estacoes.csv`
+    historico/leituras/data=<AAAA-MM-DD>/leituras.parquet
+
+As leituras guardam só `id_estacao`, `datahora` (inteiro, segundos desde 1970 no
+horário local), `valor`, `qualificacao` e `offset`, ordenadas por estação e horário;
+código, cidade, UF, coordenadas, nome e sensor ficam uma única vez na tabela de
+estações. A partição usa a data da própria leitura, e não a data do arquivo CSV de
+onde ela veio. Um arquivo por dia com todas as estações (e não um por estação) mantém
+o histórico pequeno; cada compactação regrava só os dias atingidos, e um dia sem
+leituras novas não é regravado.
+"""
+import os
+import sys
+import glob
+import argparse
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from estacoes import RegistroEstacoes, ARQUIVO_ESTACOES
+
+DIRETORIO_HISTORICO = 'historico'
+PADRAO_ARQUIVOS_CHUVA = 'chuva_recife_*.csv'
+COLUNAS_LEITURA = ['id_estacao', 'datahora', 'valor', 'qualificacao', 'offset']
+ESQUEMA_LEITURAS = pa.schema([
+    ('id_estacao', pa.int32()),
+    ('datahora', pa.int64()),
+    ('valor', pa.float64()),
+    ('qualificacao', pa.int16()),
+    ('offset', pa.float32()),
+])
+ESQUEMA_ESTACOES = pa.schema([
+    ('id_estacao', pa.int32()),
+    ('codestacao', pa.string()),
+    ('nome', pa.string()),
+    ('cidade', pa.string()),
+    ('uf', pa.string()),
+    ('latitude', pa.float64()),
+    ('longitude', pa.float64()),
+    ('id_sensor', pa.int32()),
+])
+UM_DIA = 86400
+
+
+def para_segundos(datahora):
+    """Converte datas (texto, Timestamp ou Series) em segundos desde 1970, sem fuso."""
+    serie = pd.to_datetime(pd.Series(datahora) if np.ndim(datahora) else pd.Series([datahora]))
+    if serie.dt.tz is not None:
+        serie = serie.dt.tz_localize(None)
+    segundos = serie.to_numpy(dtype='datetime64[s]').astype(np.int64)
+    return segundos if np.ndim(datahora) else int(segundos[0])
+
+
+def de_segundos(segundos):
+    """Converte segundos desde 1970 de volta para datetime64."""
+    return pd.to_datetime(np.asarray(segundos, dtype=np.int64), unit='s')
+
+
+def caminho_particao(diretorio, data):
+    return os.path.join(diretorio, 'leituras', f'data={data}', 'leituras.parquet')
+
+
+def _arquivo_estacoes(diretorio):
+    return os.path.join(diretorio, 'estacoes.parquet')
+
+
+def ler_estacoes(diretorio=DIRETORIO_HISTORICO):
+    """Lê a tabela de atributos das estações (vazia se o histórico ainda não existe)."""
+    caminho = _arquivo_estacoes(diretorio)
+    if not os.path.exists(caminho):
+        return ESQUEMA_ESTACOES.empty_table().to_pandas()
+    return pq.read_table(caminho).to_pandas()
+
+
+def _atualizar_estacoes(df, diretorio, arquivo_estacoes=ARQUIVO_ESTACOES):
+    """
+    Espelha o cadastro (`estacoes.csv`) em `estacoes.parquet`, com os mesmos
+    `id_estacao`. Estações que o cadastro ainda não conhece entram nele primeiro.
+    """
+    registro = RegistroEstacoes.de_csv(arquivo_estacoes)
+    incluidas = registro.incluir(df)
+    if incluidas:
+        registro.para_csv(arquivo_estacoes)
+        print(f"{incluidas} estação(ões) nova(s) incluída(s) no cadastro.")
+    tabela = pa.Table.from_pandas(registro.tabela[ESQUEMA_ESTACOES.names], schema=ESQUEMA_ESTACOES,
+                                  preserve_index=False)
+    caminho = _arquivo_estacoes(diretorio)
+    if not os.path.exists(caminho) or not pq.read_table(caminho).equals(tabela):
+        os.makedirs(diretorio, exist_ok=True)
+        pq.write_table(tabela, caminho)
+    return registro
+
+
+def _normalizar_leituras(df, registro):
+    df = df.copy()
+    df['id_estacao'] = registro.ids(df['codestacao'])
+    df['datahora'] = para_segundos(df['datahora'])
+    df['valor'] = pd.to_numeric(df['valor'], errors='coerce')
+    df['qualificacao'] = pd.to_numeric(df.get('qualificacao'), errors='coerce').fillna(0).astype(np.int16)
+    df['offset'] = pd.to_numeric(df.get('offset'), errors='coerce').astype(np.float32)
+    return df
+
+
+def _gravar_particao(caminho, df_particao):
+    existente = pq.read_table(caminho) if os.path.exists(caminho) else None
+    if existente is not None:
+        df_particao = pd.concat([existente.to_pandas(), df_particao], ignore_index=True)
+    df_particao = (df_particao.drop_duplicates(subset=['id_estacao', 'datahora'], keep='last')
+                   .sort_values(['id_estacao', 'datahora'], kind='stable'))
+    tabela = pa.Table.from_pandas(df_particao[COLUNAS_LEITURA], schema=ESQUEMA_LEITURAS, preserve_index=False)
+    if existente is not None and existente.equals(tabela):
+        return 0
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    temporario = f"{caminho}.tmp"
+    pq.write_table(tabela, temporario, compression='zstd')
+    os.replace(temporario, caminho)
+    return 1
+
+
+def compactar_leituras(df_chuva, diretorio=DIRETORIO_HISTORICO, arquivo_estacoes=ARQUIVO_ESTACOES):
+    """
+    Grava um DataFrame com o esquema dos CSVs do CEMADEN no histórico colunar.
+
+    Os dias atingidos são mesclados com o que já existe, sem duplicar leituras; a
+    leitura mais recente de um mesmo horário prevalece. Devolve o número de arquivos
+    diários regravados.
+    """
+    if df_chuva.empty:
+        return 0
+    registro = _atualizar_estacoes(df_chuva, diretorio, arquivo_estacoes)
+    df = _normalizar_leituras(df_chuva, registro)
+    dias = (df['datahora'] // UM_DIA).to_numpy().astype('datetime64[D]').astype(str)
+    particoes = 0
+    for data, grupo in df.groupby(dias, sort=True):
+        particoes += _gravar_particao(caminho_particao(diretorio, data), grupo)
+    return particoes
+
+
+def compactar_arquivos_csv(arquivos, diretorio=DIRETORIO_HISTORICO):
+    """Compacta uma lista de arquivos `chuva_recife_<data>.csv` no histórico colunar."""
+    arquivos = sorted(arquivos)
+    if not arquivos:
+        print("Nenhum arquivo de chuva para compactar.")
+        return 0
+    lista_dfs = []
+    for arquivo in arquivos:
+        try:
+            lista_dfs.append(pd.read_csv(arquivo, dtype={'codestacao': str}))
+        except pd.errors.EmptyDataError:
+            print(f"⚠️ Arquivo '{arquivo}' vazio. Ignorando.")
+    if not lista_dfs:
+        return 0
+    particoes = compactar_leituras(pd.concat(lista_dfs, ignore_index=True), diretorio)
+    print(f"✅ {len(arquivos)} arquivo(s) compactado(s); {particoes} dia(s) regravado(s) em '{diretorio}'.")
+    return particoes
+
+
+def _dias_no_intervalo(inicio, fim):
+    """Datas (AAAA-MM-DD) cobertas pelo intervalo [inicio, fim) em segundos."""
+    primeiro, ultimo = inicio // UM_DIA, (fim - 1) // UM_DIA
+    return np.arange(primeiro, ultimo + 1).astype('datetime64[D]').astype(str)
+
+
+def ler_historico(inicio, fim, estacoes=None, colunas=None, diretorio=DIRETORIO_HISTORICO):
+    """
+    Lê do histórico as leituras com `inicio <= datahora < fim`.
+
+    Só os arquivos diários do intervalo são abertos e só as colunas pedidas são lidas
+    do disco; o intervalo e as `estacoes` (códigos do CEMADEN) são filtrados já na
+    leitura. `colunas` aceita as colunas de leitura e também os atributos da estação
+    (`nome`, `cidade`, `latitude`...), que são trazidos da tabela de estações.
+    `codestacao` (como categoria) e `datahora` sempre vêm no resultado.
+    """
+    inicio_s, fim_s = para_segundos(inicio), para_segundos(fim)
+    colunas = list(colunas) if colunas is not None else ['valor']
+    colunas_leitura = ['datahora'] + [c for c in COLUNAS_LEITURA if c in colunas and c not in ('id_estacao', 'datahora')]
+    colunas_estacao = [c for c in colunas if c in ESQUEMA_ESTACOES.names and c != 'codestacao']
+    colunas_saida = ['codestacao'] + colunas_leitura + colunas_estacao
+
+    registro = RegistroEstacoes(ler_estacoes(diretorio))
+    filtros = [('datahora', '>=', inicio_s), ('datahora', '<', fim_s)]
+    if estacoes is not None:
+        ids = registro.ids([str(e) for e in estacoes])
+        filtros.append(('id_estacao', 'in', ids[ids >= 0].tolist()))
+    tabelas = [pq.read_table(caminho, columns=['id_estacao'] + colunas_leitura, filters=filtros)
+               for caminho in (caminho_particao(diretorio, data) for data in _dias_no_intervalo(inicio_s, fim_s))
+               if os.path.exists(caminho)]
+    if not tabelas:
+        return pd.DataFrame(columns=colunas_saida)
+
+    df = pa.concat_tables(tabelas).to_pandas()
+    df['datahora'] = de_segundos(df['datahora'].to_numpy())
+    # Junção pelo id inteiro do cadastro: código e atributos de cada id, repetidos por linha.
+    ids, id_da_linha = np.unique(df['id_estacao'].to_numpy(), return_inverse=True)
+    codigos = registro.atributos(ids, ['codestacao'])['codestacao'].to_numpy(dtype=object)
+    categorias, codigo_do_id = np.unique(codigos.astype(str), return_inverse=True)
+    df['codestacao'] = pd.Categorical.from_codes(codigo_do_id[id_da_linha], categories=categorias)
+    if colunas_estacao:
+        df = pd.concat([df, registro.atributos(ids, colunas_estacao).iloc[id_da_linha].set_axis(df.index)], axis=1)
+    return df[colunas_saida]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compacta os CSVs diários de chuva no histórico colunar.")
+    parser.add_argument('arquivos', nargs='*', help="Arquivos CSV a compactar (padrão: os mais recentes).")
+    parser.add_argument('--tudo', action='store_true', help="Compacta todos os arquivos chuva_recife_*.csv.")
+    parser.add_argument('--dias', type=int, default=2, help="Quantos arquivos diários mais recentes compactar.")
+    parser.add_argument('--destino', default=DIRETORIO_HISTORICO, help="Diretório do histórico colunar.")
+    args = parser.parse_args()
+
+    arquivos = args.arquivos or sorted(glob.glob(PADRAO_ARQUIVOS_CHUVA))
+    if not args.arquivos and not args.tudo:
+        arquivos = arquivos[-args.dias:]
+    try:
+        compactar_arquivos_csv(arquivos, args.destino)
+    except (OSError, pa.ArrowException) as e:
+        print(f"❌ Erro ao compactar o histórico: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
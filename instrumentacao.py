@@ -0,0 +1,132 @@
+# Arquivo: instrumentacao.py
+"""
+Medição leve das etapas da ingestão e do painel, emitida como linhas JSON.
+
+`etapa()` mede o tempo de parede de um trecho e grava um registro com os campos que
+o próprio trecho informar (linhas processadas, bytes baixados...). Eventos pontuais,
+como o resultado do cache em disco ou a latência HTTP de cada estação, usam
+`registrar()`. Os registros mais recentes ficam em memória (para o painel de
+desempenho) e, se a variável de ambiente RISCO_METRICAS apontar para um arquivo, são
+anexados a ele, um objeto JSON por linha; '-' escreve na saída de erro.
+
+`perfilar()` liga o cProfile em uma única execução. O cProfile só enxerga a thread
+que o ligou: o trabalho feito nos pools de threads (downloads) aparece como espera.
+"""
+import io
+import os
+import sys
+import json
+import time
+import pstats
+import cProfile
+import itertools
+import threading
+import contextlib
+from collections import deque
+
+MAX_REGISTROS_EM_MEMORIA = 2000
+LINHAS_RESUMO_PERFIL = 25
+
+_destino = os.getenv('RISCO_METRICAS')
+_registros = deque(maxlen=MAX_REGISTROS_EM_MEMORIA)
+_sequencia = itertools.count(1)
+_trava = threading.Lock()
+
+
+def definir_destino(destino):
+    """Troca o arquivo de saída das linhas JSON (None desliga, '-' usa a saída de erro)."""
+    global _destino
+    with _trava:
+        _destino = destino
+
+
+def _emitir(linha):
+    if _destino == '-':
+        print(linha, file=sys.stderr)
+        return
+    try:
+        with open(_destino, 'a', encoding='utf-8') as f:
+            f.write(linha + '\n')
+    except OSError as e:
+        print(f"⚠️ Não foi possível gravar a métrica em '{_destino}': {e}", file=sys.stderr)
+
+
+def registrar(evento, **campos):
+    """Grava um evento (`etapa`, `cache`, `http`...) com os campos informados e o devolve."""
+    registro = {'ts': round(time.time(), 3), 'evento': evento, **campos}
+    with _trava:
+        registro['seq'] = next(_sequencia)
+        _registros.append(registro)
+        if _destino:
+            _emitir(json.dumps(registro, ensure_ascii=False, default=str))
+    return registro
+
+
+@contextlib.contextmanager
+def etapa(nome, **campos):
+    """
+    Mede o tempo de parede do bloco e registra um evento `etapa` ao final.
+
+    O bloco recebe o dicionário de campos e pode completá-lo (`m['linhas'] = len(df)`).
+    Se o bloco falhar, o nome da exceção vai no campo `erro` e a exceção segue adiante.
+    """
+    inicio = time.perf_counter()
+    try:
+        yield campos
+    except BaseException as e:
+        campos['erro'] = type(e).__name__
+        raise
+    finally:
+        registrar('etapa', etapa=nome, duracao_ms=round((time.perf_counter() - inicio) * 1000, 2), **campos)
+
+
+def posicao():
+    """Número de sequência do último registro (marca para `registros(desde=...)`)."""
+    with _trava:
+        return _registros[-1]['seq'] if _registros else 0
+
+
+def registros(desde=0, evento=None):
+    """Registros em memória com sequência maior que `desde`, opcionalmente de um só tipo de evento."""
+    with _trava:
+        return [r for r in _registros if r['seq'] > desde and (evento is None or r['evento'] == evento)]
+
+
+def iniciar_perfil(ativo=True):
+    """Liga o cProfile na thread atual (None se `ativo` for falso)."""
+    if not ativo:
+        return None
+    perfil = cProfile.Profile()
+    perfil.enable()
+    return perfil
+
+
+def encerrar_perfil(perfil, arquivo=None, linhas=LINHAS_RESUMO_PERFIL):
+    """Desliga o perfil, grava o `.pstats` em `arquivo` (se dado) e devolve o resumo em texto."""
+    if perfil is None:
+        return ''
+    perfil.disable()
+    if arquivo:
+        perfil.dump_stats(arquivo)
+    saida = io.StringIO()
+    pstats.Stats(perfil, stream=saida).sort_stats('cumulative').print_stats(linhas)
+    return saida.getvalue()
+
+
+@contextlib.contextmanager
+def perfilar(arquivo=None, linhas=LINHAS_RESUMO_PERFIL):
+    """
+    Perfila o bloco com cProfile quando `arquivo` é informado; sem ele, não faz nada.
+
+    Ao final grava o `.pstats` (se `arquivo` não for '-') e imprime as funções mais
+    custosas por tempo acumulado na saída de erro.
+    """
+    perfil = iniciar_perfil(bool(arquivo))
+    try:
+        yield perfil
+    finally:
+        if perfil is not None:
+            resumo = encerrar_perfil(perfil, None if arquivo == '-' else arquivo, linhas)
+            print(resumo, file=sys.stderr)
+            if arquivo != '-':
+                print(f"✅ Perfil salvo em '{arquivo}' (abra com `python -m pstats {arquivo}`).", file=sys.stderr)
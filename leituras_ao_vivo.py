@@ -0,0 +1,158 @@
+# Arquivo: leituras_ao_vivo.py
+"""
+Caminho rápido da ingestão para o painel, sem passar pelo GitHub.
+
+Com a ingestão contínua (`python atualizar_dados.py --continuo`) rodando na mesma
+máquina do painel, cada leitura nova vai para um banco SQLite local em modo WAL
+(`leituras_ao_vivo.sqlite`) antes de qualquer CSV. No modo WAL a escrita da ingestão
+não bloqueia as leituras do painel, e vice-versa.
+
+Cada gravação recebe uma versão crescente; leituras novas e corrigidas ficam com a
+versão da gravação em que chegaram, repetições idênticas são ignoradas. O painel
+guarda a última versão que já viu (a marca d'água) e consulta só as linhas acima
+dela, alimentando o `MotorRiscoIncremental` com elas: nenhum arquivo é baixado de
+novo e o risco aparece segundos depois da ingestão.
+"""
+import os
+import sqlite3
+import threading
+from contextlib import closing
+import numpy as np
+import pandas as pd
+from processamento import MotorRiscoIncremental, JANELA_2H
+
+ARQUIVO_BANCO_LEITURAS = os.getenv('RISCO_BANCO_LEITURAS', 'leituras_ao_vivo.sqlite')
+DIAS_MANTIDOS = 3
+INTERVALO_CONSULTA_SEGUNDOS = 10
+TIMEOUT_BANCO_SEGUNDOS = 30
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS leituras (
+    codestacao TEXT NOT NULL,
+    datahora TEXT NOT NULL,
+    nome TEXT,
+    valor REAL,
+    versao INTEGER NOT NULL,
+    PRIMARY KEY (codestacao, datahora)
+);
+CREATE INDEX IF NOT EXISTS leituras_por_versao ON leituras (versao);
+CREATE TABLE IF NOT EXISTS controle (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    versao INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO controle (id, versao) VALUES (0, 0);
+"""
+
+_GRAVAR = """
+INSERT INTO leituras (codestacao, datahora, nome, valor, versao) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (codestacao, datahora) DO UPDATE
+    SET nome = excluded.nome, valor = excluded.valor, versao = excluded.versao
+    WHERE leituras.valor IS NOT excluded.valor OR leituras.nome IS NOT excluded.nome
+"""
+
+
+def conectar(caminho=ARQUIVO_BANCO_LEITURAS, somente_leitura=False):
+    """Abre o banco (criando as tabelas, em modo WAL) ou, com `somente_leitura`, só o lê."""
+    if somente_leitura:
+        return sqlite3.connect(f"file:{caminho}?mode=ro", uri=True, timeout=TIMEOUT_BANCO_SEGUNDOS,
+                               check_same_thread=False)
+    conexao = sqlite3.connect(caminho, timeout=TIMEOUT_BANCO_SEGUNDOS)
+    conexao.execute('PRAGMA journal_mode=WAL')
+    conexao.execute('PRAGMA synchronous=NORMAL')
+    conexao.executescript(_ESQUEMA)
+    return conexao
+
+
+def gravar_leituras(df_leituras, caminho=ARQUIVO_BANCO_LEITURAS, dias_mantidos=DIAS_MANTIDOS):
+    """
+    Grava as leituras (no formato devolvido pela API, já no horário de Recife) com uma
+    versão nova e descarta as mais antigas que `dias_mantidos`. Devolve (linhas novas
+    ou corrigidas, versão da gravação).
+    """
+    if df_leituras.empty:
+        return 0, None
+    df = df_leituras.drop_duplicates(subset=['codestacao', 'datahora'], keep='last')
+    valores = pd.to_numeric(df['valor'], errors='coerce').astype(object)
+    nomes = df['nome'].astype(object) if 'nome' in df.columns else pd.Series(None, index=df.index, dtype=object)
+    with closing(conectar(caminho)) as conexao:
+        with conexao:
+            conexao.execute('BEGIN IMMEDIATE')
+            versao = conexao.execute('SELECT versao + 1 FROM controle WHERE id = 0').fetchone()[0]
+            antes = conexao.total_changes
+            conexao.executemany(_GRAVAR, zip(
+                df['codestacao'].astype(str), df['datahora'].astype(str),
+                nomes.where(nomes.notna(), None), valores.where(valores.notna(), None),
+                [versao] * len(df)))
+            gravadas = conexao.total_changes - antes
+            if gravadas:
+                conexao.execute('UPDATE controle SET versao = ? WHERE id = 0', (versao,))
+            limite = str(np.datetime64(str(df['datahora'].astype(str).max())[:10]) - dias_mantidos)
+            conexao.execute('DELETE FROM leituras WHERE datahora < ?', (limite,))
+    return gravadas, versao if gravadas else versao - 1
+
+
+def ler_desde(marca=0, inicio=None, fim=None, caminho=ARQUIVO_BANCO_LEITURAS):
+    """
+    Leituras com versão acima de `marca` (e `datahora` em [inicio, fim), se dados), no
+    formato do cálculo (`datahora`, `nomeEstacao`, `valorMedida`), e a versão atual do
+    banco, que é a próxima marca. As duas consultas veem o mesmo instante do banco.
+    """
+    condicoes, parametros = ['versao > ?'], [int(marca)]
+    if inicio is not None:
+        condicoes.append('datahora >= ?')
+        parametros.append(str(inicio))
+    if fim is not None:
+        condicoes.append('datahora < ?')
+        parametros.append(str(fim))
+    with closing(conectar(caminho, somente_leitura=True)) as conexao:
+        conexao.execute('BEGIN')
+        versao = conexao.execute('SELECT versao FROM controle WHERE id = 0').fetchone()[0]
+        df = pd.read_sql_query(
+            f"SELECT datahora, nome AS nomeEstacao, valor AS valorMedida FROM leituras "
+            f"WHERE {' AND '.join(condicoes)} ORDER BY datahora", conexao, params=parametros)
+        conexao.execute('COMMIT')
+    df['datahora'] = pd.to_datetime(df['datahora'])
+    return df, versao
+
+
+class AcompanhamentoAoVivo:
+    """
+    Risco de um dia alimentado pelo banco local: a cada `atualizar()`, só as linhas
+    acima da marca d'água são lidas e entregues ao motor incremental. Uma leitura
+    atrasada ou corrigida (ou um banco recriado) faz reler o dia inteiro do banco.
+    Uma instância pode ser compartilhada entre sessões: se outra thread já estiver
+    consultando, `atualizar()` devolve a tabela atual sem esperar.
+    """
+
+    def __init__(self, data, estacoes_desejadas, serie_mare, caminho=ARQUIVO_BANCO_LEITURAS):
+        self.caminho = caminho
+        self.motor = MotorRiscoIncremental([data], estacoes_desejadas, serie_mare, incluir_horas_anteriores=True)
+        self.inicio = str(np.datetime64(data, 's') - np.timedelta64(JANELA_2H, 's')).replace('T', ' ')
+        self.fim = str(np.datetime64(data) + 1)
+        self.marca = 0
+        self.ultima_leitura = None
+        self._trava = threading.Lock()
+
+    def _recomecar(self):
+        df, versao = ler_desde(0, self.inicio, self.fim, self.caminho)
+        self.motor.reiniciar()
+        self.motor.atualizar(df)
+        return df, versao
+
+    def atualizar(self):
+        """Consulta o banco e devolve a tabela de risco do dia (cópia rasa, pode ser alterada)."""
+        if not self._trava.acquire(blocking=False):
+            return self.motor.tabela.copy(deep=False)
+        try:
+            df, versao = ler_desde(self.marca, self.inicio, self.fim, self.caminho)
+            if versao < self.marca:
+                df, versao = self._recomecar()
+            elif not df.empty and self.motor.atualizar(df, somente_novas=self.marca > 0) is None:
+                df, versao = self._recomecar()
+            self.marca = versao
+            if not df.empty:
+                ultima = df['datahora'].max().strftime('%Y-%m-%d %H:%M:%S')
+                self.ultima_leitura = max(self.ultima_leitura or '', ultima)
+            return self.motor.tabela.copy(deep=False)
+        finally:
+            self._trava.release()
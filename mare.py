@@ -0,0 +1,112 @@
+# Arquivo: mare.py
+"""
+Série de maré (AM) em memória, com consulta por horário sem junção por texto.
+
+As alturas ficam em um array float32 em que a posição i é a hora i contada a partir
+de 1º de janeiro, 00:00, do primeiro ano da tabela. Um ano inteiro ocupa ~35 kB, então
+várias tabelas anuais cabem em memória sem custo.
+
+Fora da tabela (outro ano, ou horas sem valor), a série pode recorrer a um modelo
+harmônico (`mare_harmonica.MareHarmonica`): `com_harmonica()`, com as constantes
+gravadas em `tide/constituintes_harmonicos.csv` ou, sem elas, ajustado à própria tabela.
+"""
+import numpy as np
+import pandas as pd
+
+UMA_HORA = 60 * 60
+
+
+def _segundos(datahora):
+    """Horário de parede (sem fuso) em segundos inteiros desde 1970."""
+    serie = pd.to_datetime(pd.Series(datahora))
+    if serie.dt.tz is not None:
+        serie = serie.dt.tz_localize(None)
+    return serie.to_numpy(dtype='datetime64[s]').astype(np.int64)
+
+
+class SerieMare:
+    """Alturas horárias de maré indexadas pela hora desde o início do ano."""
+
+    def __init__(self, origem, alturas, harmonica=None):
+        self.origem = int(origem)  # segundos desde 1970 de 1º/jan 00:00 do primeiro ano
+        self.alturas = np.asarray(alturas, dtype=np.float32)
+        self.harmonica = harmonica  # modelo usado onde a tabela não tem valor
+
+    @classmethod
+    def de_dataframe(cls, df, coluna_altura='altura'):
+        """Monta a série a partir de um DataFrame com `datahora` e a coluna de altura."""
+        segundos = _segundos(df['datahora'])
+        if len(segundos) == 0:
+            return cls(0, np.zeros(0))
+        ano_inicial = segundos.min().astype('datetime64[s]').astype('datetime64[Y]')
+        origem = int(ano_inicial.astype('datetime64[s]').astype(np.int64))
+        horas = (segundos - origem) // UMA_HORA
+        alturas = np.full(int(horas.max()) + 1, np.nan, dtype=np.float32)
+        alturas[horas] = pd.to_numeric(df[coluna_altura], errors='coerce').to_numpy(dtype=np.float32)
+        return cls(origem, alturas)
+
+    @classmethod
+    def de_csv(cls, caminho_ou_url):
+        """Lê o arquivo de maré (`datahora`, `altura`)."""
+        return cls.de_dataframe(pd.read_csv(caminho_ou_url))
+
+    def com_harmonica(self, modelo=None, arquivo_constituintes=None):
+        """
+        A mesma série, completada pelo modelo harmônico onde a tabela não tem valor.
+        Sem `modelo`, as constantes são lidas de `arquivo_constituintes` (caminho ou
+        buffer); sem o arquivo, as constituintes são ajustadas à própria tabela.
+        """
+        from mare_harmonica import MareHarmonica
+        if modelo is None and arquivo_constituintes is not None:
+            try:
+                modelo = MareHarmonica.de_csv(arquivo_constituintes)
+            except FileNotFoundError:
+                modelo = None
+        if modelo is None and not self.vazia:
+            modelo = MareHarmonica.de_serie(self)
+        return SerieMare(self.origem, self.alturas, modelo)
+
+    @property
+    def vazia(self):
+        return not np.isfinite(self.alturas).any() and (self.harmonica is None or self.harmonica.vazia)
+
+    def _completar(self, resultado, datahora, consulta):
+        faltando = np.isnan(resultado)
+        if self.harmonica is not None and faltando.any():
+            segundos = datahora if isinstance(datahora, np.ndarray) and datahora.dtype.kind == 'i' else _segundos(datahora)
+            resultado[faltando] = getattr(self.harmonica, consulta)(segundos[faltando])
+        return resultado
+
+    def _posicoes(self, datahora):
+        segundos = datahora if isinstance(datahora, np.ndarray) and datahora.dtype.kind == 'i' else _segundos(datahora)
+        return (segundos - self.origem) / UMA_HORA
+
+    def no_horario(self, datahora):
+        """AM da hora cheia de cada horário (o mesmo que juntar por data e 'HH:00:00')."""
+        hora = np.floor(self._posicoes(datahora)).astype(np.int64)
+        dentro = (hora >= 0) & (hora < len(self.alturas))
+        resultado = np.full(len(hora), np.nan, dtype=np.float32)
+        resultado[dentro] = self.alturas[hora[dentro]]
+        return self._completar(resultado, datahora, 'no_horario')
+
+    def interpolada(self, datahora):
+        """AM interpolada linearmente entre as horas cheias, para horários sub-horários."""
+        posicao = self._posicoes(datahora)
+        hora = np.floor(posicao).astype(np.int64)
+        fracao = (posicao - hora).astype(np.float32)
+        dentro = (hora >= 0) & (hora < len(self.alturas))
+        resultado = np.full(len(hora), np.nan, dtype=np.float32)
+        antes = self.alturas[hora[dentro]]
+        depois = np.where(fracao[dentro] > 0, np.append(self.alturas, np.nan)[hora[dentro] + 1], antes)
+        resultado[dentro] = antes + (depois - antes) * fracao[dentro]
+        return self._completar(resultado, datahora, 'interpolada')
+
+    def para_dataframe(self):
+        """Tabela com `data`, `hora_ref` e `AM` (formato antigo, para exibição)."""
+        validas = np.flatnonzero(np.isfinite(self.alturas))
+        datahora = pd.to_datetime(self.origem + validas * UMA_HORA, unit='s')
+        return pd.DataFrame({
+            'data': datahora.strftime('%Y-%m-%d'),
+            'hora_ref': datahora.strftime('%H:00:00'),
+            'AM': self.alturas[validas],
+        })
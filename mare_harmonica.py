@@ -0,0 +1,224 @@
+# Arquivo: mare_harmonica.py
+"""
+Previsão de maré por constituintes harmônicas, vetorizada em NumPy.
+
+A altura em cada instante é
+
+    h(t) = Z0 + Σ f_i(t) · H_i · cos(ω_i · t + u_i(t) − g_i)
+
+com t em horas desde 2000-01-01 00:00 (horário de parede de Recife, o mesmo dos
+outros arquivos), ω_i a velocidade angular astronômica de cada constituinte e f_i,
+u_i as correções nodais (ciclo de 18,6 anos da Lua). As constantes H_i e g_i são
+ajustadas por mínimos quadrados à tabela horária `tide/mare_calculada_hora_em_hora_ano-completo.csv`
+e podem ser gravadas em um CSV pequeno (`tide/constituintes_harmonicos.csv`), que
+basta para prever qualquer ano, em qualquer resolução.
+
+A tabela horária tem trechos de dias com a altura quase parada (lacunas preenchidas
+por interpolação); esses trechos ficam fora do ajuste e da avaliação.
+
+    python mare_harmonica.py [--mare tide/mare_...csv] [--saida tide/constituintes_harmonicos.csv]
+"""
+import os
+import sys
+import argparse
+import functools
+import numpy as np
+import pandas as pd
+
+ARQUIVO_MARE = os.path.join('tide', 'mare_calculada_hora_em_hora_ano-completo.csv')
+ARQUIVO_CONSTITUINTES = os.path.join('tide', 'constituintes_harmonicos.csv')
+EPOCA = int(np.datetime64('2000-01-01T00:00:00', 's').astype(np.int64))
+UMA_HORA = 60 * 60
+LINHAS_POR_LOTE = 100_000
+VARIACAO_MINIMA_POR_HORA = 0.03  # m; abaixo disso por horas seguidas, o trecho é lacuna preenchida
+HORAS_MINIMAS_PARADA = 4
+
+# Velocidade angular (graus/hora) e correção nodal de cada constituinte. A correção é
+# dada pelos expoentes das constituintes base: f = Π f_base^|e| e u = Σ e · u_base.
+CONSTITUINTES = {
+    'SA': (0.0410686, {}), 'SSA': (0.0821373, {}), 'MSM': (0.4715211, {'MM': 1}),
+    'MM': (0.5443747, {'MM': 1}), 'MSF': (1.0158958, {'M2': -1}), 'MF': (1.0980331, {'MF': 1}),
+    '2Q1': (12.8542862, {'O1': 1}), 'Q1': (13.3986609, {'O1': 1}), 'RHO1': (13.4715145, {'O1': 1}),
+    'O1': (13.9430356, {'O1': 1}), 'P1': (14.9589314, {}), 'K1': (15.0410686, {'K1': 1}),
+    'J1': (15.5854433, {'J1': 1}), 'OO1': (16.1391017, {'OO1': 1}),
+    'EPS2': (27.4238337, {'M2': 1}), '2N2': (27.8953548, {'M2': 1}), 'MU2': (27.9682084, {'M2': 1}),
+    'N2': (28.4397295, {'M2': 1}), 'NU2': (28.5125831, {'M2': 1}), 'M2': (28.9841042, {'M2': 1}),
+    'LDA2': (29.4556253, {'M2': 1}), 'L2': (29.5284789, {'M2': 1}), 'S2': (30.0, {}),
+    'K2': (30.0821373, {'K2': 1}), '2SM2': (31.0158958, {'M2': -1}),
+    '2MK3': (42.9271398, {'M2': 2, 'K1': -1}), 'M3': (43.4761563, {'M2': 1.5}),
+    'MK3': (44.0251729, {'M2': 1, 'K1': 1}), 'SK3': (45.0410686, {'K1': 1}),
+    'MN4': (57.4238337, {'M2': 2}), 'M4': (57.9682084, {'M2': 2}), 'MS4': (58.9841042, {'M2': 1}),
+    'S4': (60.0, {}), '2MN6': (86.4079380, {'M2': 3}), 'M6': (86.9523127, {'M2': 3}),
+    '2MS6': (87.9682084, {'M2': 2}), 'S6': (90.0, {}), 'M8': (115.9364166, {'M2': 4}),
+}
+
+
+def _segundos(datahora):
+    """Horário de parede (sem fuso) em segundos inteiros desde 1970."""
+    if isinstance(datahora, np.ndarray) and datahora.dtype.kind == 'i':
+        return datahora
+    serie = pd.to_datetime(pd.Series(datahora))
+    if serie.dt.tz is not None:
+        serie = serie.dt.tz_localize(None)
+    return serie.to_numpy(dtype='datetime64[s]').astype(np.int64)
+
+
+def _fatores_base(segundos):
+    """f e u (radianos) das constituintes base, em função da longitude do nodo lunar."""
+    dias_j2000 = (segundos - EPOCA) / 86400.0 - 0.5
+    n = np.radians(125.0445479 - 0.0529537628 * dias_j2000)
+    cos1, cos2, cos3 = np.cos(n), np.cos(2 * n), np.cos(3 * n)
+    sen1, sen2, sen3 = np.sin(n), np.sin(2 * n), np.sin(3 * n)
+    return {
+        'M2': (1.0004 - 0.0373 * cos1 + 0.0002 * cos2, -2.14 * sen1),
+        'K1': (1.0060 + 0.1150 * cos1 - 0.0088 * cos2 + 0.0006 * cos3, -8.86 * sen1 + 0.68 * sen2 - 0.07 * sen3),
+        'O1': (1.0089 + 0.1871 * cos1 - 0.0147 * cos2 + 0.0014 * cos3, 10.80 * sen1 - 1.34 * sen2 + 0.19 * sen3),
+        'K2': (1.0241 + 0.2863 * cos1 + 0.0083 * cos2 - 0.0015 * cos3, -17.74 * sen1 + 0.68 * sen2 - 0.04 * sen3),
+        'J1': (1.1029 + 0.1676 * cos1 - 0.0170 * cos2 + 0.0016 * cos3, -12.94 * sen1 + 1.34 * sen2 - 0.19 * sen3),
+        'OO1': (1.1027 + 0.6504 * cos1 + 0.0317 * cos2 - 0.0014 * cos3, -36.68 * sen1 + 4.02 * sen2 - 0.57 * sen3),
+        'MF': (1.043 + 0.414 * cos1, -23.74 * sen1 + 2.68 * sen2 - 0.38 * sen3),
+        'MM': (1.000 - 0.130 * cos1, np.zeros_like(n)),
+    }
+
+
+def _argumentos(segundos, nomes):
+    """Matrizes (linhas × constituintes) do fator nodal f e do argumento ω·t + u, em radianos."""
+    horas = (segundos - EPOCA) / UMA_HORA
+    base = _fatores_base(segundos)
+    f = np.ones((len(segundos), len(nomes)))
+    argumento = np.outer(horas, np.radians([CONSTITUINTES[nome][0] for nome in nomes]))
+    for j, nome in enumerate(nomes):
+        for constituinte, expoente in CONSTITUINTES[nome][1].items():
+            fator, correcao = base[constituinte]
+            f[:, j] *= fator ** abs(expoente)
+            argumento[:, j] += np.radians(expoente * correcao)
+    return f, argumento
+
+
+def trechos_parados(alturas, variacao_minima=VARIACAO_MINIMA_POR_HORA, horas_minimas=HORAS_MINIMAS_PARADA):
+    """Máscara das horas em trechos com a altura quase parada por `horas_minimas` horas ou mais."""
+    lento = np.abs(np.diff(alturas, prepend=np.nan)) < variacao_minima
+    mudou = np.r_[True, lento[1:] != lento[:-1]]
+    inicios = np.flatnonzero(mudou)
+    tamanhos = np.diff(np.r_[inicios, len(alturas)])
+    tamanho_do_trecho = np.repeat(tamanhos, tamanhos)
+    return lento & (tamanho_do_trecho >= horas_minimas)
+
+
+class MareHarmonica:
+    """Modelo harmônico de maré com a mesma consulta da `mare.SerieMare` (`no_horario`, `interpolada`)."""
+
+    def __init__(self, nivel_medio, nomes, amplitudes, fases):
+        self.nivel_medio = float(nivel_medio)
+        self.nomes = list(nomes)
+        self.amplitudes = np.asarray(amplitudes, dtype=np.float64)
+        self.fases = np.asarray(fases, dtype=np.float64)  # graus
+        # Previsões por período, memorizadas (a mesma faixa de dias é pedida a cada atualização).
+        self.prever_periodo = functools.lru_cache(maxsize=32)(self._prever_periodo)
+
+    @classmethod
+    def ajustar(cls, datahora, alturas, nomes=None):
+        """Ajusta nível médio, amplitudes e fases por mínimos quadrados às alturas observadas."""
+        nomes = list(nomes or CONSTITUINTES)
+        segundos = _segundos(datahora)
+        alturas = np.asarray(alturas, dtype=np.float64)
+        validas = np.isfinite(alturas)
+        f, argumento = _argumentos(segundos[validas], nomes)
+        matriz = np.column_stack([np.ones(validas.sum()), f * np.cos(argumento), f * np.sin(argumento)])
+        coeficientes, *_ = np.linalg.lstsq(matriz, alturas[validas], rcond=None)
+        a, b = coeficientes[1:len(nomes) + 1], coeficientes[len(nomes) + 1:]
+        return cls(coeficientes[0], nomes, np.hypot(a, b), np.degrees(np.arctan2(b, a)) % 360)
+
+    @classmethod
+    def de_serie(cls, serie_mare, nomes=None):
+        """Ajusta o modelo a uma `SerieMare` horária, sem os trechos parados."""
+        horas = np.flatnonzero(np.isfinite(serie_mare.alturas))
+        alturas = serie_mare.alturas[horas].astype(np.float64)
+        usadas = ~trechos_parados(alturas)
+        return cls.ajustar(serie_mare.origem + horas[usadas] * UMA_HORA, alturas[usadas], nomes)
+
+    @classmethod
+    def de_csv(cls, caminho=ARQUIVO_CONSTITUINTES):
+        """Lê as constantes gravadas por `para_csv` (`constituinte`, `amplitude`, `fase`; Z0 é o nível médio)."""
+        df = pd.read_csv(caminho)
+        nivel = df['constituinte'] == 'Z0'
+        return cls(df.loc[nivel, 'amplitude'].iloc[0], df.loc[~nivel, 'constituinte'],
+                   df.loc[~nivel, 'amplitude'], df.loc[~nivel, 'fase'])
+
+    def para_csv(self, caminho=ARQUIVO_CONSTITUINTES):
+        df = pd.DataFrame({'constituinte': ['Z0'] + self.nomes,
+                           'amplitude': np.r_[self.nivel_medio, self.amplitudes].round(5),
+                           'fase': np.r_[0.0, self.fases].round(3)})
+        df.to_csv(caminho, index=False)
+
+    @property
+    def vazia(self):
+        return not self.nomes
+
+    def prever(self, datahora):
+        """Altura prevista em cada horário (array de segundos inteiros ou datas), em uma chamada vetorizada."""
+        segundos = _segundos(datahora)
+        resultado = np.empty(len(segundos), dtype=np.float64)
+        fases = np.radians(self.fases)
+        for inicio in range(0, len(segundos), LINHAS_POR_LOTE):
+            lote = segundos[inicio:inicio + LINHAS_POR_LOTE]
+            f, argumento = _argumentos(lote, self.nomes)
+            resultado[inicio:inicio + LINHAS_POR_LOTE] = self.nivel_medio + (f * np.cos(argumento - fases)) @ self.amplitudes
+        return resultado
+
+    def _prever_periodo(self, inicio, fim, passo_minutos=60):
+        """Alturas de `inicio` (incluso) a `fim` (excluso) a cada `passo_minutos` (somente leitura)."""
+        segundos = np.arange(np.datetime64(inicio, 's'), np.datetime64(fim, 's'),
+                             np.timedelta64(passo_minutos * 60, 's')).astype(np.int64)
+        alturas = self.prever(segundos).astype(np.float32)
+        alturas.setflags(write=False)
+        return alturas
+
+    def no_horario(self, datahora):
+        """AM da hora cheia de cada horário, como `SerieMare.no_horario`."""
+        segundos = _segundos(datahora)
+        if len(segundos) == 0:
+            return np.zeros(0, dtype=np.float32)
+        primeiro_dia = segundos.min() // 86400 * 86400
+        ultimo_dia = segundos.max() // 86400 * 86400 + 86400
+        alturas = self.prever_periodo(str(np.datetime64(int(primeiro_dia), 's')), str(np.datetime64(int(ultimo_dia), 's')))
+        return alturas[(segundos - primeiro_dia) // UMA_HORA]
+
+    def interpolada(self, datahora):
+        """AM no próprio instante de cada horário (sem interpolar: o modelo é contínuo)."""
+        return self.prever(datahora).astype(np.float32)
+
+
+def avaliar(modelo, serie_mare):
+    """Erro do modelo contra a tabela horária, fora dos trechos parados: {'horas', 'rms', 'p90', 'maximo'} em metros."""
+    horas = np.flatnonzero(np.isfinite(serie_mare.alturas))
+    alturas = serie_mare.alturas[horas].astype(np.float64)
+    usadas = ~trechos_parados(alturas)
+    erro = np.abs(modelo.prever(serie_mare.origem + horas[usadas] * UMA_HORA) - alturas[usadas])
+    return {'horas': int(usadas.sum()), 'excluidas': int((~usadas).sum()), 'rms': float(np.sqrt(np.mean(erro ** 2))),
+            'p90': float(np.percentile(erro, 90)), 'maximo': float(erro.max())}
+
+
+def main():
+    from mare import SerieMare
+
+    parser = argparse.ArgumentParser(description="Ajusta as constituintes harmônicas à tabela de maré horária.")
+    parser.add_argument('--mare', default=ARQUIVO_MARE, help="Tabela horária de maré (datahora, altura).")
+    parser.add_argument('--saida', default=ARQUIVO_CONSTITUINTES, help="Arquivo das constantes ajustadas.")
+    args = parser.parse_args()
+
+    try:
+        serie = SerieMare.de_csv(args.mare)
+    except (OSError, ValueError) as e:
+        print(f"❌ Não foi possível ler a tabela de maré: {e}", file=sys.stderr)
+        sys.exit(1)
+    modelo = MareHarmonica.de_serie(serie)
+    erro = avaliar(modelo, serie)
+    print(f"Ajuste em {erro['horas']} horas ({erro['excluidas']} em trechos parados ficaram de fora): "
+          f"erro RMS {erro['rms'] * 100:.1f} cm, p90 {erro['p90'] * 100:.1f} cm, máximo {erro['maximo'] * 100:.1f} cm.")
+    modelo.para_csv(args.saida)
+    print(f"✅ {len(modelo.nomes)} constituintes gravadas em '{args.saida}'.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,342 @@
+# Arquivo: processamento.py
+"""
+Cálculo do indicador de chuva VP sem dependência do Streamlit.
+
+VP = chuva_10min * 6 + chuva_2h, em que cada termo é a soma das leituras da
+estação na janela (t - janela, t] e o valor horário é o da última leitura da hora.
+"""
+import numpy as np
+import pandas as pd
+
+JANELA_10MIN = 10 * 60
+JANELA_2H = 2 * 60 * 60
+UMA_HORA = 60 * 60
+UM_DIA = 24 * UMA_HORA
+HORAS_REF = np.array([f'{h:02d}:00:00' for h in range(24)])
+CLASSES_RISCO = ['Baixo', 'Moderado', 'Moderado Alto', 'Alto']
+LIMIARES_RISCO = (30, 50, 100)  # nível de risco (VP * AM) em que começa cada classe acima de 'Baixo'
+COLUNAS_TABELA_RISCO = ['data', 'hora_ref', 'nomeEstacao', 'VP', 'AM', 'Nivel_Risco_Valor', 'Classificacao_Risco']
+
+
+def _segundos(datahora):
+    """Horário de parede em segundos inteiros desde 1970 (chave de tempo do motor)."""
+    if datahora.dt.tz is not None:
+        datahora = datahora.dt.tz_localize(None)
+    return datahora.to_numpy(dtype='datetime64[s]').astype(np.int64)
+
+
+def _dias(datas):
+    return np.asarray(list(datas), dtype='datetime64[D]').astype(np.int64)
+
+
+def _formatar_datas(segundos):
+    """'AAAA-MM-DD' de cada horário, formatando só uma vez cada dia distinto."""
+    dias, inverso = np.unique(segundos // UM_DIA, return_inverse=True)
+    return dias.astype('datetime64[D]').astype(str)[inverso]
+
+
+def _formatar_horas(segundos):
+    """'HH:00:00' de cada horário, a partir de uma tabela com as 24 horas."""
+    return HORAS_REF[(segundos % UM_DIA) // UMA_HORA]
+
+
+def somas_moveis(chave, valores, janelas):
+    """
+    Somas móveis por tempo, para todas as estações de uma vez.
+
+    `chave` é o tempo em segundos já deslocado por estação (estações diferentes nunca
+    ficam a menos de uma janela umas das outras) e ordenado. Para cada linha i e cada
+    janela w, soma as leituras válidas com chave em (chave[i] - w, chave[i]] usando somas
+    acumuladas; sem nenhuma leitura válida na janela o resultado é NaN, como no
+    `rolling(...).sum()` do pandas.
+    """
+    validos = ~np.isnan(valores)
+    soma_acumulada = np.concatenate(([0.0], np.cumsum(np.where(validos, valores, 0.0))))
+    contagem_acumulada = np.concatenate(([0], np.cumsum(validos)))
+    fim = np.arange(1, len(chave) + 1)
+    resultados = []
+    for janela in janelas:
+        inicio = np.searchsorted(chave, chave - janela, side='right')
+        soma = soma_acumulada[fim] - soma_acumulada[inicio]
+        soma[contagem_acumulada[fim] == contagem_acumulada[inicio]] = np.nan
+        resultados.append(soma)
+    return resultados
+
+
+def _ultimo_valido_por_grupo(grupo, valores):
+    """Posições da última linha com valor não nulo de cada grupo (grupos contíguos)."""
+    posicoes = np.flatnonzero(~np.isnan(valores))
+    grupos = grupo[posicoes]
+    ultimos = np.append(grupos[1:] != grupos[:-1], True) if len(grupos) else np.zeros(0, dtype=bool)
+    return grupos[ultimos], posicoes[ultimos]
+
+
+def calcular_vp_horario(codigos, segundos, valores):
+    """
+    Motor vetorizado do VP horário sobre arrays já prontos.
+
+    `codigos` são inteiros de estação, `segundos` o horário de cada leitura e `valores`
+    a chuva medida. Devolve (codigo, hora em segundos, VP) por estação e hora, ordenado
+    por estação e hora, só para as horas com VP definido.
+    """
+    if len(segundos) == 0:
+        vazio = np.zeros(0, dtype=np.int64)
+        return vazio, vazio, np.zeros(0)
+    ordem = np.lexsort((segundos, codigos))
+    codigos, segundos, valores = codigos[ordem], segundos[ordem], valores[ordem].astype(np.float64)
+
+    base = segundos.min()
+    deslocamento = int(segundos.max() - base) + JANELA_2H + 1
+    chave = codigos.astype(np.int64) * deslocamento + (segundos - base)
+    chuva_10min, chuva_2h = somas_moveis(chave, valores, (JANELA_10MIN, JANELA_2H))
+
+    # Equivalente ao resample('h').last(): última leitura não nula de cada hora, por coluna.
+    hora = segundos // UMA_HORA
+    horas_no_periodo = int(hora.max() - hora.min()) + 1
+    grupo = codigos.astype(np.int64) * horas_no_periodo + (hora - hora.min())
+    grupos_10min, pos_10min = _ultimo_valido_por_grupo(grupo, chuva_10min)
+    grupos_2h, pos_2h = _ultimo_valido_por_grupo(grupo, chuva_2h)
+    _, i_10min, i_2h = np.intersect1d(grupos_10min, grupos_2h, assume_unique=True, return_indices=True)
+    pos_10min, pos_2h = pos_10min[i_10min], pos_2h[i_2h]
+
+    vp = chuva_10min[pos_10min] * 6 + chuva_2h[pos_2h]
+    return codigos[pos_2h], hora[pos_2h] * UMA_HORA, vp
+
+
+def processar_dados_chuva_simplificado(df_chuva, datas_desejadas, estacoes_desejadas, incluir_horas_anteriores=False):
+    """
+    Calcula o indicador horário de chuva 'VP' (todas as estações de uma vez).
+
+    Com `incluir_horas_anteriores`, as leituras das 2h antes da meia-noite de cada data
+    entram nas janelas móveis (sem gerar linhas próprias), e o VP da madrugada deixa de
+    começar do zero.
+
+    Devolve `data`, `hora_ref`, `nomeEstacao` e `VP`, como a implementação de
+    referência, e também `datahora` (a hora cheia como datetime64), que
+    `executar_analise_risco_completa` usa para consultar a maré sem converter texto.
+    """
+    df = df_chuva[df_chuva['nomeEstacao'].isin(estacoes_desejadas)]
+    segundos = _segundos(df['datahora'])
+    dias = _dias(datas_desejadas)
+    no_periodo = np.isin(segundos // UM_DIA, dias)
+    if incluir_horas_anteriores:
+        no_periodo |= np.isin((segundos + JANELA_2H) // UM_DIA, dias)
+    if not no_periodo.any(): return pd.DataFrame()
+
+    codigos, nomes = pd.factorize(df['nomeEstacao'].to_numpy()[no_periodo], sort=True)
+    valores = pd.to_numeric(df['valorMedida'], errors='coerce').to_numpy(dtype=np.float64)[no_periodo]
+    cod_vp, hora_vp, vp = calcular_vp_horario(codigos, segundos[no_periodo], valores)
+    if incluir_horas_anteriores:
+        nas_datas = np.isin(hora_vp // UM_DIA, dias)
+        cod_vp, hora_vp, vp = cod_vp[nas_datas], hora_vp[nas_datas], vp[nas_datas]
+        if len(vp) == 0: return pd.DataFrame()
+
+    df_vp = pd.DataFrame({
+        'data': _formatar_datas(hora_vp),
+        'hora_ref': _formatar_horas(hora_vp),
+        'nomeEstacao': np.asarray(nomes)[cod_vp],
+        'VP': vp,
+        'datahora': pd.to_datetime(hora_vp, unit='s'),
+    })
+    return df_vp
+
+
+def processar_dados_chuva_por_estacao(df_chuva, datas_desejadas, estacoes_desejadas):
+    """ Implementação de referência do VP (laço por estação com rolling/resample do pandas). """
+    df = df_chuva[df_chuva['nomeEstacao'].isin(estacoes_desejadas)].copy()
+    df['data'] = df['datahora'].dt.date.astype(str)
+    df = df[df['data'].isin(datas_desejadas)]
+    if df.empty: return pd.DataFrame()
+    df = df.set_index('datahora').sort_index()
+    resultados_por_estacao = []
+    for estacao, grupo in df.groupby('nomeEstacao'):
+        chuva_10min = grupo['valorMedida'].rolling('10min').sum()
+        chuva_2h = grupo['valorMedida'].rolling('2h').sum()
+        temp_df = pd.DataFrame({'chuva_10min': chuva_10min, 'chuva_2h': chuva_2h})
+        agregado_horario = temp_df.resample('h').last()
+        agregado_horario['VP'] = (agregado_horario['chuva_10min'] * 6) + agregado_horario['chuva_2h']
+        agregado_horario['nomeEstacao'] = estacao
+        resultados_por_estacao.append(agregado_horario)
+    df_vp = pd.concat(resultados_por_estacao).reset_index()
+    df_vp.dropna(subset=['VP'], inplace=True)
+    df_vp['data'] = df_vp['datahora'].dt.strftime('%Y-%m-%d')
+    df_vp['hora_ref'] = df_vp['datahora'].dt.strftime('%H:00:00')
+    return df_vp[['data', 'hora_ref', 'nomeEstacao', 'VP']]
+
+
+def calcular_risco(df_final, limiares=LIMIARES_RISCO):
+    """ Calcula o Nível de Risco (VP * AM) e a Classificação (`limiares`: início de cada classe acima de 'Baixo'). """
+    if df_final.empty: return pd.DataFrame()
+    df_final['VP'] = pd.to_numeric(df_final['VP'], errors='coerce').round(2) 
+    df_final['AM'] = pd.to_numeric(df_final['AM'], errors='coerce').round(2)
+    df_final['Nivel_Risco_Valor'] = (df_final['VP'] * df_final['AM']).fillna(0).round(2)
+    bins = [-np.inf, *limiares, np.inf]
+    df_final['Classificacao_Risco'] = pd.cut(df_final['Nivel_Risco_Valor'], bins=bins, labels=CLASSES_RISCO, right=False)
+    return df_final
+
+
+def executar_analise_risco_completa(df_vp_calculado, df_am):
+    """
+    Junta VP e AM e chama o cálculo de risco.
+
+    `df_am` pode ser uma `mare.SerieMare` (consulta direta pelo horário de cada linha)
+    ou a tabela antiga com `data`, `hora_ref` e `AM` (junção pelas colunas de texto).
+    """
+    if df_vp_calculado.empty: return pd.DataFrame()
+    if isinstance(df_am, pd.DataFrame):
+        df_final = pd.merge(df_vp_calculado, df_am, on=['data', 'hora_ref'], how='left')
+    else:
+        df_final = df_vp_calculado.copy()
+        if 'datahora' not in df_final.columns:
+            df_final['datahora'] = pd.to_datetime(df_final['data'] + ' ' + df_final['hora_ref'])
+        df_final['AM'] = df_am.no_horario(df_final['datahora']).astype(np.float64)
+    df_risco = calcular_risco(df_final)
+    return df_risco
+
+
+class MotorRiscoIncremental:
+    """
+    Recalcula VP e risco só com as leituras novas entre uma atualização e outra.
+
+    Guarda, por estação, a marca d'água (horário da última leitura processada), as
+    leituras das últimas 2h (o que as janelas móveis ainda precisam) e os valores das
+    horas já agregadas. `atualizar` recebe o DataFrame de chuva (pode ser o dia inteiro:
+    o que está abaixo da marca é ignorado) e devolve só as linhas de risco que mudaram;
+    a tabela completa fica em `tabela`. O resultado é o mesmo de
+    `executar_analise_risco_completa(processar_dados_chuva_simplificado(...), df_am)`,
+    com o mesmo significado para `incluir_horas_anteriores`.
+    """
+
+    COLUNAS_CHAVE = ['nomeEstacao', 'data', 'hora_ref']
+
+    def __init__(self, datas_desejadas, estacoes_desejadas, df_am, incluir_horas_anteriores=False):
+        self.datas_desejadas = list(datas_desejadas)
+        self.estacoes_desejadas = list(estacoes_desejadas)
+        self.df_am = df_am
+        self.incluir_horas_anteriores = incluir_horas_anteriores
+        self.reiniciar()
+
+    def reiniciar(self):
+        """Descarta todo o estado; a próxima atualização recalcula tudo."""
+        self._dias = _dias(self.datas_desejadas)
+        self._marcas = {}        # estação -> segundos da última leitura processada
+        self._consumidas = {}    # estação -> (nº de leituras, soma) até a marca
+        self._janela = {}        # estação -> (segundos, valores) das últimas 2h
+        self._horas = {}         # (estação, hora em segundos) -> [chuva_10min, chuva_2h]
+        self.tabela = pd.DataFrame()
+
+    def _filtrar(self, df_chuva):
+        df = df_chuva[df_chuva['nomeEstacao'].isin(self.estacoes_desejadas)]
+        segundos = _segundos(df['datahora'])
+        no_periodo = np.isin(segundos // UM_DIA, self._dias)
+        if self.incluir_horas_anteriores:
+            no_periodo |= np.isin((segundos + JANELA_2H) // UM_DIA, self._dias)
+        nomes = df['nomeEstacao'].to_numpy()[no_periodo]
+        valores = pd.to_numeric(df['valorMedida'], errors='coerce').to_numpy(dtype=np.float64)[no_periodo]
+        return nomes, segundos[no_periodo], valores
+
+    def _historico_mudou(self, nomes, segundos, valores, marca_da_linha):
+        """Confere se as leituras abaixo da marca são as mesmas já processadas."""
+        antigas = segundos <= marca_da_linha
+        conferencia = (pd.DataFrame({'nome': nomes[antigas], 'valor': valores[antigas]})
+                       .groupby('nome')['valor'].agg(['size', 'sum']))
+        for estacao, (quantidade, soma) in self._consumidas.items():
+            quantidade_atual, soma_atual = conferencia.loc[estacao].tolist() if estacao in conferencia.index else (0, 0.0)
+            if quantidade_atual != quantidade or not np.isclose(soma_atual, soma):
+                return True
+        return False
+
+    def atualizar(self, df_chuva, somente_novas=False):
+        """
+        Processa as leituras acima da marca d'água e devolve as linhas de risco alteradas.
+
+        Com `somente_novas`, `df_chuva` traz apenas as leituras que chegaram desde a
+        última chamada (e não o dia inteiro), então o histórico não é conferido. Se
+        alguma delas estiver até a marca da sua estação (atrasada ou corrigida), nada é
+        processado e o retorno é None: quem chama deve reiniciar o motor e enviar o
+        conjunto completo.
+        """
+        nomes, segundos, valores = self._filtrar(df_chuva)
+        marca_da_linha = np.array([self._marcas.get(n, np.iinfo(np.int64).min) for n in nomes], dtype=np.int64) \
+            if len(nomes) else np.zeros(0, dtype=np.int64)
+        if somente_novas:
+            if (segundos <= marca_da_linha).any():
+                return None
+        elif self._marcas and self._historico_mudou(nomes, segundos, valores, marca_da_linha):
+            # Leitura atrasada ou corrigida: as janelas já fechadas mudaram, recomeça do zero.
+            self.reiniciar()
+            return self.atualizar(df_chuva)
+
+        novas = segundos > marca_da_linha
+        if not novas.any():
+            return pd.DataFrame()
+        nomes, segundos, valores = nomes[novas], segundos[novas], valores[novas]
+
+        # Junta as leituras guardadas das últimas 2h com as novas, todas as estações de uma vez.
+        estacoes = sorted(set(nomes))
+        janela_nomes = [np.full(len(self._janela[e][0]), e, dtype=object) for e in estacoes if e in self._janela]
+        janela_seg = [self._janela[e][0] for e in estacoes if e in self._janela]
+        janela_val = [self._janela[e][1] for e in estacoes if e in self._janela]
+        todos_nomes = np.concatenate(janela_nomes + [nomes.astype(object)])
+        todos_seg = np.concatenate(janela_seg + [segundos])
+        todos_val = np.concatenate(janela_val + [valores])
+        eh_nova = np.concatenate([np.zeros(len(s), dtype=bool) for s in janela_seg] + [np.ones(len(segundos), dtype=bool)])
+
+        codigos, tabela_nomes = pd.factorize(todos_nomes, sort=True)
+        ordem = np.lexsort((todos_seg, codigos))
+        codigos, todos_seg, todos_val, eh_nova = codigos[ordem], todos_seg[ordem], todos_val[ordem], eh_nova[ordem]
+        base = todos_seg.min()
+        deslocamento = int(todos_seg.max() - base) + JANELA_2H + 1
+        chave = codigos.astype(np.int64) * deslocamento + (todos_seg - base)
+        chuva_10min, chuva_2h = somas_moveis(chave, todos_val, (JANELA_10MIN, JANELA_2H))
+        chuva_10min[~eh_nova] = np.nan
+        chuva_2h[~eh_nova] = np.nan
+
+        hora = todos_seg // UMA_HORA
+        grupo = codigos.astype(np.int64) * (int(hora.max() - hora.min()) + 1) + (hora - hora.min())
+        alteradas = set()
+        for coluna, chuva in enumerate((chuva_10min, chuva_2h)):
+            _, posicoes = _ultimo_valido_por_grupo(grupo, chuva)
+            for pos in posicoes:
+                chave_hora = (tabela_nomes[codigos[pos]], int(hora[pos]) * UMA_HORA)
+                self._horas.setdefault(chave_hora, [np.nan, np.nan])[coluna] = chuva[pos]
+                alteradas.add(chave_hora)
+
+        # Avança as marcas e guarda só o que as janelas de 2h ainda vão usar.
+        for codigo, estacao in enumerate(tabela_nomes):
+            da_estacao = codigos == codigo
+            seg_estacao, val_estacao = todos_seg[da_estacao], todos_val[da_estacao]
+            marca = int(seg_estacao[-1])
+            manter = seg_estacao > marca - JANELA_2H
+            self._janela[estacao] = (seg_estacao[manter], val_estacao[manter])
+            self._marcas[estacao] = marca
+            novas_estacao = eh_nova[da_estacao]
+            quantidade, soma = self._consumidas.get(estacao, (0, 0.0))
+            self._consumidas[estacao] = (quantidade + int(novas_estacao.sum()),
+                                         soma + float(np.nansum(val_estacao[novas_estacao])))
+
+        return self._atualizar_tabela(alteradas)
+
+    def _atualizar_tabela(self, alteradas):
+        linhas = []
+        for estacao, hora in sorted(alteradas):
+            if hora // UM_DIA not in self._dias:
+                continue  # hora das 2h anteriores: só alimenta as janelas móveis
+            chuva_10min, chuva_2h = self._horas[(estacao, hora)]
+            if not (np.isnan(chuva_10min) or np.isnan(chuva_2h)):
+                linhas.append((estacao, hora, chuva_10min * 6 + chuva_2h))
+        if not linhas:
+            return pd.DataFrame()
+        estacoes, horas, vp = (np.array(coluna) for coluna in zip(*linhas))
+        df_vp = pd.DataFrame({
+            'data': _formatar_datas(horas),
+            'hora_ref': _formatar_horas(horas),
+            'nomeEstacao': estacoes,
+            'VP': vp,
+            'datahora': pd.to_datetime(horas, unit='s'),
+        })
+        df_alterado = executar_analise_risco_completa(df_vp, self.df_am)
+        tabela = pd.concat([self.tabela, df_alterado], ignore_index=True) if not self.tabela.empty else df_alterado
+        self.tabela = (tabela.drop_duplicates(subset=self.COLUNAS_CHAVE, keep='last')
+                       .sort_values(self.COLUNAS_CHAVE, kind='stable').reset_index(drop=True))
+        return df_alterado
@@ -1,144 +1,342 @@
+import io
+import os
+import functools
 import pandas as pd
-import requests
 import numpy as np
-from datetime import datetime, date
+from datetime import datetime, timedelta
 import pytz 
 import streamlit as st 
 import plotly.graph_objects as go 
+from plotly.subplots import make_subplots
+from processamento import (processar_dados_chuva_simplificado, executar_analise_risco_completa,
+                           MotorRiscoIncremental, COLUNAS_TABELA_RISCO)
+from mare import SerieMare
+from estacoes import RegistroEstacoes
+from cache_http import baixar
+from armazem import ArmazemCompartilhado, PANDAS_3
+from leituras_ao_vivo import AcompanhamentoAoVivo, ARQUIVO_BANCO_LEITURAS, INTERVALO_CONSULTA_SEGUNDOS
+from instrumentacao import etapa, posicao, registros, iniciar_perfil, encerrar_perfil
 
 # 1. ambiente dos arquivos
-URL_BASE_CHUVAS = 'https://raw.githubusercontent.com/RafaellaB/Diagramas-de-risco-din-mico/main/chuva_recife_' 
-SUFIXO_ARQUIVO_CHUVAS = '.csv'
+from dados_chuva import URL_BASE_CHUVAS, carregar_chuva_periodo, ler_tabela_risco
 URL_ARQUIVO_MARE_AM = 'https://raw.githubusercontent.com/RafaellaB/Diagramas-de-risco-din-mico/main/tide/mare_calculada_hora_em_hora_ano-completo.csv'
-CSV_DELIMITADOR = ',' 
-COLUNAS_NO_CSV_CHUVAS = ['datahora', 'nome', 'valor'] 
-COLUNAS_ESPERADAS_VP = ['datahora', 'nomeEstacao', 'valorMedida'] 
+URL_ARQUIVO_CONSTITUINTES = 'https://raw.githubusercontent.com/RafaellaB/Diagramas-de-risco-din-mico/main/tide/constituintes_harmonicos.csv'
+URL_ARQUIVO_ESTACOES = 'https://raw.githubusercontent.com/RafaellaB/Diagramas-de-risco-din-mico/main/estacoes.csv'
+# Seleção padrão do painel; as estações do cadastro que ainda não têm nome continuam nela.
+ESTACOES_PADRAO = ["Campina do Barreto", "Torreão", "RECIFE - APAC", "Imbiribeira", "Dois Irmãos"]
 # ==============================================================================
 
 
 # 2. funções cache para melhorar a performance  
 
 
-@st.cache_data(show_spinner=False)
-def carregar_dados_mare_cache(url_am_data):
-    """ Carrega o arquivo de maré (AM) ANUAL. Cache estático. """
-    df_am_raw = pd.read_csv(url_am_data)
-    df_am_raw.rename(columns={'datahora': 'datahora', 'altura': 'AM'}, inplace=True)
-    df_am_raw['datahora'] = pd.to_datetime(df_am_raw['datahora'])
-    df_am_raw['data'] = df_am_raw['datahora'].dt.strftime('%Y-%m-%d')
-    df_am_raw['hora_ref'] = df_am_raw['datahora'].dt.strftime('%H:00:00')
-    return df_am_raw[['data', 'hora_ref', 'AM']]
+# Copy-on-write (padrão no pandas 3) só no painel: o armazém entrega DataFrames sem cópia.
+if not PANDAS_3:
+    pd.set_option('mode.copy_on_write', True)
 
+TTL_DADOS_HOJE = 300 # segundos (5 minutos)
+MAX_DIAS_FECHADOS = 180 # tabelas (dia x estações) de dias fechados mantidas na memória
 
-@st.cache_data(ttl=300, show_spinner=False) # TTL = 300 segundos (5 minutos)
-def carregar_dados_chuva_cache(url_base, data_de_hoje_str, separador, colunas_csv):
-    """ Lê o arquivo de chuva do dia atual. Cache expira a cada 5 minutos. """
-    url_completa = f"{url_base}{data_de_hoje_str}{SUFIXO_ARQUIVO_CHUVAS}"
-    
-    try:
-        df_chuva_raw = pd.read_csv(url_completa, encoding='utf-8', sep=separador)
-        
-        if not all(col in df_chuva_raw.columns for col in colunas_csv):
-             st.error(f"ERRO DE COLUNA: O arquivo de chuva não tem as colunas esperadas: {colunas_csv}")
-             return pd.DataFrame()
 
-        df_chuva_raw.rename(columns={'nome': 'nomeEstacao', 'valor': 'valorMedida'}, inplace=True)
-        df_chuva_raw['datahora'] = pd.to_datetime(df_chuva_raw['datahora'])
-        
-        return df_chuva_raw
+@st.cache_resource(show_spinner=False)
+def armazem_compartilhado():
+    """ Armazém único do processo: maré, chuva de hoje e tabelas de risco, sem cópia entre sessões. """
+    return ArmazemCompartilhado()
+
+
+def carregar_dados_mare_cache(url_am_data, url_constituintes=URL_ARQUIVO_CONSTITUINTES):
+    """
+    Carrega o arquivo de maré (AM) ANUAL em uma série indexada por hora, somente leitura,
+    completada fora do ano da tabela pelo modelo harmônico das constantes publicadas
+    (ajustado à tabela só se elas não existirem). Carga única.
+    """
+    def carregar():
+        serie_mare = SerieMare.de_csv(io.BytesIO(baixar(url_am_data)))
+        try:
+            constituintes = io.BytesIO(baixar(url_constituintes))
+        except FileNotFoundError:
+            constituintes = None
+        return serie_mare.com_harmonica(arquivo_constituintes=constituintes)
+
+    return armazem_compartilhado().obter(('mare', url_am_data, url_constituintes), carregar)
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def carregar_registro_estacoes_cache(url_estacoes):
+    """ Cadastro de estações mantido pela ingestão. Cache de 1 hora. """
+    return RegistroEstacoes.de_csv(io.BytesIO(baixar(url_estacoes)))
+
+
+def carregar_dados_chuva_cache(url_base, data_de_hoje_str):
+    """
+    Lê as leituras de hoje e das 2h finais de ontem (para o VP da madrugada), cada uma
+    pela data do próprio horário. Do arquivo de ontem só os blocos da janela são
+    baixados. Compartilhado entre as sessões; recarregado a cada 5 minutos. Devolve
+    (leituras, versão da carga).
+    """
+    try:
+        return armazem_compartilhado().obter_com_versao(
+            ('chuva', url_base, data_de_hoje_str),
+            lambda: carregar_chuva_periodo([data_de_hoje_str], url_base, ultima_data=data_de_hoje_str),
+            ttl=TTL_DADOS_HOJE)
     
     except Exception as e:
         st.error(f"ERRO ao carregar arquivo de chuva de hoje ({data_de_hoje_str}). Verifique se o arquivo já existe no GitHub. Detalhe: {e}")
+        return pd.DataFrame(), 0
+
+
+def _ler_tabela_risco_ou_vazia(data_str):
+    try:
+        return ler_tabela_risco(data_str)
+    except Exception:
         return pd.DataFrame()
 
 
+def carregar_tabela_risco_cache(data_str, estacoes_desejadas):
+    """
+    Tabela de risco pré-calculada na ingestão, já filtrada pelas estações escolhidas.
+    Vazia se ainda não foi publicada. Compartilhada entre as sessões com a mesma
+    seleção; recarregada a cada 5 minutos.
+    """
+    armazem = armazem_compartilhado()
+    df_risco, versao = armazem.obter_com_versao(('tabela_risco', data_str), lambda: _ler_tabela_risco_ou_vazia(data_str),
+                                                ttl=TTL_DADOS_HOJE)
+    if df_risco.empty:
+        return df_risco
+    estacoes = tuple(estacoes_desejadas)
+    return armazem.obter(('tabela_risco', data_str, estacoes),
+                         lambda: df_risco[df_risco['nomeEstacao'].isin(estacoes)].reset_index(drop=True), origem=versao)
+
+
+def calcular_risco_hoje(df_chuva, versao_chuva, data_str, estacoes_desejadas, serie_mare):
+    """
+    Tabela de risco de hoje a partir das leituras brutas. Um único motor incremental
+    por seleção de estações atende todas as sessões: cada nova carga da chuva
+    (`versao_chuva`) é processada uma vez, só nas leituras novas, e a tabela
+    resultante é compartilhada.
+    """
+    armazem = armazem_compartilhado()
+    estacoes = tuple(estacoes_desejadas)
+
+    def atualizar_motor():
+        motor = armazem.obter(('motor', data_str, estacoes), lambda: MotorRiscoIncremental(
+            [data_str], estacoes, serie_mare, incluir_horas_anteriores=True))
+        with etapa('motor_incremental') as m:
+            m['linhas_alteradas'] = len(motor.atualizar(df_chuva))
+        return motor.tabela
+
+    return armazem.obter(('risco', data_str, estacoes), atualizar_motor, origem=versao_chuva)
+
+
 # 3. funções de processamento
 
-def processar_dados_chuva_simplificado(df_chuva, datas_desejadas, estacoes_desejadas):
-    """ Calcula o indicador horário de chuva 'VP'. """
-    df = df_chuva[df_chuva['nomeEstacao'].isin(estacoes_desejadas)].copy()
-    df['data'] = df['datahora'].dt.date.astype(str)
-    df = df[df['data'].isin(datas_desejadas)]
-    if df.empty: return pd.DataFrame()
-    df = df.set_index('datahora').sort_index()
-    resultados_por_estacao = []
-    for estacao, grupo in df.groupby('nomeEstacao'):
-        chuva_10min = grupo['valorMedida'].rolling('10min').sum()
-        chuva_2h = grupo['valorMedida'].rolling('2h').sum()
-        temp_df = pd.DataFrame({'chuva_10min': chuva_10min, 'chuva_2h': chuva_2h})
-        agregado_horario = temp_df.resample('h').last()
-        agregado_horario['VP'] = (agregado_horario['chuva_10min'] * 6) + agregado_horario['chuva_2h']
-        agregado_horario['nomeEstacao'] = estacao
-        resultados_por_estacao.append(agregado_horario)
-    df_vp = pd.concat(resultados_por_estacao).reset_index()
-    df_vp.dropna(subset=['VP'], inplace=True)
-    df_vp['data'] = df_vp['datahora'].dt.strftime('%Y-%m-%d')
-    df_vp['hora_ref'] = df_vp['datahora'].dt.strftime('%H:00:00')
-    return df_vp[['data', 'hora_ref', 'nomeEstacao', 'VP']]
-
-
-def calcular_risco(df_final):
-    """ Calcula o Nível de Risco (VP * AM) e a Classificação. """
-    if df_final.empty: return pd.DataFrame()
-    df_final['VP'] = pd.to_numeric(df_final['VP'], errors='coerce').round(2) 
-    df_final['AM'] = pd.to_numeric(df_final['AM'], errors='coerce').round(2)
-    df_final['Nivel_Risco_Valor'] = (df_final['VP'] * df_final['AM']).fillna(0).round(2)
-    bins = [-np.inf, 30, 50, 100, np.inf]
-    labels = ['Baixo', 'Moderado', 'Moderado Alto', 'Alto']
-    df_final['Classificacao_Risco'] = pd.cut(df_final['Nivel_Risco_Valor'], bins=bins, labels=labels, right=False)
-    return df_final
-
-
-def executar_analise_risco_completa(df_vp_calculado, df_am):
-    """ Mescla VP e AM e chama o cálculo de risco. """
-    if df_vp_calculado.empty: return pd.DataFrame()
-    df_final = pd.merge(df_vp_calculado, df_am, on=['data', 'hora_ref'], how='left')
-    df_risco = calcular_risco(df_final)
-    return df_risco
-
-
-def gerar_diagramas(df_analisado):
-    """ Gera o diagrama de risco (Heatmap + Scatter) para cada estação/dia. """
-    mapa_de_cores = {'Alto': '#D32F2F', 'Moderado Alto': '#FFA500', 'Moderado': '#FFC107', 'Baixo': '#4CAF50'}
-    definicoes_risco = {'Baixo': 'RA < 30', 'Moderado': '30 ≤ RA < 50', 'Moderado Alto': '50 ≤ RA < 100', 'Alto': 'RA ≥ 100'}
-    
-    for (data, estacao), grupo in df_analisado.groupby(['data', 'nomeEstacao']):
-        if grupo.empty: continue
-        
-        st.subheader(f"Diagrama de Risco: {estacao} - {pd.to_datetime(data).strftime('%d/%m/%Y')}")
-        fig = go.Figure()
-        
-        lim_x = max(110, grupo['VP'].max() * 1.2 if not grupo.empty else 110)
-        lim_y = 5 
-        x_grid, y_grid = np.arange(0, lim_x, 1), np.linspace(0, lim_y, 100)
-        z_grid = np.array([x * y for y in y_grid for x in x_grid]).reshape(len(y_grid), len(x_grid))
-        
-        colorscale = [[0, "#90EE90"], [30/100, "#FFD700"], [50/100, "#FFA500"], [1.0, "#D32F2F"]]
-        fig.add_trace(go.Heatmap(x=x_grid, y=y_grid, z=z_grid, colorscale=colorscale, showscale=False, zmin=0, zmax=100, hoverinfo='none'))
-        
-        grupo = grupo.sort_values(by='hora_ref')
-        fig.add_trace(go.Scatter(x=grupo['VP'], y=grupo['AM'], mode='lines', line=dict(color='black', width=1.5, dash='dash'), hoverinfo='none', showlegend=False))
-        
-        for _, ponto in grupo.iterrows():
-            cor_ponto = mapa_de_cores.get(ponto['Classificacao_Risco'], 'black')
-            fig.add_trace(go.Scatter(x=[ponto['VP']], y=[ponto['AM']], mode='markers', marker=dict(color=cor_ponto, size=12, line=dict(width=1, color='black')), 
-                                     hoverinfo='text', 
-                                     hovertext=f"<b>Hora:</b> {ponto['hora_ref']}<br><b>Risco:</b> {ponto['Classificacao_Risco']} ({ponto['Nivel_Risco_Valor']})<br><b>VP:</b> {ponto['VP']}<br><b>AM:</b> {ponto['AM']}", 
-                                     showlegend=False))
-        
-        for risco, definicao in definicoes_risco.items():
-            fig.add_trace(go.Scatter(x=[None], y=[None], mode='markers', marker=dict(color=mapa_de_cores[risco], size=10, symbol='square'), name=f"<b>{risco}</b>: {definicao}"))
-        
-        fig.update_layout(title=f'<b>{estacao}</b>', 
-                          xaxis_title='Índice de Precipitação (mm)', 
-                          yaxis_title='Índice de Altura da Maré (m)', 
-                          margin=dict(l=40, r=40, t=40, b=40), 
-                          showlegend=True, 
-                          legend_title_text='<b>Níveis de Risco</b>')
-        
-        st.plotly_chart(fig, use_container_width=True, key=f"chart_{data}_{estacao}")
+MAPA_DE_CORES = {'Alto': '#D32F2F', 'Moderado Alto': '#FFA500', 'Moderado': '#FFC107', 'Baixo': '#4CAF50'}
+DEFINICOES_RISCO = {'Baixo': 'RA < 30', 'Moderado': '30 ≤ RA < 50', 'Moderado Alto': '50 ≤ RA < 100', 'Alto': 'RA ≥ 100'}
+ESCALA_CORES_FUNDO = [[0, "#90EE90"], [30/100, "#FFD700"], [50/100, "#FFA500"], [1.0, "#D32F2F"]]
+LIM_Y_DIAGRAMA = 5
+
+
+def _limite_x(vp_max):
+    """ Limite do eixo VP, arredondado para cima em dezenas para reaproveitar o fundo. """
+    lim_x = max(110, vp_max * 1.2 if pd.notna(vp_max) else 110)
+    return int(np.ceil(lim_x / 10) * 10)
+
+
+@functools.lru_cache(maxsize=8)
+def _fundo_risco(lim_x):
+    """
+    Grade do fundo (VP x AM) calculada uma vez e reaproveitada por todos os diagramas.
+
+    Como RA = VP * AM é bilinear, uma grade grossa com `zsmooth='best'` (interpolação
+    bilinear no navegador) desenha o mesmo fundo que a grade de 1 mm, com uma fração
+    do tamanho da página.
+    """
+    x_grid = np.linspace(0, lim_x, lim_x // 5 + 1)
+    y_grid = np.linspace(0, LIM_Y_DIAGRAMA, 21)
+    z_grid = np.outer(y_grid, x_grid)
+    for grade in (x_grid, y_grid, z_grid):
+        grade.flags.writeable = False
+    return x_grid, y_grid, z_grid
+
+
+def _tracos_estacao(grupo, fundo):
+    """ Fundo, trajetória e pontos (um único traço, cor por ponto) de uma estação/dia. """
+    x_grid, y_grid, z_grid = fundo
+    grupo = grupo.sort_values(by='hora_ref')
+    classificacao = grupo['Classificacao_Risco'].astype(str)
+    textos = ("<b>Hora:</b> " + grupo['hora_ref'].astype(str)
+              + "<br><b>Risco:</b> " + classificacao + " (" + grupo['Nivel_Risco_Valor'].astype(str) + ")"
+              + "<br><b>VP:</b> " + grupo['VP'].astype(str)
+              + "<br><b>AM:</b> " + grupo['AM'].astype(str))
+    return [
+        go.Heatmap(x=x_grid, y=y_grid, z=z_grid, colorscale=ESCALA_CORES_FUNDO, showscale=False, zmin=0, zmax=100, zsmooth='best', hoverinfo='none'),
+        go.Scatter(x=grupo['VP'], y=grupo['AM'], mode='lines', line=dict(color='black', width=1.5, dash='dash'), hoverinfo='none', showlegend=False),
+        go.Scatter(x=grupo['VP'], y=grupo['AM'], mode='markers',
+                   marker=dict(color=classificacao.map(MAPA_DE_CORES).fillna('black').tolist(), size=12, line=dict(width=1, color='black')),
+                   hoverinfo='text', hovertext=textos.tolist(), showlegend=False),
+    ]
+
+
+def _tracos_legenda():
+    return [go.Scatter(x=[None], y=[None], mode='markers', marker=dict(color=MAPA_DE_CORES[risco], size=10, symbol='square'), name=f"<b>{risco}</b>: {definicao}")
+            for risco, definicao in DEFINICOES_RISCO.items()]
+
+
+def construir_diagrama(grupo, estacao):
+    """ Monta a figura do diagrama de risco de uma estação/dia (sem Streamlit). """
+    lim_x = _limite_x(grupo['VP'].max())
+    fig = go.Figure(data=_tracos_estacao(grupo, _fundo_risco(lim_x)) + _tracos_legenda())
+    fig.update_layout(title=f'<b>{estacao}</b>', 
+                      xaxis_title='Índice de Precipitação (mm)', 
+                      yaxis_title='Índice de Altura da Maré (m)', 
+                      xaxis_range=[0, lim_x], 
+                      yaxis_range=[0, LIM_Y_DIAGRAMA], 
+                      margin=dict(l=40, r=40, t=40, b=40), 
+                      showlegend=True, 
+                      legend_title_text='<b>Níveis de Risco</b>')
+    return fig
 
 
+def construir_diagrama_multiplo(df_dia, colunas=2):
+    """ Monta uma única figura com um diagrama por estação (small multiples) para um dia. """
+    estacoes = sorted(df_dia['nomeEstacao'].unique())
+    linhas = int(np.ceil(len(estacoes) / colunas))
+    fundo = _fundo_risco(_limite_x(df_dia['VP'].max()))
+    fig = make_subplots(rows=linhas, cols=colunas, subplot_titles=[f'<b>{e}</b>' for e in estacoes],
+                        shared_yaxes=True, horizontal_spacing=0.05, vertical_spacing=0.3 / max(linhas, 1))
+    for indice, (estacao, grupo) in enumerate(df_dia.groupby('nomeEstacao', sort=True)):
+        linha, coluna = divmod(indice, colunas)
+        for traco in _tracos_estacao(grupo, fundo):
+            fig.add_trace(traco, row=linha + 1, col=coluna + 1)
+    for traco in _tracos_legenda():
+        fig.add_trace(traco)
+    fig.update_xaxes(range=[0, fundo[0][-1]])
+    fig.update_yaxes(range=[0, LIM_Y_DIAGRAMA])
+    fig.update_xaxes(title_text='Índice de Precipitação (mm)', row=linhas)
+    fig.update_yaxes(title_text='Índice de Altura da Maré (m)', col=1)
+    fig.update_layout(height=320 * linhas, margin=dict(l=40, r=40, t=60, b=40),
+                      showlegend=True, legend_title_text='<b>Níveis de Risco</b>')
+    return fig
+
+
+def gerar_diagramas(df_analisado, todas_em_uma_figura=False):
+    """ Gera o diagrama de risco (Heatmap + Scatter) para cada estação/dia, ou um por dia com todas as estações. """
+    with etapa('gerar_diagramas', linhas=len(df_analisado), todas_em_uma_figura=todas_em_uma_figura):
+        if todas_em_uma_figura:
+            for data, df_dia in df_analisado.groupby('data'):
+                st.subheader(f"Diagramas de Risco - {pd.to_datetime(data).strftime('%d/%m/%Y')}")
+                st.plotly_chart(construir_diagrama_multiplo(df_dia), use_container_width=True, key=f"chart_{data}_todas")
+            return
+
+        for (data, estacao), grupo in df_analisado.groupby(['data', 'nomeEstacao']):
+            if grupo.empty: continue
+
+            st.subheader(f"Diagrama de Risco: {estacao} - {pd.to_datetime(data).strftime('%d/%m/%Y')}")
+            st.plotly_chart(construir_diagrama(grupo, estacao), use_container_width=True, key=f"chart_{data}_{estacao}")
+
+
+def exibir_painel_desempenho(marca, perfil=None):
+    """ Painel opcional com as etapas medidas nesta execução, o uso do cache em disco e o perfil. """
+    eventos = registros(desde=marca)
+    with st.expander("Desempenho desta execução", expanded=True):
+        etapas = [r for r in eventos if r['evento'] == 'etapa']
+        if etapas:
+            st.dataframe(pd.DataFrame(etapas).drop(columns=['ts', 'evento', 'seq']), hide_index=True)
+        downloads = pd.DataFrame([r for r in eventos if r['evento'] == 'cache'], columns=['url', 'resultado', 'bytes', 'latencia_ms'])
+        if downloads.empty:
+            st.caption("Nenhum arquivo lido nesta execução (dados vindos do cache do Streamlit).")
+        else:
+            st.dataframe(downloads.groupby('resultado').agg(arquivos=('url', 'size'), bytes=('bytes', 'sum'),
+                                                            latencia_ms=('latencia_ms', 'sum')))
+        if perfil is not None:
+            st.text(encerrar_perfil(perfil))
+
+
+
+@st.cache_resource(show_spinner=False)
+def _risco_dias_fechados():
+    """ Tabelas de risco dos dias que não mudam mais, compartilhadas entre sessões (as menos usadas saem primeiro). """
+    return ArmazemCompartilhado(max_entradas=MAX_DIAS_FECHADOS)
+
+
+def calcular_risco_periodo(datas, estacoes_desejadas, serie_mare, data_hoje_str):
+    """
+    Tabela de risco de várias datas. Dias fechados (antes de ontem, cujos arquivos não
+    recebem mais leituras) são calculados uma única vez; ontem e hoje são sempre recalculados.
+    """
+    ontem_str = str(np.datetime64(data_hoje_str) - 1)
+    cache = _risco_dias_fechados()
+    chave = lambda d: (d, tuple(estacoes_desejadas))
+    guardados = {d: cache.consultar(chave(d)) for d in datas if d < ontem_str}
+    calcular = [d for d in datas if guardados.get(d) is None]
+
+    calculados = {}
+    if calcular:
+        with etapa('carregar_chuva', dias=len(calcular)) as m:
+            df_chuva = carregar_chuva_periodo(calcular, URL_BASE_CHUVAS, ultima_data=data_hoje_str)
+            m['linhas'] = len(df_chuva)
+        if not df_chuva.empty:
+            with etapa('processar_vp') as m:
+                df_vp = processar_dados_chuva_simplificado(df_chuva, calcular, estacoes_desejadas, incluir_horas_anteriores=True)
+                m['linhas'] = len(df_vp)
+            with etapa('analise_risco') as m:
+                df_risco = executar_analise_risco_completa(df_vp, serie_mare)
+                m['linhas'] = len(df_risco)
+            if not df_risco.empty:
+                calculados = {d: grupo for d, grupo in df_risco.groupby('data')}
+        for d in calcular:
+            if d < ontem_str:
+                guardados[d] = calculados.get(d, pd.DataFrame())
+                cache.guardar(chave(d), guardados[d])
+
+    tabelas = [calculados.get(d) if d >= ontem_str else guardados[d] for d in datas]
+    tabelas = [t for t in tabelas if t is not None and not t.empty]
+    return pd.concat(tabelas, ignore_index=True) if tabelas else pd.DataFrame()
+
+
+@st.fragment(run_every=INTERVALO_CONSULTA_SEGUNDOS)
+def exibir_risco_ao_vivo(data_str, estacoes_desejadas, serie_mare, todas_em_uma_figura):
+    """
+    Modo Hoje com a ingestão contínua na mesma máquina: a cada poucos segundos consulta
+    só as leituras novas do banco local (acima da marca d'água) e redesenha os diagramas.
+    """
+    acompanhamento = armazem_compartilhado().obter(
+        ('ao_vivo', ARQUIVO_BANCO_LEITURAS, data_str, tuple(estacoes_desejadas)),
+        lambda: AcompanhamentoAoVivo(data_str, estacoes_desejadas, serie_mare, ARQUIVO_BANCO_LEITURAS))
+    with etapa('consultar_ao_vivo') as m:
+        df_risco = acompanhamento.atualizar()
+        m.update(linhas=len(df_risco), versao=acompanhamento.marca)
+    if df_risco.empty:
+        st.warning(f"Ainda não há leituras de {data_str} no banco local '{ARQUIVO_BANCO_LEITURAS}'.")
+        return
+    st.success(f"Análise de Risco Concluída! Última leitura: {acompanhamento.ultima_leitura}")
+    gerar_diagramas(df_risco, todas_em_uma_figura)
+    with st.expander("Ver Tabela de Risco Detalhada"):
+         st.dataframe(df_risco[COLUNAS_TABELA_RISCO])
+
+
+def exibir_analise_periodo(estacoes_desejadas, serie_mare, data_hoje, todas_em_uma_figura):
+    """ Modo de análise histórica: resumo do período e diagramas de um dia escolhido. """
+    periodo = st.sidebar.date_input("Período", value=(data_hoje - timedelta(days=6), data_hoje), max_value=data_hoje)
+    if len(periodo) != 2:
+        st.info("Escolha a data final do período.")
+        return
+    datas = [str(d) for d in np.arange(np.datetime64(periodo[0]), np.datetime64(periodo[1]) + 1)]
+    with st.spinner(f"Calculando o risco de {len(datas)} dia(s)..."):
+        df_risco_periodo = calcular_risco_periodo(datas, estacoes_desejadas, serie_mare, data_hoje.strftime('%Y-%m-%d'))
+    if df_risco_periodo.empty:
+        st.warning("Não há dados de chuva para o período escolhido.")
+        return
+
+    st.subheader("Horas por classificação de risco")
+    st.dataframe(pd.crosstab([df_risco_periodo['data'], df_risco_periodo['nomeEstacao']],
+                             df_risco_periodo['Classificacao_Risco']))
+    dias_com_dados = sorted(df_risco_periodo['data'].unique())
+    dia = st.selectbox("Dia para os diagramas", dias_com_dados, index=len(dias_com_dados) - 1)
+    gerar_diagramas(df_risco_periodo[df_risco_periodo['data'] == dia], todas_em_uma_figura)
+    with st.expander("Ver Tabela de Risco Detalhada"):
+         st.dataframe(df_risco_periodo[COLUNAS_TABELA_RISCO])
+
 
 #bloco de execução principal
 
@@ -150,89 +348,131 @@ if __name__ == "__main__":
     data_hoje = datetime.now(fuso_horario_referencia).date()
     data_hoje_str = data_hoje.strftime('%Y-%m-%d')
     
-    datas_para_analise = [data_hoje_str]
-    estacoes_desejadas = ["Campina do Barreto", "Torreão", "RECIFE - APAC", "Imbiribeira", "Dois Irmãos"]
-    
-    st.title("Diagramas de Risco para Alagamentos - Hoje")
+    marca_metricas = posicao()
+    modo_analise = st.sidebar.radio("Modo de análise", ["Hoje", "Período histórico"])
+    try:
+        registro_estacoes = carregar_registro_estacoes_cache(URL_ARQUIVO_ESTACOES)
+    except Exception as e:
+        st.error(f"ERRO ao carregar o cadastro de estações. Detalhe: {e}")
+        st.stop()
+    estacoes_padrao = list(dict.fromkeys(ESTACOES_PADRAO + registro_estacoes.nomes(monitoradas=True)))
+    estacoes_desejadas = st.sidebar.multiselect("Estações", list(dict.fromkeys(registro_estacoes.nomes() + estacoes_padrao)),
+                                                default=estacoes_padrao)
+    mostrar_desempenho = st.sidebar.checkbox("Painel de desempenho")
+    perfil = iniciar_perfil(mostrar_desempenho and st.sidebar.checkbox("Perfilar esta execução (cProfile)"))
+    # O perfil é desligado em qualquer saída (st.stop, st.rerun, erros), não só no painel de desempenho.
+    try:
+        st.title("Diagramas de Risco para Alagamentos - " + ("Hoje" if modo_analise == "Hoje" else "Período"))
 
     
-    st.markdown(
-      """
-    <style>
-    div.stButton > button:first-child {
-        background-color: #4F8BF9;
-        color: white;
-        border-radius: 5px;
-        outline: none;
-        box-shadow: none;
-        border: none;
-    }
-    div.stButton > button:first-child:hover {
-        background-color: #3A6FCC;
-        color: white;
-        outline: none;
-        box-shadow: none;
-        border: none;
-    }
-    div.stButton > button:first-child:focus, 
-    div.stButton > button:first-child:active {
-        color: white !important;  /* força o texto permanecer branco */
-        outline: none;
-        box-shadow: none;
-        border: none;
-    }
-    </style>
-    """, unsafe_allow_html=True)
-
-
-    #botão de refresh e status
-    col1, col2 = st.columns([1, 4])
+        st.markdown(
+          """
+        <style>
+        div.stButton > button:first-child {
+            background-color: #4F8BF9;
+            color: white;
+            border-radius: 5px;
+            outline: none;
+            box-shadow: none;
+            border: none;
+        }
+        div.stButton > button:first-child:hover {
+            background-color: #3A6FCC;
+            color: white;
+            outline: none;
+            box-shadow: none;
+            border: none;
+        }
+        div.stButton > button:first-child:focus, 
+        div.stButton > button:first-child:active {
+            color: white !important;  /* força o texto permanecer branco */
+            outline: none;
+            box-shadow: none;
+            border: none;
+        }
+        </style>
+        """, unsafe_allow_html=True)
+
+
+        #botão de refresh e status
+        col1, col2 = st.columns([1, 4])
+        todas_em_uma_figura = col2.checkbox("Todas as estações em uma figura")
     
-    # O botão de atualização, agora garantindo a limpeza
-    if col1.button("Atualizar Dados"):
-        # Limpa o cache da função de chuva
-        carregar_dados_chuva_cache.clear()
-        # Força o Streamlit a reexecutar o script a partir do topo
-        st.rerun() 
+        # O botão de atualização, agora garantindo a limpeza
+        if col1.button("Atualizar Dados"):
+            # Vence a chuva e a tabela de risco pronta no armazém (para todas as sessões)
+            armazem_compartilhado().invalidar(lambda chave: chave[0] in ('chuva', 'tabela_risco'))
+            # Força o Streamlit a reexecutar o script a partir do topo
+            st.rerun() 
         
 
-   
-    try:
-        # Carrega a Maré (AM) - Estático
-        with st.spinner("Carregando Maré..."):
-             df_am = carregar_dados_mare_cache(URL_ARQUIVO_MARE_AM)
-        
-        # Carrega a Chuva (VP) - Dinâmico (cache de 5 min ou botão)
-       
-        df_chuva_raw = carregar_dados_chuva_cache(
-            URL_BASE_CHUVAS, 
-            data_hoje_str, 
-            CSV_DELIMITADOR, 
-            COLUNAS_NO_CSV_CHUVAS
-        )
-        
-    except Exception as e:
-        st.error(f"Ocorreu um erro no carregamento inicial dos dados. Detalhe: {e}")
-        st.stop() 
+        if modo_analise == "Período histórico":
+            try:
+                serie_mare = carregar_dados_mare_cache(URL_ARQUIVO_MARE_AM)
+                exibir_analise_periodo(estacoes_desejadas, serie_mare, data_hoje, todas_em_uma_figura)
+            except Exception as e:
+                st.error(f"Ocorreu um erro na análise do período. Detalhe: {e}")
+            if mostrar_desempenho:
+                exibir_painel_desempenho(marca_metricas, perfil)
+            st.stop()
 
-    # Condicional de exibição e cálculo
-    if df_chuva_raw.empty or df_am.empty:
-        st.warning(f"Não foi possível iniciar a análise. Verifique o log de erros ou se os arquivos existem para {data_hoje_str}.")
-        
-    else:
-        # 3. Processa VP e Calcula Risco (Silencioso)
-        df_vp_calculado = processar_dados_chuva_simplificado(df_chuva_raw, datas_para_analise, estacoes_desejadas)
-        df_risco_final = executar_analise_risco_completa(df_vp_calculado, df_am)
+        # Ingestão contínua na mesma máquina: leituras direto do banco local, sem esperar o GitHub.
+        if os.path.exists(ARQUIVO_BANCO_LEITURAS):
+            try:
+                serie_mare = carregar_dados_mare_cache(URL_ARQUIVO_MARE_AM)
+                exibir_risco_ao_vivo(data_hoje_str, estacoes_desejadas, serie_mare, todas_em_uma_figura)
+            except Exception as e:
+                st.error(f"Ocorreu um erro na leitura do banco local. Detalhe: {e}")
+            if mostrar_desempenho:
+                exibir_painel_desempenho(marca_metricas, perfil)
+            st.stop()
+
+        # Tabela de risco pré-calculada na ingestão: uma leitura, sem recalcular nada.
+        with etapa('carregar_tabela_risco') as m:
+            df_risco_final = carregar_tabela_risco_cache(data_hoje_str, estacoes_desejadas)
+            m['linhas'] = len(df_risco_final)
+
+        # Sem a tabela pronta, calcula a partir das leituras brutas.
+        if df_risco_final.empty:
+            try:
+                # Carrega a Maré (AM) - Estático
+                with st.spinner("Carregando Maré..."), etapa('carregar_mare'):
+                     serie_mare = carregar_dados_mare_cache(URL_ARQUIVO_MARE_AM)
+            
+                # Carrega a Chuva (VP) - Dinâmico (cache de 5 min ou botão)
+           
+                with etapa('carregar_chuva') as m:
+                    df_chuva_raw, versao_chuva = carregar_dados_chuva_cache(URL_BASE_CHUVAS, data_hoje_str)
+                    m['linhas'] = len(df_chuva_raw)
+            
+            except Exception as e:
+                st.error(f"Ocorreu um erro no carregamento inicial dos dados. Detalhe: {e}")
+                st.stop() 
+
+            # Condicional de exibição e cálculo
+            if df_chuva_raw.empty or serie_mare.vazia:
+                st.warning(f"Não foi possível iniciar a análise. Verifique o log de erros ou se os arquivos existem para {data_hoje_str}.")
+                st.stop()
+
+            # 3. Processa VP e Calcula Risco (Silencioso)
+            # O motor fica no armazém: a cada nova carga da chuva só as leituras novas são processadas.
+            df_risco_final = calcular_risco_hoje(df_chuva_raw, versao_chuva, data_hoje_str, estacoes_desejadas, serie_mare)
         
         if not df_risco_final.empty:
             st.success("Análise de Risco Concluída!")
-            
+        
             # 4. geração e exibição dos diagramas
-            gerar_diagramas(df_risco_final)
+            gerar_diagramas(df_risco_final, todas_em_uma_figura)
 
             # Opção para ver a tabela detalhada (Streamlit)
             with st.expander("Ver Tabela de Risco Detalhada"):
-                 st.dataframe(df_risco_final[['data', 'hora_ref', 'nomeEstacao', 'VP', 'AM', 'Nivel_Risco_Valor', 'Classificacao_Risco']])
+                 st.dataframe(df_risco_final[COLUNAS_TABELA_RISCO])
 
         else:
-            st.error("O cálculo de risco final falhou. Verifique as colunas de merge.")
\ No newline at end of file
+            st.error("O cálculo de risco final falhou. Verifique as colunas de merge.")
+
+        if mostrar_desempenho:
+            exibir_painel_desempenho(marca_metricas, perfil)
+    finally:
+        if perfil is not None:
+            perfil.disable()
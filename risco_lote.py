@@ -0,0 +1,229 @@
+# Arquivo: risco_lote.py
+"""
+Cálculo do risco em lote, sem Streamlit nem Plotly.
+
+Calcula a tabela de risco (VP, AM, nível e classificação por estação e hora) de um
+intervalo de datas, distribuindo os dias entre processos, e grava um arquivo por dia
+em `<saida>/risco_recife_<data>.parquet` (ou `.json`, um registro por linha). As
+leituras vêm dos CSVs diários (`--fonte csv`) ou do histórico colunar
+(`--fonte historico`). Um dia só é recalculado se algum arquivo de origem for mais
+novo que o resultado já gravado ou se ele tiver sido calculado para outro conjunto
+de estações, então reprocessar o histórico inteiro é barato.
+
+    python risco_lote.py --inicio 2025-10-01 --fim 2025-10-31
+    python risco_lote.py --inicio 2025-10-20 --fim 2025-10-22 --estacoes "Torreão" "Imbiribeira" --formato json
+"""
+import os
+import sys
+import json
+import argparse
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from dados_chuva import carregar_chuva_periodo, arquivos_do_periodo
+from mare import SerieMare
+from processamento import processar_dados_chuva_simplificado, executar_analise_risco_completa, COLUNAS_TABELA_RISCO
+import historico
+
+DIRETORIO_SAIDA = 'risco_lote'
+PREFIXO_ARQUIVO_CHUVA = 'chuva_recife_'
+ARQUIVO_MARE = os.path.join('tide', 'mare_calculada_hora_em_hora_ano-completo.csv')
+ARQUIVO_CONSTITUINTES = os.path.join('tide', 'constituintes_harmonicos.csv')
+FORMATOS = ('parquet', 'json')
+FONTES = ('csv', 'historico')
+
+_SEM_REGISTRO = object()
+
+# Série de maré de cada processo do pool, carregada uma única vez no inicializador.
+_serie_mare = None
+
+
+def _iniciar_processo(arquivo_mare, arquivo_constituintes=ARQUIVO_CONSTITUINTES):
+    global _serie_mare
+    _serie_mare = SerieMare.de_csv(arquivo_mare).com_harmonica(arquivo_constituintes=arquivo_constituintes)
+
+
+def arquivo_resultado(data, saida=DIRETORIO_SAIDA, formato='parquet'):
+    return os.path.join(saida, f"risco_recife_{data}.{formato}")
+
+
+def arquivos_de_origem(data, fonte='csv', diretorio_chuva='.', diretorio_historico=historico.DIRETORIO_HISTORICO):
+    """Arquivos de leituras que influenciam o risco de `data` (para saber se está desatualizado)."""
+    if fonte == 'historico':
+        anterior = str(np.datetime64(data) - 1)
+        caminhos = [historico.caminho_particao(diretorio_historico, dia) for dia in (anterior, data)]
+    else:
+        caminhos = [os.path.join(diretorio_chuva, f"{PREFIXO_ARQUIVO_CHUVA}{d}.csv") for d in arquivos_do_periodo([data])]
+    return [c for c in caminhos if os.path.exists(c)]
+
+
+def _arquivo_estacoes(destino):
+    return f"{destino}.estacoes.json"
+
+
+def _estacoes_gravadas(destino):
+    """Estações com que o resultado foi calculado (None = todas); ausente se não houver registro."""
+    try:
+        with open(_arquivo_estacoes(destino), encoding='utf-8') as f:
+            return json.load(f)['estacoes']
+    except (OSError, ValueError, KeyError):
+        return _SEM_REGISTRO
+
+
+def _desatualizado(destino, origens, estacoes=None):
+    if not os.path.exists(destino):
+        return True
+    # Um resultado calculado para outro conjunto de estações não serve para este.
+    if _estacoes_gravadas(destino) != (sorted(estacoes) if estacoes else None):
+        return True
+    gravado_em = os.path.getmtime(destino)
+    return any(os.path.getmtime(origem) > gravado_em for origem in origens)
+
+
+def ler_leituras_do_dia(data, fonte='csv', diretorio_chuva='.', diretorio_historico=historico.DIRETORIO_HISTORICO):
+    """Leituras necessárias para o VP de `data` (o dia e as 2h anteriores), no formato do cálculo."""
+    if fonte == 'historico':
+        inicio = np.datetime64(data, 's') - np.timedelta64(2, 'h')
+        fim = np.datetime64(data, 's') + np.timedelta64(1, 'D')
+        df = historico.ler_historico(str(inicio), str(fim), colunas=['valor', 'nome'], diretorio=diretorio_historico)
+        return df.rename(columns={'nome': 'nomeEstacao', 'valor': 'valorMedida'})
+    prefixo = os.path.join(diretorio_chuva, PREFIXO_ARQUIVO_CHUVA)
+    return carregar_chuva_periodo([data], url_base=prefixo, max_simultaneos=1)
+
+
+def calcular_risco_dia(data, estacoes=None, fonte='csv', diretorio_chuva='.',
+                       diretorio_historico=historico.DIRETORIO_HISTORICO, serie_mare=None, arquivo_mare=ARQUIVO_MARE,
+                       arquivo_constituintes=ARQUIVO_CONSTITUINTES):
+    """
+    Tabela de risco de um dia (DataFrame vazio se não houver leituras).
+
+    Sem `serie_mare`, usa a do processo, carregada de `arquivo_mare` e
+    `arquivo_constituintes` na primeira chamada quando o inicializador do pool não
+    rodou (chamada direta).
+    """
+    if serie_mare is None:
+        if _serie_mare is None:
+            _iniciar_processo(arquivo_mare, arquivo_constituintes)
+        serie_mare = _serie_mare
+    df_chuva = ler_leituras_do_dia(data, fonte, diretorio_chuva, diretorio_historico)
+    if df_chuva.empty:
+        return pd.DataFrame(columns=COLUNAS_TABELA_RISCO)
+    if estacoes is None:
+        estacoes = df_chuva['nomeEstacao'].dropna().unique()
+    df_vp = processar_dados_chuva_simplificado(df_chuva, [data], estacoes, incluir_horas_anteriores=True)
+    df_risco = executar_analise_risco_completa(df_vp, serie_mare)
+    if df_risco.empty:
+        return pd.DataFrame(columns=COLUNAS_TABELA_RISCO)
+    return df_risco[COLUNAS_TABELA_RISCO].reset_index(drop=True)
+
+
+def gravar_resultado(df_risco, destino, formato='parquet', estacoes=None):
+    """
+    Grava a tabela de um dia de forma atômica (Parquet ou JSON em linhas), com as
+    estações pedidas ao lado, em `<destino>.estacoes.json`.
+    """
+    os.makedirs(os.path.dirname(destino) or '.', exist_ok=True)
+    temporario = f"{destino}.{os.getpid()}.tmp"
+    if formato == 'parquet':
+        df_risco.to_parquet(temporario, index=False)
+    else:
+        df_risco.to_json(temporario, orient='records', lines=True, force_ascii=False)
+    with open(f"{temporario}.estacoes", 'w', encoding='utf-8') as f:
+        json.dump({'estacoes': sorted(estacoes) if estacoes else None}, f, ensure_ascii=False)
+    # Registro removido antes e regravado depois: uma falha no meio deixa o dia desatualizado.
+    if os.path.exists(_arquivo_estacoes(destino)):
+        os.remove(_arquivo_estacoes(destino))
+    os.replace(temporario, destino)
+    os.replace(f"{temporario}.estacoes", _arquivo_estacoes(destino))
+
+
+def _processar_dia(tarefa):
+    data, estacoes, fonte, diretorio_chuva, diretorio_historico, destino, formato = tarefa
+    df_risco = calcular_risco_dia(data, estacoes, fonte, diretorio_chuva, diretorio_historico)
+    if df_risco.empty:
+        return data, 0
+    gravar_resultado(df_risco, destino, formato, estacoes)
+    return data, len(df_risco)
+
+
+def calcular_risco_lote(datas, estacoes=None, fonte='csv', formato='parquet', saida=DIRETORIO_SAIDA,
+                        diretorio_chuva='.', diretorio_historico=historico.DIRETORIO_HISTORICO,
+                        arquivo_mare=ARQUIVO_MARE, processos=None, refazer=False,
+                        arquivo_constituintes=ARQUIVO_CONSTITUINTES):
+    """
+    Calcula e grava o risco de cada data em paralelo (um dia por tarefa).
+
+    Dias cujo resultado é mais novo que todas as origens (leituras, maré e constantes
+    harmônicas) e foi calculado com as mesmas `estacoes` são pulados, a menos que
+    `refazer` seja verdadeiro. Devolve {data: linhas gravadas}, com None para os dias
+    pulados.
+    """
+    if fonte not in FONTES:
+        raise ValueError(f"Fonte '{fonte}' inválida. Use uma de {FONTES}.")
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato '{formato}' inválido. Use um de {FORMATOS}.")
+    estacoes = list(estacoes) if estacoes else None
+    tarefas, resultado = [], {}
+    for data in datas:
+        destino = arquivo_resultado(data, saida, formato)
+        origens = arquivos_de_origem(data, fonte, diretorio_chuva, diretorio_historico) + \
+            [c for c in (arquivo_mare, arquivo_constituintes) if os.path.exists(c)]
+        if not refazer and not _desatualizado(destino, origens, estacoes):
+            resultado[data] = None
+            continue
+        tarefas.append((data, estacoes, fonte, diretorio_chuva, diretorio_historico, destino, formato))
+
+    if tarefas:
+        processos = max(1, min(processos or os.cpu_count() or 1, len(tarefas)))
+        with ProcessPoolExecutor(max_workers=processos, initializer=_iniciar_processo,
+                                 initargs=(arquivo_mare, arquivo_constituintes)) as executor:
+            for data, linhas in executor.map(_processar_dia, tarefas):
+                resultado[data] = linhas
+    return dict(sorted(resultado.items()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calcula a tabela de risco de um intervalo de datas, sem o painel.")
+    parser.add_argument('--inicio', required=True, help="Primeira data (AAAA-MM-DD).")
+    parser.add_argument('--fim', help="Última data (AAAA-MM-DD); padrão: a mesma do início.")
+    parser.add_argument('--estacoes', nargs='+', help="Nomes das estações (padrão: todas as que tiverem leituras).")
+    parser.add_argument('--fonte', choices=FONTES, default='csv', help="De onde ler as leituras de chuva.")
+    parser.add_argument('--formato', choices=FORMATOS, default='parquet', help="Formato dos arquivos de saída.")
+    parser.add_argument('--saida', default=DIRETORIO_SAIDA, help="Diretório dos arquivos de saída.")
+    parser.add_argument('--diretorio-chuva', default='.', help="Diretório dos arquivos chuva_recife_<data>.csv.")
+    parser.add_argument('--historico', default=historico.DIRETORIO_HISTORICO, help="Diretório do histórico colunar.")
+    parser.add_argument('--mare', default=ARQUIVO_MARE, help="Arquivo de maré horária.")
+    parser.add_argument('--constituintes', default=ARQUIVO_CONSTITUINTES,
+                        help="Constantes harmônicas da maré (sem o arquivo, são ajustadas à tabela horária).")
+    parser.add_argument('--processos', type=int, help="Número de processos (padrão: um por núcleo).")
+    parser.add_argument('--refazer', action='store_true', help="Recalcula mesmo os dias já atualizados.")
+    args = parser.parse_args()
+
+    try:
+        datas = [str(d) for d in np.arange(np.datetime64(args.inicio), np.datetime64(args.fim or args.inicio) + 1)]
+    except ValueError as e:
+        print(f"❌ Data inválida: {e}", file=sys.stderr)
+        sys.exit(1)
+    if not datas:
+        print("❌ A data final é anterior à inicial.", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        resultado = calcular_risco_lote(datas, args.estacoes, args.fonte, args.formato, args.saida,
+                                        args.diretorio_chuva, args.historico, args.mare, args.processos, args.refazer,
+                                        args.constituintes)
+    except (OSError, ValueError) as e:
+        print(f"❌ Erro no cálculo em lote: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    calculados = {d: n for d, n in resultado.items() if n is not None}
+    for data, linhas in calculados.items():
+        if linhas:
+            print(f"✅ {arquivo_resultado(data, args.saida, args.formato)}: {linhas} linhas.")
+        else:
+            print(f"⚠️ {data}: nenhuma leitura de chuva.")
+    print(f"{len(calculados)} dia(s) calculado(s), {len(resultado) - len(calculados)} já atualizado(s).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+# Arquivo: tests/conftest.py
+import os
+import sys
+import http.server
+import threading
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class _Tratador(http.server.BaseHTTPRequestHandler):
+    """Responde com a função da rota (status, cabeçalhos, corpo) e anota cada requisição."""
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def _responder(self):
+        caminho = self.path.split('?', 1)[0]
+        tamanho = int(self.headers.get('Content-Length') or 0)
+        corpo_pedido = self.rfile.read(tamanho) if tamanho else b''
+        self.server.requisicoes.append((self.command, self.path, dict(self.headers), corpo_pedido))
+        rota = self.server.rotas.get(caminho)
+        status, cabecalhos, corpo = rota(self) if rota else (404, {}, b'')
+        self.send_response(status)
+        for nome, valor in cabecalhos.items():
+            self.send_header(nome, valor)
+        self.send_header('Content-Length', str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    do_GET = do_POST = _responder
+
+
+class ServidorStub:
+    """Servidor HTTP local: `rotas[caminho] = funcao(requisicao) -> (status, cabecalhos, corpo)`."""
+
+    def __init__(self):
+        self._servidor = http.server.ThreadingHTTPServer(('127.0.0.1', 0), _Tratador)
+        self._servidor.rotas, self._servidor.requisicoes = {}, []
+        self.rotas, self.requisicoes = self._servidor.rotas, self._servidor.requisicoes
+        threading.Thread(target=self._servidor.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True).start()
+
+    def url(self, caminho):
+        return f'http://127.0.0.1:{self._servidor.server_port}{caminho}'
+
+    def encerrar(self):
+        self._servidor.shutdown()
+        self._servidor.server_close()
+
+
+@pytest.fixture
+def servidor():
+    servidor = ServidorStub()
+    yield servidor
+    servidor.encerrar()
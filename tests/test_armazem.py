@@ -0,0 +1,89 @@
+# Arquivo: tests/test_armazem.py
+import numpy as np
+import pandas as pd
+import pytest
+import armazem
+from armazem import ArmazemCompartilhado
+
+
+class _Contador:
+    def __init__(self, valor=None):
+        self.chamadas, self.valor = 0, valor
+
+    def __call__(self):
+        self.chamadas += 1
+        return self.valor if self.valor is not None else self.chamadas
+
+
+def test_carrega_uma_vez_e_recarrega_quando_a_origem_muda():
+    loja, carregar = ArmazemCompartilhado(), _Contador()
+    assert [loja.obter('a', carregar, origem=1) for _ in range(3)] == [1, 1, 1]
+    assert loja.versao('a') == 1
+    assert loja.obter('a', carregar, origem=2) == 2 and loja.versao('a') == 2
+    loja.invalidar(lambda chave: chave == 'a')
+    assert loja.obter('a', carregar, origem=2) == 3
+
+
+def test_falha_na_recarga_mantem_o_valor_anterior():
+    loja = ArmazemCompartilhado()
+    loja.obter('a', lambda: 'antigo')
+    loja.invalidar()
+
+    def falhar():
+        raise OSError('rede')
+
+    assert loja.obter('a', falhar) == 'antigo'
+    with pytest.raises(OSError):
+        loja.obter('b', falhar)
+
+
+def test_descarta_as_chaves_usadas_ha_mais_tempo():
+    loja = ArmazemCompartilhado(max_entradas=2)
+    loja.guardar('a', 1)
+    loja.guardar('b', 2)
+    assert loja.consultar('a') == 1  # 'a' passa a ser a mais recente
+    loja.obter('c', lambda: 3)
+    assert len(loja) == 2
+    assert loja.consultar('b') is None and loja.consultar('a') == 1 and loja.consultar('c') == 3
+
+
+def test_guardar_troca_o_valor_e_a_versao():
+    loja = ArmazemCompartilhado()
+    assert loja.consultar('a') is None and loja.versao('a') == 0
+    loja.guardar('a', 'x', origem=1)
+    loja.guardar('a', 'y', origem=1)
+    assert loja.consultar('a') == 'y' and loja.versao('a') == 2
+    assert loja.obter('a', lambda: pytest.fail("recarregou"), origem=1) == 'y'
+
+
+def test_arrays_ficam_somente_leitura():
+    loja = ArmazemCompartilhado()
+    alturas = loja.obter('mare', lambda: np.arange(3.0))
+    with pytest.raises(ValueError):
+        alturas[0] = 9.0
+
+
+def test_dataframe_compartilhado_sem_copia_e_protegido(monkeypatch):
+    loja = ArmazemCompartilhado()
+    loja.guardar('df', pd.DataFrame({'VP': [1.0, 2.0]}))
+    primeira, segunda = loja.consultar('df'), loja.consultar('df')
+    if armazem.copy_on_write_ativo():
+        assert np.shares_memory(primeira['VP'].to_numpy(), segunda['VP'].to_numpy())
+    primeira.loc[0, 'VP'] = 99.0
+    assert loja.consultar('df')['VP'].tolist() == [1.0, 2.0]
+
+    # Sem copy-on-write (pandas 2 fora do painel), a sessão recebe uma cópia completa.
+    monkeypatch.setattr(armazem, 'copy_on_write_ativo', lambda: False)
+    terceira = loja.consultar('df')
+    assert not np.shares_memory(terceira['VP'].to_numpy(), segunda['VP'].to_numpy())
+    terceira.loc[0, 'VP'] = 99.0
+    assert loja.consultar('df')['VP'].tolist() == [1.0, 2.0]
+
+
+def test_importar_o_armazem_nao_muda_opcoes_do_pandas():
+    if armazem.PANDAS_3:
+        pytest.skip("copy-on-write é sempre ativo no pandas 3")
+    import importlib
+    with pd.option_context('mode.copy_on_write', False):
+        importlib.reload(armazem)
+        assert pd.get_option('mode.copy_on_write') is False
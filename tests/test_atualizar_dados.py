@@ -0,0 +1,222 @@
+# Arquivo: tests/test_atualizar_dados.py
+import os
+import json
+import time
+import threading
+import pandas as pd
+import pandas.testing as pdt
+import pytest
+import atualizar_dados
+
+DIRETORIO_REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ARQUIVO_MARE = os.path.join(DIRETORIO_REPO, atualizar_dados.ARQUIVO_MARE)
+ARQUIVO_CONSTITUINTES = os.path.join(DIRETORIO_REPO, atualizar_dados.ARQUIVO_CONSTITUINTES)
+
+
+def _resposta_api(fim, horas=24, estacoes=('261160618A', '261160614A')):
+    """Leituras de 10 em 10 minutos das últimas `horas` até `fim`, como a API devolve."""
+    horarios = pd.date_range(end=fim, periods=horas * 6, freq='10min').strftime('%Y-%m-%d %H:%M:%S')
+    return pd.concat([pd.DataFrame({'codestacao': e, 'datahora': horarios, 'valor': 0.0, 'nome': e})
+                      for e in estacoes], ignore_index=True)
+
+
+@pytest.fixture
+def compactacoes(monkeypatch):
+    chamadas = []
+    original = atualizar_dados.compactar_csv_diario
+
+    def contar(df, nome_arquivo):
+        chamadas.append(nome_arquivo)
+        return original(df, nome_arquivo)
+
+    monkeypatch.setattr(atualizar_dados, 'compactar_csv_diario', contar)
+    return chamadas
+
+
+def test_repeticoes_da_janela_da_api_nao_reescrevem_o_arquivo(tmp_path, compactacoes):
+    arquivo, estado = str(tmp_path / 'chuva.csv'), str(tmp_path / 'estado.json')
+    fins = pd.date_range('2025-10-20 12:00', periods=12, freq='10min')
+    novas = [atualizar_dados.atualizar_csv_diario(_resposta_api(fim), arquivo, estado) for fim in fins]
+    repetida = atualizar_dados.atualizar_csv_diario(_resposta_api(fins[-1]), arquivo, estado)
+
+    assert novas == [2 * 24 * 6] + [2] * (len(fins) - 1) and repetida == 0
+    assert len(compactacoes) == 1  # só a criação do arquivo
+    assert len(pd.read_csv(arquivo)) == 2 * (24 * 6 + len(fins) - 1)
+    estado_arquivo = json.load(open(estado))[arquivo]
+    assert estado_arquivo['janela_api'] == (24 * 6 - 1) * 600
+    assert all(len(leituras) == 24 * 6 for leituras in estado_arquivo['recentes'].values())
+
+
+def test_leitura_corrigida_reescreve_o_arquivo(tmp_path, compactacoes):
+    arquivo, estado = str(tmp_path / 'chuva.csv'), str(tmp_path / 'estado.json')
+    atualizar_dados.atualizar_csv_diario(_resposta_api('2025-10-20 12:00'), arquivo, estado)
+    corrigida = _resposta_api('2025-10-20 12:10')
+    corrigida.loc[0, 'valor'] = 3.2
+    atualizar_dados.atualizar_csv_diario(corrigida, arquivo, estado)
+
+    assert len(compactacoes) == 2
+    df = pd.read_csv(arquivo, dtype={'codestacao': str})
+    linha = df[(df['codestacao'] == corrigida.loc[0, 'codestacao']) & (df['datahora'] == corrigida.loc[0, 'datahora'])]
+    assert linha['valor'].tolist() == [3.2]
+
+
+def _json(dados, status=200):
+    return status, {'Content-Type': 'application/json'}, json.dumps(dados).encode('utf-8')
+
+
+@pytest.fixture
+def sem_token_em_cache(monkeypatch):
+    monkeypatch.setattr(atualizar_dados, '_cache_token', {})
+
+
+def test_token_e_reaproveitado_ate_expirar(servidor, sem_token_em_cache):
+    servidor.rotas['/token'] = lambda requisicao: _json({'token': 'abc'})
+    url = servidor.url('/token')
+    with atualizar_dados.criar_sessao() as sessao:
+        tokens = [atualizar_dados.obter_token('a@b.c', 'senha', sessao=sessao, token_url=url) for _ in range(3)]
+        assert tokens == ['abc'] * 3 and len(servidor.requisicoes) == 1
+        assert json.loads(servidor.requisicoes[0][3]) == {'email': 'a@b.c', 'password': 'senha'}
+
+        atualizar_dados._cache_token[(url, 'a@b.c')] = ('abc', time.monotonic() - 1)  # venceu
+        assert atualizar_dados.obter_token('a@b.c', 'senha', sessao=sessao, token_url=url) == 'abc'
+        assert len(servidor.requisicoes) == 2
+
+
+def test_erro_5xx_e_repetido_na_mesma_sessao(servidor):
+    respostas = iter([_json({}, 503), _json({}, 502)])
+    servidor.rotas['/dados'] = lambda requisicao: next(respostas, None) or _json(
+        [{'codestacao': '261160618A', 'datahora': '2025-10-20 12:00:00', 'valor': 0.2}])
+    with atualizar_dados.criar_sessao(backoff=0) as sessao:
+        df, latencia = atualizar_dados._buscar_estacao(sessao, servidor.url('/dados'), {'token': 'abc'},
+                                                       {'codestacao': '261160618A'}, timeout=5)
+    assert df['valor'].tolist() == [0.2]
+    assert len(servidor.requisicoes) == 3
+    assert all(cabecalhos['token'] == 'abc' for _, _, cabecalhos, _ in servidor.requisicoes)
+    assert latencia > 0
+
+
+def test_erro_5xx_persistente_devolve_none(servidor):
+    servidor.rotas['/dados'] = lambda requisicao: _json({}, 500)
+    with atualizar_dados.criar_sessao(tentativas=2, backoff=0) as sessao:
+        df, _ = atualizar_dados._buscar_estacao(sessao, servidor.url('/dados'), {}, {'codestacao': 'X'}, timeout=5)
+    assert df is None
+    assert len(servidor.requisicoes) == 3
+
+
+def test_latencias_por_estacao_nos_atributos(servidor):
+    def leituras(requisicao):
+        codestacao = requisicao.path.split('codestacao=', 1)[1].split('&', 1)[0]
+        if codestacao == 'VAZIA':
+            return _json({'Info': 'Nenhum resultado foi encontrado'})
+        return _json([{'codestacao': codestacao, 'datahora': '2025-10-20 15:00:00', 'valor': 1.0}])
+
+    servidor.rotas['/dados'] = leituras
+    df = atualizar_dados.buscar_dados_cemaden('abc', ['261160618A', '261160614A', 'VAZIA'],
+                                              max_simultaneas=2, url_base=servidor.url('/dados'))
+    assert set(df.attrs['latencias']) == {'261160618A', '261160614A', 'VAZIA'}
+    assert all(latencia > 0 for latencia in df.attrs['latencias'].values())
+    assert sorted(df['codestacao']) == ['261160614A', '261160618A']
+    assert df['datahora'].tolist() == ['2025-10-20 12:00:00'] * 2  # UTC -> Recife
+
+
+def test_serie_de_mare_carregada_uma_vez_por_arquivo():
+    primeira = atualizar_dados.carregar_serie_mare(ARQUIVO_MARE, ARQUIVO_CONSTITUINTES)
+    assert atualizar_dados.carregar_serie_mare(ARQUIVO_MARE, ARQUIVO_CONSTITUINTES) is primeira
+    assert primeira.harmonica.nomes == list(pd.read_csv(ARQUIVO_CONSTITUINTES)['constituinte'][1:])
+
+
+def test_risco_publicado_inclui_a_chuva_antes_da_meia_noite(tmp_path):
+    import risco_lote
+    for dia, chuva_no_fim in (('2025-10-19', 5.0), ('2025-10-20', 0.0)):
+        horarios = pd.date_range(dia, periods=24 * 6, freq='10min')
+        valores = [chuva_no_fim if h >= pd.Timestamp(f'{dia} 23:00') else 0.0 for h in horarios]
+        pd.DataFrame({'codestacao': '261160618A', 'datahora': horarios.strftime('%Y-%m-%d %H:%M:%S'),
+                      'nome': 'Torreão', 'valor': valores}).to_csv(tmp_path / f'chuva_recife_{dia}.csv', index=False)
+
+    atualizar_dados.publicar_risco_diario(['2025-10-20'], prefixo_chuva=str(tmp_path / 'chuva_recife_'),
+                                          arquivo_mare=ARQUIVO_MARE, diretorio_risco=str(tmp_path / 'risco'),
+                                          arquivo_constituintes=ARQUIVO_CONSTITUINTES)
+    publicado = pd.read_csv(tmp_path / 'risco' / 'risco_recife_2025-10-20.csv', dtype={'hora_ref': str})
+    lote = risco_lote.calcular_risco_dia('2025-10-20', diretorio_chuva=str(tmp_path),
+                                         serie_mare=atualizar_dados.carregar_serie_mare(ARQUIVO_MARE, ARQUIVO_CONSTITUINTES))
+
+    meia_noite = publicado[publicado['hora_ref'] == '00:00:00']
+    assert meia_noite['VP'].tolist() == [30.0]  # 6 leituras de 5 mm nas 2h anteriores
+    pdt.assert_frame_equal(publicado.reset_index(drop=True), lote.astype(publicado.dtypes.to_dict()), check_exact=False)
+
+
+@pytest.fixture
+def api_periodo(servidor):
+    """`/periodo`: leituras de 10 em 10 minutos de [inicio, fim) (UTC) da estação pedida."""
+    def leituras(requisicao):
+        params = dict(p.split('=', 1) for p in requisicao.path.split('?', 1)[1].split('&'))
+        horarios = pd.date_range(pd.to_datetime(params['inicio'], format='%Y%m%d%H%M'),
+                                 pd.to_datetime(params['fim'], format='%Y%m%d%H%M'), freq='10min', inclusive='left')
+        return _json([{'codestacao': params['codestacao'], 'datahora': h.strftime('%Y-%m-%d %H:%M:%S'), 'valor': 0.2}
+                      for h in horarios])
+
+    servidor.rotas['/periodo'] = leituras
+    return servidor.url('/periodo')
+
+
+def _pedidos(servidor):
+    return [caminho for metodo, caminho, _, _ in servidor.requisicoes if caminho.startswith('/periodo')]
+
+
+def test_backfill_interrompido_recomeca_do_checkpoint(servidor, api_periodo, tmp_path):
+    checkpoint, gravados = str(tmp_path / 'checkpoint.json'), []
+
+    def gravar_e_interromper(df):
+        if gravados:
+            raise KeyboardInterrupt  # a segunda janela não chega a ser gravada
+        gravados.append(df)
+
+    argumentos = dict(horas=12, max_simultaneas=2, por_segundo=0, arquivo_checkpoint=checkpoint, url_base=api_periodo)
+    with pytest.raises(KeyboardInterrupt):
+        atualizar_dados.executar_backfill('abc', ['A1', 'A2'], '2025-10-20', '2025-10-20',
+                                          gravar=gravar_e_interromper, **argumentos)
+    concluidas = json.load(open(checkpoint))['concluidas']
+    assert concluidas == ['A1|2025-10-20T00:00|2025-10-20T12:00', 'A2|2025-10-20T00:00|2025-10-20T12:00']
+    assert gravados[0]['datahora'].min() == '2025-10-20 00:00:00' and len(gravados[0]) == 2 * 12 * 6
+
+    pedidos_antes = len(_pedidos(servidor))
+    feitas, falhas, leituras = atualizar_dados.executar_backfill('abc', ['A1', 'A2'], '2025-10-20', '2025-10-20',
+                                                                 gravar=gravados.append, **argumentos)
+    assert (feitas, falhas, leituras) == (2, 0, 2 * 12 * 6)
+    assert all('inicio=202510201500' in p for p in _pedidos(servidor)[pedidos_antes:])  # 12:00 em Recife
+    assert gravados[1]['datahora'].max() == '2025-10-20 23:50:00'
+
+    assert atualizar_dados.executar_backfill('abc', ['A1', 'A2'], '2025-10-20', '2025-10-20',
+                                             gravar=gravados.append, **argumentos) == (0, 0, 0)
+    assert len(gravados) == 2
+
+
+def test_tarefa_com_falha_fica_fora_do_checkpoint(servidor, api_periodo, tmp_path):
+    leituras = servidor.rotas['/periodo']
+    servidor.rotas['/periodo'] = lambda requisicao: _json({}, 404) if 'codestacao=A2' in requisicao.path else leituras(requisicao)
+    argumentos = dict(horas=24, por_segundo=0, arquivo_checkpoint=str(tmp_path / 'checkpoint.json'), url_base=api_periodo)
+    assert atualizar_dados.executar_backfill('abc', ['A1', 'A2'], '2025-10-20', '2025-10-20',
+                                             gravar=lambda df: None, **argumentos)[:2] == (1, 1)
+
+    servidor.rotas['/periodo'] = leituras
+    pedidos_antes = len(_pedidos(servidor))
+    assert atualizar_dados.executar_backfill('abc', ['A1', 'A2'], '2025-10-20', '2025-10-20',
+                                             gravar=lambda df: None, **argumentos)[:2] == (1, 0)
+    assert ['codestacao=A2' in p for p in _pedidos(servidor)[pedidos_antes:]] == [True]
+
+
+def test_limitador_espaca_as_requisicoes_de_todas_as_threads():
+    limitador, inicios = atualizar_dados.LimitadorTaxa(por_segundo=50), []
+
+    def pedir():
+        for _ in range(5):
+            limitador.aguardar()
+            inicios.append(time.monotonic())
+
+    threads = [threading.Thread(target=pedir) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # 20 inícios a no máximo 50 por segundo: do primeiro ao último passam ao menos 19/50 s.
+    assert len(inicios) == 20 and max(inicios) - min(inicios) >= 19 / 50 - 0.005
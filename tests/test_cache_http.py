@@ -0,0 +1,96 @@
+# Arquivo: tests/test_cache_http.py
+import os
+import re
+import time
+import hashlib
+import pytest
+import cache_http
+
+
+@pytest.fixture
+def arquivos(servidor):
+    """Arquivos servidos em /arquivos/<nome>, com ETag, 304 e HTTP Range (ou sem Range, se pedido)."""
+    conteudos = {}
+    opcoes = {'range': True}
+
+    def servir(requisicao):
+        corpo = conteudos.get(requisicao.path.rsplit('/', 1)[1])
+        if corpo is None:
+            return 404, {}, b''
+        etag = '"%s"' % hashlib.md5(corpo).hexdigest()
+        if requisicao.headers.get('If-None-Match') == etag:
+            return 304, {'ETag': etag}, b''
+        intervalo = re.fullmatch(r'bytes=(\d+)-(\d+)', requisicao.headers.get('Range') or '')
+        if intervalo and opcoes['range']:
+            inicio, fim = map(int, intervalo.groups())
+            return 206, {'ETag': etag, 'Content-Range': f'bytes {inicio}-{fim}/{len(corpo)}'}, corpo[inicio:fim + 1]
+        return 200, {'ETag': etag}, corpo
+
+    servidor.rotas.update({f'/arquivos/{nome}': servir for nome in ('a.csv', 'b.csv', 'c.csv', 'inexistente.csv')})
+    conteudos.update({'a.csv': b'a' * 100, 'b.csv': b'b' * 100, 'c.csv': bytes(range(100))})
+    return conteudos, opcoes
+
+
+def _gets(servidor):
+    return [(caminho, cabecalhos) for metodo, caminho, cabecalhos, _ in servidor.requisicoes if metodo == 'GET']
+
+
+def test_baixa_e_guarda_no_cache(servidor, arquivos, tmp_path):
+    url = servidor.url('/arquivos/a.csv')
+    assert cache_http.baixar(url, diretorio=str(tmp_path)) == b'a' * 100
+    assert len([n for n in os.listdir(tmp_path) if n.endswith('.dat')]) == 1
+    assert cache_http.baixar(url, imutavel=True, diretorio=str(tmp_path)) == b'a' * 100
+    assert len(_gets(servidor)) == 1  # imutável: nem revalida
+
+
+def test_revalida_com_etag_e_usa_o_disco_no_304(servidor, arquivos, tmp_path):
+    conteudos, _ = arquivos
+    url = servidor.url('/arquivos/a.csv')
+    cache_http.baixar(url, diretorio=str(tmp_path))
+    assert cache_http.baixar(url, diretorio=str(tmp_path)) == b'a' * 100
+    (_, primeira), (_, segunda) = _gets(servidor)
+    assert 'If-None-Match' not in primeira and segunda['If-None-Match'].startswith('"')
+
+    conteudos['a.csv'] = b'novo'
+    assert cache_http.baixar(url, diretorio=str(tmp_path)) == b'novo'
+
+
+def test_404_vira_file_not_found(servidor, arquivos, tmp_path):
+    with pytest.raises(FileNotFoundError):
+        cache_http.baixar(servidor.url('/arquivos/inexistente.csv'), diretorio=str(tmp_path))
+    with pytest.raises(FileNotFoundError):
+        cache_http.baixar_trecho(servidor.url('/arquivos/inexistente.csv'), 0, 10, diretorio=str(tmp_path))
+
+
+def test_apaga_os_arquivos_usados_ha_mais_tempo(servidor, arquivos, tmp_path):
+    diretorio = str(tmp_path)
+    urls = {nome: servidor.url(f'/arquivos/{nome}') for nome in ('a.csv', 'b.csv', 'c.csv')}
+    cache_http.baixar(urls['a.csv'], diretorio=diretorio, tamanho_maximo=250)
+    cache_http.baixar(urls['b.csv'], diretorio=diretorio, tamanho_maximo=250)
+    agora = time.time()
+    for nome, idade in (('a.csv', 20), ('b.csv', 10)):
+        os.utime(cache_http._caminhos(urls[nome], diretorio)[0], (agora - idade, agora - idade))
+    cache_http.baixar(urls['a.csv'], imutavel=True, diretorio=diretorio)  # 'a' passa a ser o mais recente
+    cache_http.baixar(urls['c.csv'], diretorio=diretorio, tamanho_maximo=250)
+
+    presentes = {nome for nome, url in urls.items() if os.path.exists(cache_http._caminhos(url, diretorio)[0])}
+    assert presentes == {'a.csv', 'c.csv'}
+    assert not os.path.exists(cache_http._caminhos(urls['b.csv'], diretorio)[1])
+
+
+def test_trecho_por_range(servidor, arquivos, tmp_path):
+    url = servidor.url('/arquivos/c.csv')
+    assert cache_http.baixar_trecho(url, 10, 20, diretorio=str(tmp_path)) == (bytes(range(10, 20)), 100)
+    assert _gets(servidor)[0][1]['Range'] == 'bytes=10-19'
+    assert cache_http.baixar_trecho(url, 10, 20, diretorio=str(tmp_path)) == (bytes(range(10, 20)), 100)
+    assert 'If-None-Match' in _gets(servidor)[1][1]
+    # Cada intervalo tem a sua entrada no cache.
+    assert cache_http.baixar_trecho(url, 0, 5, imutavel=True, diretorio=str(tmp_path)) == (bytes(range(5)), 100)
+    assert len(_gets(servidor)) == 3
+
+
+def test_trecho_recortado_quando_o_servidor_ignora_o_range(servidor, arquivos, tmp_path):
+    _, opcoes = arquivos
+    opcoes['range'] = False
+    conteudo, total = cache_http.baixar_trecho(servidor.url('/arquivos/c.csv'), 40, 50, diretorio=str(tmp_path))
+    assert conteudo == bytes(range(40, 50)) and total == 100
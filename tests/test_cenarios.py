@@ -0,0 +1,44 @@
+# Arquivo: tests/test_cenarios.py
+import numpy as np
+import pandas as pd
+import pytest
+from cenarios import varrer_cenarios, tabela_cenario
+from processamento import CLASSES_RISCO
+
+
+@pytest.fixture
+def df_risco():
+    rng = np.random.default_rng(0)
+    n = 500
+    return pd.DataFrame({
+        'data': '2025-10-20',
+        'hora_ref': [f'{h % 24:02d}:00:00' for h in range(n)],
+        'nomeEstacao': rng.choice(['Torreão', 'Imbiribeira', 'Campina do Barreto'], n),
+        'VP': np.where(rng.random(n) < 0.1, np.nan, rng.gamma(1.5, 20, n).round(2)),
+        'AM': rng.uniform(0.2, 2.6, n).round(2),
+    })
+
+
+def test_varredura_igual_ao_calculo_de_cada_cenario(df_risco):
+    mares, chuvas, conjuntos = [0.0, 0.25], [1.0, 1.7], [(30, 50, 100), (20, 45, 90)]
+    resultado = varrer_cenarios(df_risco, mares, chuvas, conjuntos, por_estacao=True, max_elementos=700)
+    assert len(resultado) == len(mares) * len(chuvas) * len(conjuntos) * 3
+
+    for _, linha in resultado.iterrows():
+        limiares = tuple(float(v) for v in linha['limiares'].split('/'))
+        do_cenario = tabela_cenario(df_risco, linha['deslocamento_mare'], linha['multiplicador_chuva'], limiares)
+        contagens = do_cenario[do_cenario['nomeEstacao'] == linha['nomeEstacao']]['Classificacao_Risco'].value_counts()
+        assert linha[CLASSES_RISCO].tolist() == [contagens.get(c, 0) for c in CLASSES_RISCO]
+
+
+def test_tabela_cenario_sem_data_e_hora(df_risco):
+    df = tabela_cenario(df_risco[['VP', 'AM']], deslocamento_mare=0.1)
+    assert list(df.columns) == ['VP', 'AM', 'Nivel_Risco_Valor', 'Classificacao_Risco']
+
+
+def test_colunas_obrigatorias(df_risco):
+    with pytest.raises(ValueError, match='AM'):
+        tabela_cenario(df_risco.drop(columns='AM'))
+    with pytest.raises(ValueError, match='nomeEstacao'):
+        varrer_cenarios(df_risco.drop(columns='nomeEstacao'), por_estacao=True)
+    assert varrer_cenarios(df_risco.drop(columns='nomeEstacao'))['total'].tolist() == [len(df_risco)]
@@ -0,0 +1,149 @@
+# Arquivo: tests/test_dados_chuva.py
+import io
+import os
+import re
+import json
+import functools
+import numpy as np
+import pandas as pd
+import pytest
+import cache_http
+import dados_chuva
+
+DIAS = ['2025-10-19', '2025-10-20', '2025-10-21']
+
+
+def _conteudo_do_dia(dia):
+    """CSV como o da ingestão: nomeado pela data de ingestão, começa às 21:40 da véspera."""
+    horarios = pd.date_range(pd.Timestamp(dia) - pd.Timedelta('2h20min'), periods=24 * 6, freq='10min')
+    df = pd.concat([pd.DataFrame({'codestacao': codigo, 'datahora': horarios.strftime('%Y-%m-%d %H:%M:%S'),
+                                  'nome': nome, 'valor': np.round(np.random.default_rng(semente).random(len(horarios)), 1)})
+                    for semente, (codigo, nome) in enumerate((('A1', 'Torreão'), ('A2', 'Imbiribeira')), start=int(dia[-2:]))])
+    return df.sort_values('datahora', kind='stable').to_csv(index=False).encode('utf-8')
+
+
+@pytest.fixture
+def arquivos(tmp_path):
+    """Os CSVs com índice em `com_indice/` e sem índice em `sem_indice/`."""
+    conteudos = {dia: _conteudo_do_dia(dia) for dia in DIAS}
+    for pasta in ('com_indice', 'sem_indice'):
+        (tmp_path / pasta).mkdir()
+        for dia, conteudo in conteudos.items():
+            (tmp_path / pasta / f'chuva_recife_{dia}.csv').write_bytes(conteudo)
+    for dia, conteudo in conteudos.items():
+        (tmp_path / 'com_indice' / f'chuva_recife_{dia}.indice.json').write_text(json.dumps(dados_chuva.indexar_csv(conteudo)))
+    return conteudos
+
+
+@pytest.fixture
+def leituras(monkeypatch):
+    """Anota os downloads inteiros e os trechos lidos, por arquivo."""
+    inteiros, trechos = [], []
+    baixar, baixar_trecho = dados_chuva.baixar, dados_chuva.baixar_trecho
+
+    def anotar_inteiro(url, **kwargs):
+        inteiros.append(url)
+        return baixar(url, **kwargs)
+
+    def anotar_trecho(url, inicio, fim, **kwargs):
+        trechos.append((url, inicio, fim))
+        return baixar_trecho(url, inicio, fim, **kwargs)
+
+    monkeypatch.setattr(dados_chuva, 'baixar', anotar_inteiro)
+    monkeypatch.setattr(dados_chuva, 'baixar_trecho', anotar_trecho)
+    return inteiros, trechos
+
+
+def _blocos_conferem(conteudo, indice):
+    """Blocos seguidos do cabeçalho ao fim, cada um com o menor e o maior `datahora` reais."""
+    blocos = indice['blocos']
+    assert indice['tamanho'] == len(conteudo) and blocos[0][0] == indice['cabecalho'] == conteudo.index(b'\n') + 1
+    assert blocos[-1][1] == len(conteudo) and all(a[1] == b[0] for a, b in zip(blocos, blocos[1:]))
+    for inicio, fim, menor, maior in blocos:
+        df = pd.read_csv(io.BytesIO(conteudo[:indice['cabecalho']] + conteudo[inicio:fim]))
+        assert (df['datahora'].min(), df['datahora'].max()) == (menor, maior)
+    return blocos
+
+
+def _ordenado(df):
+    return df.sort_values(['codestacao', 'datahora']).reset_index(drop=True)[['codestacao', 'datahora', 'nomeEstacao', 'valorMedida']]
+
+
+def _esperado(conteudos, dia):
+    """Leituras do dia e das 2h anteriores, lendo e filtrando todos os arquivos inteiros."""
+    df = pd.concat([pd.read_csv(io.BytesIO(c), dtype={'codestacao': str}) for c in conteudos.values()])
+    df = df.rename(columns={'nome': 'nomeEstacao', 'valor': 'valorMedida'}).drop_duplicates(['codestacao', 'datahora'])
+    df['datahora'] = pd.to_datetime(df['datahora'])
+    inicio = pd.Timestamp(dia) - pd.Timedelta(seconds=dados_chuva.JANELA_2H)
+    return _ordenado(df[(df['datahora'] >= inicio) & (df['datahora'] < pd.Timestamp(dia) + pd.Timedelta('1D'))])
+
+
+def test_indice_cobre_o_arquivo_em_blocos_ordenados(arquivos):
+    conteudo = arquivos['2025-10-20']
+    for inicio, fim, menor, maior in _blocos_conferem(conteudo, dados_chuva.indexar_csv(conteudo)):
+        assert conteudo[inicio:fim].count(b'\n') <= dados_chuva.LINHAS_POR_BLOCO
+        assert pd.Timestamp(maior) - pd.Timestamp(menor) <= dados_chuva.DURACAO_MAXIMA_BLOCO
+
+
+def test_anexar_bloco_mantem_o_indice_valido(arquivos):
+    linhas = arquivos['2025-10-20'].splitlines(keepends=True)
+    conteudo = b''.join(linhas[:200])
+    indice = dados_chuva.indexar_csv(conteudo)
+    blocos_antes = len(indice['blocos'])
+    for inicio_lote, fim_lote in ((200, 202), (202, 204), (204, 260)):  # dois lotes pequenos e um de horas
+        anexado = b''.join(linhas[inicio_lote:fim_lote])
+        datahoras = pd.read_csv(io.BytesIO(linhas[0] + anexado))['datahora']
+        indice = dados_chuva.anexar_bloco(indice, len(conteudo), len(conteudo) + len(anexado), datahoras.min(), datahoras.max())
+        conteudo += anexado
+    blocos = _blocos_conferem(conteudo, indice)
+    assert len(blocos) == blocos_antes + 1  # os lotes pequenos entraram no último bloco
+
+
+def test_carga_pelo_indice_igual_a_leitura_completa(arquivos, leituras, tmp_path):
+    inteiros, trechos = leituras
+    pelo_indice = dados_chuva.carregar_chuva_periodo(['2025-10-20'], url_base=str(tmp_path / 'com_indice' / 'chuva_recife_'))
+    sem_indice = dados_chuva.carregar_chuva_periodo(['2025-10-20'], url_base=str(tmp_path / 'sem_indice' / 'chuva_recife_'))
+
+    esperado = _esperado(arquivos, '2025-10-20')
+    pd.testing.assert_frame_equal(_ordenado(pelo_indice), esperado)
+    pd.testing.assert_frame_equal(_ordenado(sem_indice), esperado)
+
+    # Com índice, os vizinhos são lidos só em trechos, bem menores que o arquivo.
+    vizinhos = ('chuva_recife_2025-10-19.csv', 'chuva_recife_2025-10-21.csv')
+    assert not [url for url in inteiros if 'com_indice' in url and url.endswith(vizinhos)]
+    assert {os.path.basename(url) for url, _, _ in trechos if url.endswith(vizinhos)} == set(vizinhos)
+    bytes_lidos = sum(fim - inicio for url, inicio, fim in trechos if url.endswith(vizinhos[0]))
+    assert bytes_lidos < len(arquivos['2025-10-19']) / 4
+
+
+def test_indice_desatualizado_le_o_arquivo_inteiro(arquivos, tmp_path):
+    # Leitura anexada sem reindexar: o tamanho no índice não bate e o arquivo é lido inteiro.
+    arquivos['2025-10-19'] += b'A3,2025-10-19 23:50:00,Vila,7.0\n'
+    (tmp_path / 'com_indice' / 'chuva_recife_2025-10-19.csv').write_bytes(arquivos['2025-10-19'])
+    df = dados_chuva.carregar_chuva_periodo(['2025-10-20'], url_base=str(tmp_path / 'com_indice' / 'chuva_recife_'))
+    pd.testing.assert_frame_equal(_ordenado(df), _esperado(arquivos, '2025-10-20'))
+    assert df.loc[df['codestacao'] == 'A3', 'valorMedida'].tolist() == [7.0]
+
+
+def test_carga_por_http_range(servidor, arquivos, tmp_path, monkeypatch):
+    arquivos_servidos = {f'chuva_recife_{dia}.csv': c for dia, c in arquivos.items()}
+    arquivos_servidos.update({f'chuva_recife_{dia}.indice.json': json.dumps(dados_chuva.indexar_csv(c)).encode()
+                              for dia, c in arquivos.items()})
+
+    def servir(requisicao):
+        corpo = arquivos_servidos[requisicao.path.rsplit('/', 1)[1]]
+        intervalo = re.fullmatch(r'bytes=(\d+)-(\d+)', requisicao.headers.get('Range') or '')
+        if intervalo:
+            inicio, fim = map(int, intervalo.groups())
+            return 206, {'Content-Range': f'bytes {inicio}-{fim}/{len(corpo)}'}, corpo[inicio:fim + 1]
+        return 200, {}, corpo
+
+    servidor.rotas.update({f'/chuva/{nome}': servir for nome in arquivos_servidos})
+    monkeypatch.setattr(dados_chuva, 'baixar', functools.partial(cache_http.baixar, diretorio=str(tmp_path / 'cache')))
+    monkeypatch.setattr(dados_chuva, 'baixar_trecho', functools.partial(cache_http.baixar_trecho, diretorio=str(tmp_path / 'cache')))
+
+    df = dados_chuva.carregar_chuva_periodo(['2025-10-20'], url_base=servidor.url('/chuva/chuva_recife_'), ultima_data='2025-10-21')
+    pd.testing.assert_frame_equal(_ordenado(df), _esperado(arquivos, '2025-10-20'))
+    pedidos_vizinho = [cabecalhos.get('Range') for metodo, caminho, cabecalhos, _ in servidor.requisicoes
+                       if caminho.endswith('chuva_recife_2025-10-19.csv')]
+    assert pedidos_vizinho and all(pedidos_vizinho)  # só pedidos com Range
@@ -0,0 +1,61 @@
+# Arquivo: tests/test_estacoes.py
+import numpy as np
+import pandas as pd
+import pytest
+from estacoes import RegistroEstacoes, COLUNAS_REGISTRO
+
+
+def _leituras(*estacoes):
+    return pd.DataFrame([{'codestacao': codigo, 'nome': nome, 'cidade': 'RECIFE', 'uf': 'PE',
+                          'latitude': -8.0, 'longitude': -34.9, 'id_sensor': 10} for codigo, nome in estacoes])
+
+
+@pytest.fixture
+def registro():
+    registro = RegistroEstacoes.vazio()
+    registro.atualizar(_leituras(('A1', 'Torreão'), ('A2', 'Imbiribeira')), monitorada=True)
+    return registro
+
+
+def test_estacoes_novas_recebem_ids_seguidos(registro):
+    assert registro.tabela['id_estacao'].tolist() == [0, 1]
+    assert registro.atualizar(_leituras(('A3', 'Várzea'))) == 1
+    assert registro.ids(['A3', 'A1', 'XX']).tolist() == [2, 0, -1]
+    assert registro.codigos(monitoradas=True) == ['A1', 'A2']
+    assert registro.codigos(monitoradas=False) == ['A3']
+
+
+def test_atualizar_conta_so_o_que_mudou(registro):
+    assert registro.atualizar(_leituras(('A1', 'Torreão'))) == 0
+    assert registro.atualizar(_leituras(('A1', 'Torreão (novo)'))) == 1
+    assert registro.atributos([0], ['nome'])['nome'].tolist() == ['Torreão (novo)']
+    assert registro.tabela['id_estacao'].tolist() == [0, 1]
+
+
+def test_incluir_nao_altera_estacoes_conhecidas(registro):
+    assert registro.incluir(_leituras(('A1', 'Outro nome'), ('A4', 'Boa Viagem'))) == 1
+    assert registro.atributos(registro.ids(['A1', 'A4']), ['nome'])['nome'].tolist() == ['Torreão', 'Boa Viagem']
+
+
+def test_atributos_alinhados_aos_ids(registro):
+    atributos = registro.atributos(np.array([1, 7, 0], dtype=np.int32), ['nome', 'cidade'])
+    assert atributos['nome'].tolist()[::2] == ['Imbiribeira', 'Torreão']
+    assert atributos.iloc[1].isna().all()
+
+
+def test_nome_desconhecido_continua_ausente_no_csv(registro, tmp_path):
+    registro.tabela = pd.concat([registro.tabela, pd.DataFrame(
+        [{'id_estacao': 2, 'codestacao': 'A5', 'monitorada': True}])], ignore_index=True)
+    caminho = str(tmp_path / 'estacoes.csv')
+    RegistroEstacoes(registro.tabela).para_csv(caminho)
+    lido = RegistroEstacoes.de_csv(caminho)
+    assert list(lido.tabela.columns) == COLUNAS_REGISTRO
+    assert lido.nomes() == ['Torreão', 'Imbiribeira']
+    assert pd.isna(lido.tabela.loc[2, 'nome'])
+    assert lido.atualizar(_leituras(('A5', 'Dois Irmãos'))) == 1
+    assert lido.nomes(monitoradas=True) == ['Torreão', 'Imbiribeira', 'Dois Irmãos']
+
+
+def test_arquivo_inexistente_e_cadastro_vazio(tmp_path):
+    registro = RegistroEstacoes.de_csv(str(tmp_path / 'nao_existe.csv'))
+    assert len(registro) == 0 and registro.ids(['A1']).tolist() == [-1]
@@ -0,0 +1,83 @@
+# Arquivo: tests/test_historico.py
+import os
+import pandas as pd
+import pytest
+import historico
+from estacoes import RegistroEstacoes
+
+
+def _leituras(inicio, periodos, estacoes=(('261160618A', 'Torreão'), ('261160614A', 'Campina do Barreto')), valor=0.2):
+    horarios = pd.date_range(inicio, periods=periodos, freq='10min').strftime('%Y-%m-%d %H:%M:%S')
+    return pd.concat([pd.DataFrame({'codestacao': codigo, 'datahora': horarios, 'nome': nome, 'cidade': 'RECIFE',
+                                    'uf': 'PE', 'latitude': -8.0, 'longitude': -34.9, 'id_sensor': 10,
+                                    'qualificacao': 0, 'offset': None, 'valor': valor})
+                      for codigo, nome in estacoes], ignore_index=True)
+
+
+@pytest.fixture
+def compactar(tmp_path):
+    diretorio, arquivo_estacoes = str(tmp_path / 'historico'), str(tmp_path / 'estacoes.csv')
+    return lambda df: historico.compactar_leituras(df, diretorio, arquivo_estacoes)
+
+
+@pytest.fixture
+def ler(tmp_path):
+    return lambda inicio, fim, **kwargs: historico.ler_historico(inicio, fim, diretorio=str(tmp_path / 'historico'), **kwargs)
+
+
+def test_ida_e_volta(compactar, ler, tmp_path):
+    df = _leituras('2025-10-20 22:00', 24)  # 22:00 de 20/10 até 01:50 de 21/10
+    assert compactar(df) == 2
+    assert os.path.exists(historico.caminho_particao(str(tmp_path / 'historico'), '2025-10-21'))
+
+    lido = ler('2025-10-20', '2025-10-22', colunas=['valor', 'nome'])
+    assert list(lido.columns) == ['codestacao', 'datahora', 'valor', 'nome']
+    esperado = df.assign(datahora=pd.to_datetime(df['datahora'])).sort_values(['codestacao', 'datahora'])
+    lido = lido.assign(codestacao=lido['codestacao'].astype(str)).sort_values(['codestacao', 'datahora'])
+    pd.testing.assert_frame_equal(lido[['codestacao', 'datahora', 'valor', 'nome']].reset_index(drop=True),
+                                  esperado[['codestacao', 'datahora', 'valor', 'nome']].reset_index(drop=True),
+                                  check_dtype=False)
+
+    registro = RegistroEstacoes.de_csv(str(tmp_path / 'estacoes.csv'))
+    assert registro.ids(['261160618A', '261160614A']).tolist() == [0, 1]
+    assert historico.ler_estacoes(str(tmp_path / 'historico'))['codestacao'].tolist() == ['261160618A', '261160614A']
+
+
+def test_dia_sem_leituras_novas_nao_e_regravado(compactar, tmp_path):
+    compactar(_leituras('2025-10-20 22:00', 24))
+    caminhos = [historico.caminho_particao(str(tmp_path / 'historico'), d) for d in ('2025-10-20', '2025-10-21')]
+    gravados_em = [os.path.getmtime(c) for c in caminhos]
+    assert compactar(_leituras('2025-10-20 22:00', 24)) == 0
+    assert compactar(_leituras('2025-10-21 01:00', 6)) == 0  # repetidas
+    assert [os.path.getmtime(c) for c in caminhos] == gravados_em
+
+    assert compactar(_leituras('2025-10-21 01:50', 2, valor=1.0)) == 1  # uma corrigida, uma nova
+    assert os.path.getmtime(caminhos[0]) == gravados_em[0]
+
+
+def test_leitura_repetida_fica_com_o_valor_mais_recente(compactar, ler):
+    compactar(_leituras('2025-10-20 10:00', 6))
+    compactar(_leituras('2025-10-20 10:30', 1, estacoes=(('261160618A', 'Torreão'),), valor=4.0))
+    lido = ler('2025-10-20 10:30', '2025-10-20 10:40', estacoes=['261160618A'])
+    assert lido['valor'].tolist() == [4.0]
+
+
+def test_filtros_de_intervalo_e_estacao(compactar, ler):
+    compactar(_leituras('2025-10-19 00:00', 3 * 24 * 6, estacoes=(('A1', 'Um'), ('A2', 'Dois'), ('A3', 'Três'))))
+
+    lido = ler('2025-10-20 23:00', '2025-10-21 01:00', estacoes=['A3', 'A1'], colunas=['valor', 'cidade'])
+    assert sorted(lido['codestacao'].unique()) == ['A1', 'A3']
+    assert lido['datahora'].min() == pd.Timestamp('2025-10-20 23:00') and lido['datahora'].max() == pd.Timestamp('2025-10-21 00:50')
+    assert len(lido) == 2 * 12 and (lido['cidade'] == 'RECIFE').all()
+
+    assert ler('2025-10-20', '2025-10-21', estacoes=['DESCONHECIDA']).empty
+    assert ler('2025-11-01', '2025-11-02').empty
+
+
+def test_estacao_nova_entra_no_cadastro_com_o_proximo_id(compactar, ler, tmp_path):
+    compactar(_leituras('2025-10-20 10:00', 6))
+    compactar(_leituras('2025-10-20 11:00', 6, estacoes=(('261160609A', 'Imbiribeira'),)))
+    registro = RegistroEstacoes.de_csv(str(tmp_path / 'estacoes.csv'))
+    assert registro.ids(['261160609A']).tolist() == [2]
+    lido = ler('2025-10-20 11:00', '2025-10-20 12:00', estacoes=['261160609A'], colunas=['valor', 'nome'])
+    assert lido['nome'].unique().tolist() == ['Imbiribeira'] and len(lido) == 6
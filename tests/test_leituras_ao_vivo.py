@@ -0,0 +1,117 @@
+# Arquivo: tests/test_leituras_ao_vivo.py
+import os
+import threading
+import pandas as pd
+import pytest
+from leituras_ao_vivo import gravar_leituras, ler_desde, AcompanhamentoAoVivo
+from mare import SerieMare
+from processamento import processar_dados_chuva_simplificado, executar_analise_risco_completa, COLUNAS_TABELA_RISCO
+
+DIRETORIO_REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _leituras(inicio, periodos, estacoes=(('A1', 'Torreão'), ('A2', 'Imbiribeira')), valor=0.5):
+    horarios = pd.date_range(inicio, periods=periodos, freq='10min').strftime('%Y-%m-%d %H:%M:%S')
+    return pd.concat([pd.DataFrame({'codestacao': codigo, 'datahora': horarios, 'nome': nome, 'valor': valor})
+                      for codigo, nome in estacoes], ignore_index=True)
+
+
+@pytest.fixture
+def banco(tmp_path):
+    return str(tmp_path / 'leituras.sqlite')
+
+
+@pytest.fixture(scope='module')
+def serie_mare():
+    return SerieMare.de_csv(os.path.join(DIRETORIO_REPO, 'tide', 'mare_calculada_hora_em_hora_ano-completo.csv')).com_harmonica(
+        arquivo_constituintes=os.path.join(DIRETORIO_REPO, 'tide', 'constituintes_harmonicos.csv'))
+
+
+def test_versoes_so_avancam_com_leituras_novas_ou_corrigidas(banco):
+    assert gravar_leituras(_leituras('2025-10-20 10:00', 6), banco) == (12, 1)
+    assert gravar_leituras(_leituras('2025-10-20 10:00', 6), banco) == (0, 1)  # repetição idêntica
+    corrigida = _leituras('2025-10-20 10:50', 2)
+    corrigida.loc[0, 'valor'] = 3.0
+    assert gravar_leituras(corrigida, banco) == (3, 2)  # uma corrigida e duas novas
+
+    df, versao = ler_desde(1, caminho=banco)
+    assert versao == 2 and len(df) == 3
+    assert df.loc[df['datahora'] == pd.Timestamp('2025-10-20 10:50'), 'valorMedida'].tolist() == [3.0]
+    assert list(df.columns) == ['datahora', 'nomeEstacao', 'valorMedida']
+    assert ler_desde(2, caminho=banco)[0].empty
+
+
+def test_ler_desde_filtra_o_intervalo(banco):
+    gravar_leituras(_leituras('2025-10-19 21:00', 24), banco)
+    df, _ = ler_desde(0, '2025-10-19 22:00:00', '2025-10-20', banco)
+    assert df['datahora'].min() == pd.Timestamp('2025-10-19 22:00') and df['datahora'].max() == pd.Timestamp('2025-10-19 23:50')
+    assert len(df) == 2 * 12
+
+
+def test_leituras_antigas_sao_descartadas(banco):
+    gravar_leituras(_leituras('2025-10-15 12:00', 6), banco)
+    gravar_leituras(_leituras('2025-10-20 12:00', 6), banco, dias_mantidos=3)
+    df, _ = ler_desde(0, caminho=banco)
+    assert df['datahora'].min() == pd.Timestamp('2025-10-20 12:00')
+
+
+def test_leitor_e_gravador_ao_mesmo_tempo(banco):
+    gravar_leituras(_leituras('2025-10-20 00:00', 1), banco)
+    lotes = [_leituras(inicio, 3) for inicio in pd.date_range('2025-10-20 00:10', periods=40, freq='30min')]
+    erros, vistas, marca = [], [], 0
+
+    def gravar():
+        try:
+            for lote in lotes:
+                gravar_leituras(lote, banco)
+        except Exception as e:  # "database is locked", se o WAL não isolar leitor e gravador
+            erros.append(e)
+
+    gravador = threading.Thread(target=gravar)
+    gravador.start()
+    while gravador.is_alive() or marca < len(lotes) + 1:
+        df, versao = ler_desde(marca, caminho=banco)
+        assert versao >= marca
+        vistas.append(df)
+        marca = versao
+    gravador.join()
+
+    assert not erros
+    todas = pd.concat(vistas, ignore_index=True)
+    assert len(todas) == 2 * (1 + 3 * len(lotes)) and not todas.duplicated(['datahora', 'nomeEstacao']).any()
+
+
+def test_acompanhamento_igual_ao_calculo_completo(banco, serie_mare):
+    gravar_leituras(_leituras('2025-10-19 22:00', 12, valor=1.0), banco)  # 2h antes da meia-noite
+    acompanhamento = AcompanhamentoAoVivo('2025-10-20', ['Torreão', 'Imbiribeira'], serie_mare, banco)
+
+    def esperado():
+        df, _ = ler_desde(0, caminho=banco)
+        df_vp = processar_dados_chuva_simplificado(df, ['2025-10-20'], ['Torreão', 'Imbiribeira'], incluir_horas_anteriores=True)
+        return executar_analise_risco_completa(df_vp, serie_mare)[COLUNAS_TABELA_RISCO].reset_index(drop=True)
+
+    for inicio, periodos in (('2025-10-20 00:00', 6), ('2025-10-20 01:00', 3), ('2025-10-20 01:30', 9)):
+        gravar_leituras(_leituras(inicio, periodos, valor=0.2), banco)
+        tabela = acompanhamento.atualizar()
+        pd.testing.assert_frame_equal(tabela[COLUNAS_TABELA_RISCO].reset_index(drop=True), esperado(), check_dtype=False)
+    assert acompanhamento.ultima_leitura == '2025-10-20 02:50:00'
+
+    # Leitura atrasada e corrigida: o dia é relido do banco.
+    atrasada = _leituras('2025-10-20 00:20', 1, estacoes=(('A1', 'Torreão'),), valor=8.0)
+    gravar_leituras(atrasada, banco)
+    tabela = acompanhamento.atualizar()
+    pd.testing.assert_frame_equal(tabela[COLUNAS_TABELA_RISCO].reset_index(drop=True), esperado(), check_dtype=False)
+    assert acompanhamento.marca == ler_desde(0, caminho=banco)[1]
+
+
+def test_banco_recriado_recomeca_do_zero(banco, serie_mare):
+    gravar_leituras(_leituras('2025-10-20 00:00', 12), banco)
+    gravar_leituras(_leituras('2025-10-20 02:00', 6), banco)
+    acompanhamento = AcompanhamentoAoVivo('2025-10-20', ['Torreão', 'Imbiribeira'], serie_mare, banco)
+    assert len(acompanhamento.atualizar()) == 2 * 3 and acompanhamento.marca == 2
+
+    for sufixo in ('', '-wal', '-shm'):
+        if os.path.exists(banco + sufixo):
+            os.remove(banco + sufixo)
+    gravar_leituras(_leituras('2025-10-20 00:00', 6), banco)
+    assert len(acompanhamento.atualizar()) == 2 and acompanhamento.marca == 1
@@ -0,0 +1,61 @@
+# Arquivo: tests/test_mare_harmonica.py
+import os
+import numpy as np
+import pytest
+from mare import SerieMare
+from mare_harmonica import MareHarmonica, avaliar, ARQUIVO_MARE, ARQUIVO_CONSTITUINTES, UMA_HORA
+
+DIRETORIO_REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope='module')
+def serie_mare():
+    return SerieMare.de_csv(os.path.join(DIRETORIO_REPO, ARQUIVO_MARE))
+
+
+@pytest.fixture(scope='module')
+def modelo(serie_mare):
+    return MareHarmonica.de_serie(serie_mare)
+
+
+def test_ajuste_reproduz_a_tabela_horaria(serie_mare, modelo):
+    erro = avaliar(modelo, serie_mare)
+    assert erro['horas'] > 0.9 * np.isfinite(serie_mare.alturas).sum()
+    assert erro['rms'] < 0.10  # hoje: ~7,8 cm
+    assert erro['p90'] < 0.15  # hoje: ~12,5 cm
+
+
+def test_constituintes_sobrevivem_ao_csv(modelo, tmp_path):
+    caminho = str(tmp_path / 'constituintes.csv')
+    modelo.para_csv(caminho)
+    segundos = np.arange(0, 30 * 24) * UMA_HORA + np.int64(1_760_000_000)
+    # As constantes vão para o CSV arredondadas: diferença abaixo de 1 mm.
+    np.testing.assert_allclose(MareHarmonica.de_csv(caminho).prever(segundos), modelo.prever(segundos), atol=1e-3)
+
+
+def test_serie_completa_as_lacunas_com_o_modelo(serie_mare, modelo):
+    completa = serie_mare.com_harmonica(modelo)
+    fora_da_tabela = np.array([serie_mare.origem + (len(serie_mare.alturas) + 48) * UMA_HORA])
+    previsto = completa.no_horario(fora_da_tabela)
+    assert np.isfinite(previsto).all()
+    np.testing.assert_allclose(previsto, modelo.no_horario(fora_da_tabela))
+
+
+def test_constantes_gravadas_dispensam_o_ajuste(serie_mare, modelo, tmp_path, monkeypatch):
+    caminho = str(tmp_path / 'constituintes.csv')
+    modelo.para_csv(caminho)
+    monkeypatch.setattr(MareHarmonica, 'de_serie', lambda *args, **kwargs: pytest.fail("ajustou de novo"))
+    completa = serie_mare.com_harmonica(arquivo_constituintes=caminho)
+    assert completa.harmonica.nomes == modelo.nomes
+
+
+def test_sem_o_arquivo_de_constantes_ajusta_a_tabela(serie_mare, tmp_path):
+    completa = serie_mare.com_harmonica(arquivo_constituintes=str(tmp_path / 'nao_existe.csv'))
+    assert completa.harmonica is not None and not completa.harmonica.vazia
+
+
+def test_constantes_publicadas_em_dia_com_a_tabela(serie_mare):
+    # As constantes do repositório precisam ser regravadas quando a tabela horária muda.
+    publicado = MareHarmonica.de_csv(os.path.join(DIRETORIO_REPO, ARQUIVO_CONSTITUINTES))
+    erro = avaliar(publicado, serie_mare)
+    assert erro['rms'] < 0.10 and erro['p90'] < 0.15
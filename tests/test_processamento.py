@@ -0,0 +1,62 @@
+# Arquivo: tests/test_processamento.py
+import os
+import numpy as np
+import pandas as pd
+import pandas.testing as pdt
+import pytest
+from processamento import (processar_dados_chuva_simplificado, processar_dados_chuva_por_estacao,
+                           calcular_vp_horario, MotorRiscoIncremental, executar_analise_risco_completa)
+
+DIRETORIO_REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATAS = ['2025-10-20', '2025-10-21']
+COLUNAS_VP = ['data', 'hora_ref', 'nomeEstacao', 'VP']
+
+
+@pytest.fixture(scope='module')
+def df_chuva():
+    """Leituras de dois dias dos CSVs do repositório, no formato do cálculo."""
+    arquivos = [os.path.join(DIRETORIO_REPO, f'chuva_recife_{d}.csv') for d in ['2025-10-19'] + DATAS]
+    df = pd.concat([pd.read_csv(a, dtype={'codestacao': str}) for a in arquivos], ignore_index=True)
+    df = df.rename(columns={'nome': 'nomeEstacao', 'valor': 'valorMedida'})
+    df['datahora'] = pd.to_datetime(df['datahora'])
+    # Uma leitura ausente e uma pancada, para que as janelas não sejam só zeros.
+    df.loc[5, 'valorMedida'] = np.nan
+    pancada = df['datahora'].between('2025-10-20 14:00', '2025-10-20 15:30')
+    df.loc[pancada, 'valorMedida'] = np.arange(pancada.sum()) % 7 * 0.8
+    return df[['datahora', 'nomeEstacao', 'valorMedida']]
+
+
+def _ordenado(df, colunas=COLUNAS_VP):
+    return df[colunas].sort_values(['nomeEstacao', 'data', 'hora_ref']).reset_index(drop=True)
+
+
+def test_vp_vetorizado_igual_a_referencia(df_chuva):
+    estacoes = sorted(df_chuva['nomeEstacao'].unique())
+    vetorizado = processar_dados_chuva_simplificado(df_chuva, DATAS, estacoes)
+    referencia = processar_dados_chuva_por_estacao(df_chuva, DATAS, estacoes)
+    assert len(referencia) > 0 and vetorizado['VP'].max() > 0
+    pdt.assert_frame_equal(_ordenado(vetorizado), _ordenado(referencia), check_dtype=False, atol=1e-9)
+
+
+def test_datahora_e_a_hora_cheia_de_data_e_hora_ref(df_chuva):
+    df_vp = processar_dados_chuva_simplificado(df_chuva, DATAS, ['Torreão'])
+    esperado = pd.to_datetime(df_vp['data'] + ' ' + df_vp['hora_ref'])
+    pdt.assert_series_equal(df_vp['datahora'], esperado, check_names=False, check_dtype=False)
+
+
+def test_calcular_vp_horario_sem_leituras():
+    codigos, horas, vp = calcular_vp_horario(np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0))
+    assert len(codigos) == len(horas) == len(vp) == 0
+
+
+def test_motor_incremental_igual_ao_calculo_completo(df_chuva):
+    serie_mare = pd.DataFrame({'data': np.repeat(DATAS, 24), 'hora_ref': [f'{h:02d}:00:00' for h in range(24)] * 2,
+                               'AM': np.linspace(0.5, 2.5, 48)})
+    estacoes = sorted(df_chuva['nomeEstacao'].unique())
+    completo = executar_analise_risco_completa(processar_dados_chuva_simplificado(df_chuva, DATAS, estacoes), serie_mare)
+    motor = MotorRiscoIncremental(DATAS, estacoes, serie_mare)
+    df = df_chuva.sort_values('datahora')
+    for parte in np.array_split(np.arange(len(df)), 5):
+        motor.atualizar(df.iloc[parte], somente_novas=True)
+    colunas = COLUNAS_VP + ['AM', 'Nivel_Risco_Valor']
+    pdt.assert_frame_equal(_ordenado(motor.tabela, colunas), _ordenado(completo, colunas), check_dtype=False)
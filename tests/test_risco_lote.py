@@ -0,0 +1,73 @@
+# Arquivo: tests/test_risco_lote.py
+import os
+import json
+import pandas as pd
+import pytest
+import risco_lote
+
+DIRETORIO_REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ARQUIVO_MARE = os.path.join(DIRETORIO_REPO, risco_lote.ARQUIVO_MARE)
+ARQUIVO_CONSTITUINTES = os.path.join(DIRETORIO_REPO, risco_lote.ARQUIVO_CONSTITUINTES)
+DATAS = ['2025-10-20', '2025-10-21']
+
+
+@pytest.fixture
+def diretorio_chuva(tmp_path):
+    for dia in ['2025-10-19'] + DATAS:
+        horarios = pd.date_range(dia, periods=24 * 6, freq='10min').strftime('%Y-%m-%d %H:%M:%S')
+        pd.concat([pd.DataFrame({'codestacao': codigo, 'datahora': horarios, 'nome': nome, 'valor': 0.4})
+                   for codigo, nome in (('261160618A', 'Torreão'), ('261160614A', 'Imbiribeira'))]
+                  ).to_csv(tmp_path / f'chuva_recife_{dia}.csv', index=False)
+    return tmp_path
+
+
+def _lote(diretorio_chuva, **kwargs):
+    return risco_lote.calcular_risco_lote(DATAS, saida=str(diretorio_chuva / 'saida'), diretorio_chuva=str(diretorio_chuva),
+                                          arquivo_mare=ARQUIVO_MARE, processos=1,
+                                          arquivo_constituintes=ARQUIVO_CONSTITUINTES, **kwargs)
+
+
+def test_chamada_direta_carrega_a_mare(diretorio_chuva, monkeypatch):
+    monkeypatch.setattr(risco_lote, '_serie_mare', None)
+    df = risco_lote.calcular_risco_dia('2025-10-20', diretorio_chuva=str(diretorio_chuva), arquivo_mare=ARQUIVO_MARE,
+                                         arquivo_constituintes=ARQUIVO_CONSTITUINTES)
+    assert len(df) == 2 * 24 and list(df.columns) == risco_lote.COLUNAS_TABELA_RISCO
+    assert risco_lote._serie_mare is not None
+
+
+def test_lote_grava_um_arquivo_por_dia_com_as_estacoes(diretorio_chuva):
+    assert _lote(diretorio_chuva) == {data: 2 * 24 for data in DATAS}
+    destino = risco_lote.arquivo_resultado('2025-10-20', str(diretorio_chuva / 'saida'))
+    direto = risco_lote.calcular_risco_dia('2025-10-20', diretorio_chuva=str(diretorio_chuva), arquivo_mare=ARQUIVO_MARE,
+                                         arquivo_constituintes=ARQUIVO_CONSTITUINTES)
+    pd.testing.assert_frame_equal(pd.read_parquet(destino), direto)
+    assert json.load(open(f'{destino}.estacoes.json')) == {'estacoes': None}
+
+
+def test_dias_atualizados_sao_pulados(diretorio_chuva):
+    _lote(diretorio_chuva)
+    assert _lote(diretorio_chuva) == {data: None for data in DATAS}
+
+    # Resultado de 20/10 mais velho que as leituras: só esse dia é refeito.
+    destino = risco_lote.arquivo_resultado('2025-10-20', str(diretorio_chuva / 'saida'))
+    gravado_em = os.path.getmtime(destino)
+    os.utime(destino, (gravado_em - 60, gravado_em - 60))
+    assert _lote(diretorio_chuva) == {'2025-10-20': 48, '2025-10-21': None}
+    assert _lote(diretorio_chuva) == {data: None for data in DATAS}
+
+
+def test_outro_conjunto_de_estacoes_recalcula(diretorio_chuva):
+    _lote(diretorio_chuva)
+    assert _lote(diretorio_chuva, estacoes=['Torreão']) == {data: 24 for data in DATAS}
+    destino = risco_lote.arquivo_resultado('2025-10-21', str(diretorio_chuva / 'saida'))
+    assert json.load(open(f'{destino}.estacoes.json')) == {'estacoes': ['Torreão']}
+    assert _lote(diretorio_chuva, estacoes=['Torreão']) == {data: None for data in DATAS}
+    assert _lote(diretorio_chuva) == {data: 48 for data in DATAS}
+
+
+def test_resultado_sem_registro_de_estacoes_e_desatualizado(diretorio_chuva):
+    _lote(diretorio_chuva)
+    destino = risco_lote.arquivo_resultado('2025-10-20', str(diretorio_chuva / 'saida'))
+    os.remove(f'{destino}.estacoes.json')
+    assert risco_lote._desatualizado(destino, [])
+    assert _lote(diretorio_chuva) == {'2025-10-20': 48, '2025-10-21': None}